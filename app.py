@@ -1,5 +1,4 @@
 import traceback
-import io
 import pandas as pd
 import numpy as np
 import streamlit as st
@@ -39,32 +38,26 @@ from src.config import (
     FECH_SIR_COL_DIA, FECH_SIR_TURNO_MADRUGADA,
 )
 from src.processors import (
-    load_produtividade, resumo_mensal, resumo_geral,
-    evolucao_diaria, composicao_volume, primeiro_nome,
+    load_produtividade,
+    evolucao_diaria, composicao_volume, primeiro_nome, primeiros_nomes,
     # ETIT
-    load_etit, etit_resumo_analista, etit_por_demanda,
-    etit_por_tipo, etit_por_causa, etit_por_regional,
-    etit_por_turno, etit_evolucao_diaria,
+    load_etit,
     # Residencial Indicadores
     load_residencial_indicadores,
-    res_kpis_por_indicador, res_por_regional,
-    res_por_natureza, res_por_solucao, res_por_impacto,
-    res_evolucao_diaria,
     # DPA Ocupação
     load_dpa_ocupacao, dpa_ranking, dpa_comparativo,
     # Indicadores TOA
-    load_toa_indicadores, toa_resumo_por_indicador,
-    toa_canceladas_por_analista, toa_canceladas_por_tipo,
-    toa_canceladas_por_aging, toa_canceladas_por_rede, toa_canceladas_por_regional,
-    toa_canceladas_evolucao,
-    toa_validacao_por_analista, toa_validacao_por_tipo,
-    toa_validacao_por_rede, toa_validacao_por_regional,
-    toa_validacao_evolucao,
+    load_toa_indicadores,
     # Fechamento TOA x SIR
     load_fechamento_toa_sir, fech_sir_resumo_analista,
-    fech_sir_por_causa_toa, fech_sir_por_causa_sir,
-    fech_sir_por_regional, fech_sir_por_grupo, fech_sir_por_demanda, fech_sir_por_dia,
 )
+from src.ingest import load_all
+from src.storage import STORE
+from src.query import quebra, resumo_produtividade
+from src.kernels import por_valor, rank_no_grupo
+from src.registry import REGISTRY
+from src.spill import SPILL
+from src import warmup
 
 # =====================================================
 # PAGE CONFIG
@@ -240,35 +233,42 @@ def get_sector_vol_cols(setor, available_cols):
 
 
 def build_insights(resumo_df, setor_filter):
+    df = resumo_df.reset_index(drop=True)
+    # Posições e médias do setor calculadas em coluna; o laço só monta os cards
+    vol_keys = [k for k in {**VOL_COLS_RESIDENCIAL, **VOL_COLS_EMPRESARIAL, **VOL_COLS_AMBOS} if k in df.columns]
+    ranks = rank_no_grupo(df, vol_keys + [COL_VOL_TOTAL], "Setor")
+    n_peers_col = df["Setor"].map(df["Setor"].value_counts()).fillna(0).astype(int)
+    avg_vol_col = df.groupby("Setor")[COL_VOL_TOTAL].transform("mean")
+    nomes = primeiros_nomes(df[COL_NOME])
+    registros = df.to_dict("records")
     data = []
-    for _, row in resumo_df.sort_values(COL_VOL_TOTAL, ascending=False).iterrows():
-        nome = primeiro_nome(row[COL_NOME])
+    for i in df.sort_values(COL_VOL_TOTAL, ascending=False).index:
+        row = registros[i]
         setor = row["Setor"]
-        peers = resumo_df[resumo_df["Setor"] == setor]
-        n_peers = len(peers)
+        n_peers = n_peers_col[i]
         if n_peers < 2:
             continue
         if setor == "RESIDENCIAL":
             relevant = {**VOL_COLS_RESIDENCIAL, **VOL_COLS_AMBOS}
         else:
             relevant = {**VOL_COLS_EMPRESARIAL, **VOL_COLS_AMBOS}
-        vol_keys_r = [k for k in relevant if k in resumo_df.columns]
+        vol_keys_r = [k for k in relevant if k in df.columns]
         strengths, weaknesses = [], []
         for k in vol_keys_r:
             val = row.get(k, 0)
             if pd.isna(val) or val == 0:
                 continue
-            rank = int((peers[k].fillna(0) > val).sum() + 1)
+            rank = int(ranks.at[i, k])
             if rank == 1:
                 strengths.append(relevant[k])
             elif rank >= n_peers:
                 weaknesses.append(relevant[k])
-        avg_vol = peers[COL_VOL_TOTAL].mean()
+        avg_vol = avg_vol_col[i]
         vol_diff = ((row[COL_VOL_TOTAL] / avg_vol - 1) * 100) if avg_vol > 0 else 0
-        vol_rank = int((peers[COL_VOL_TOTAL].fillna(0) > row[COL_VOL_TOTAL]).sum() + 1)
+        vol_rank = int(ranks.at[i, COL_VOL_TOTAL])
         dpa_val = row.get("DPA_Media", None)
         data.append({
-            "nome": nome, "setor": setor, "login": row[COL_LOGIN],
+            "nome": nomes[i], "setor": setor, "login": row[COL_LOGIN],
             "vol_total": row[COL_VOL_TOTAL], "media_diaria": row.get("Media_Diaria", 0),
             "dias": row.get("Dias_Trabalhados", 0), "vol_diff": vol_diff,
             "vol_rank": vol_rank, "dpa": dpa_val,
@@ -324,7 +324,7 @@ def render_sector_table(resumo_df, sector_name, sector_vol, sector_cmap):
     base = [COL_NOME, COL_VOL_TOTAL, "Dias_Trabalhados", "Media_Diaria", "DPA_Media"]
     base_avail = [c for c in base if c in df_sec.columns]
     detail = df_sec[base_avail + vol_keys].copy()
-    detail["Nome"] = detail[COL_NOME].apply(primeiro_nome)
+    detail["Nome"] = primeiros_nomes(detail[COL_NOME])
     avg_vol = detail[COL_VOL_TOTAL].mean()
     detail["vs Média"] = ((detail[COL_VOL_TOTAL] / avg_vol - 1) * 100).round(1) if avg_vol > 0 else 0.0
     disp_cols = ["Nome", COL_VOL_TOTAL, "Dias_Trabalhados", "Media_Diaria", "vs Média", "DPA_Media"] + vol_keys
@@ -388,6 +388,9 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+if warmup.aquecendo():
+    st.info("⏳ Servidor recém-iniciado: carregando a base local na memória. A primeira tela pode demorar alguns segundos.")
+
 
 # =====================================================
 # UPLOAD
@@ -428,7 +431,7 @@ with st.container():
             type=["xlsx", "xls"],
             help=(
                 "Planilha Ocupação_DPA_2026 com abas 'Consolidado' e 'Analistas'.\n"
-                "Extrai automaticamente o mês mais recente com dados disponíveis. — opcional"
+                "Extrai automaticamente o mês mais recente com dados disponíveis (sem histórico). — opcional"
             ),
             key="upload_dpa",
         )
@@ -438,7 +441,7 @@ with st.container():
             type=["xlsx", "xls"],
             help=(
                 "Planilha Fechamento_TOA_x_SIR com assertividade de fechamentos.\n"
-                "Extrai automaticamente dados da Madrugada e mês mais recente. — opcional"
+                "Extrai automaticamente dados da Madrugada, mês a mês (período escolhido na barra lateral). — opcional"
             ),
             key="upload_fech_sir",
         )
@@ -449,7 +452,24 @@ with st.container():
             f"Residencial: {len(BASE_EQUIPE[BASE_EQUIPE['Setor']=='RESIDENCIAL'])}"
         )
 
-# Persistência no session_state
+# =====================================================
+# CARGA DAS PLANILHAS (em paralelo) → BASE LOCAL
+# =====================================================
+_LOADERS = {
+    "uploaded_bytes": ("produtividade", load_produtividade),
+    "uploaded_etit_bytes": ("etit", load_etit),
+    "uploaded_res_ind_bytes": ("res_ind", load_residencial_indicadores),
+    "uploaded_dpa_bytes": ("dpa", load_dpa_ocupacao),
+    "uploaded_toa_bytes": ("toa", load_toa_indicadores),
+    "uploaded_fech_sir_bytes": ("fech_sir", load_fechamento_toa_sir),
+}
+
+# Só parseia as planilhas que ainda não estão na base local (data/). Cada
+# upload é copiado em blocos para o spill em disco (src/spill.py) e a sessão
+# guarda só o hash; sessões que enviam o mesmo arquivo dividem a mesma entrada
+# do registro do processo — o parse acontece uma vez e as demais esperam.
+_sessao = st.session_state.setdefault("_uploads", REGISTRY.session())
+_pendentes, _chaves, _aguardando = {}, {}, []
 for key_name, file_obj in [
     ("uploaded_bytes",           uploaded_file),
     ("uploaded_etit_bytes",      uploaded_etit),
@@ -458,11 +478,78 @@ for key_name, file_obj in [
     ("uploaded_dpa_bytes",       uploaded_dpa),
     ("uploaded_fech_sir_bytes",  uploaded_fech_sir),
 ]:
-    if file_obj is not None:
-        st.session_state[key_name]          = file_obj.getvalue()
-        st.session_state[key_name + "_name"] = file_obj.name
-
-if "uploaded_bytes" not in st.session_state:
+    if file_obj is None:
+        _sessao.release(key_name)
+        continue
+    st.session_state[key_name + "_name"] = file_obj.name
+    dataset, loader = _LOADERS[key_name]
+    # Spill e hash uma vez por arquivo enviado (file_id muda a cada upload)
+    if st.session_state.get(key_name + "_file_id") != file_obj.file_id:
+        st.session_state[key_name + "_hash"] = SPILL.put(file_obj)
+        st.session_state[key_name + "_file_id"] = file_obj.file_id
+    digest = st.session_state[key_name + "_hash"]
+    fonte = STORE.source_key_for(digest)
+    _chaves[key_name] = _sessao.acquire(key_name, dataset, fonte)
+    if STORE.has_source(dataset, fonte=fonte):
+        continue
+    if REGISTRY.claim(_chaves[key_name]):
+        if not SPILL.exists(digest):
+            SPILL.put(file_obj)  # removido do spill por TTL/limite: copia de novo
+        _pendentes[key_name] = (loader, SPILL.file(digest))
+    else:
+        _aguardando.append(key_name)
+
+erros_carga = {}
+if _pendentes or _aguardando:
+    with st.spinner("Carregando e processando planilhas..."):
+        try:
+            dados_carga, erros_carga = load_all(_pendentes) if _pendentes else ({}, {})
+        except BaseException as e:
+            for chave in _pendentes:
+                REGISTRY.finish(_chaves[chave], e, repetir=True)
+            raise
+        # Falha ao gravar um dataset (conversão Arrow, disco cheio) vira erro
+        # só daquela aba; os demais seguem gravados normalmente. É passageira:
+        # o próximo rerun (ou reenvio) tenta gravar de novo
+        falhas_gravacao = set()
+        for chave, resultado in dados_carga.items():
+            dataset, fonte = _chaves[chave]
+            try:
+                if dataset == "dpa":
+                    STORE.write(dataset, resultado[0], info=resultado[1], fonte=fonte)
+                else:
+                    STORE.write(dataset, resultado, fonte=fonte)
+            except Exception as e:
+                erros_carga[chave] = e
+                falhas_gravacao.add(chave)
+        for chave in _pendentes:
+            REGISTRY.finish(_chaves[chave], erros_carga.get(chave), repetir=chave in falhas_gravacao)
+        for chave in _aguardando:
+            erro = REGISTRY.wait(_chaves[chave])
+            if erro is not None:
+                erros_carga[chave] = erro
+
+
+def _disponivel(chave):
+    """Há dados do dataset na base local (ou um erro de parse a mostrar)."""
+    return chave in erros_carga or STORE.exists(_LOADERS[chave][0])
+
+
+def _resultado_carga(chave):
+    """Dataset lido da base local; relança o erro do parse, se houve."""
+    if chave in erros_carga:
+        raise erros_carga[chave]
+    dataset = _LOADERS[chave][0]
+    if dataset == "dpa":
+        return STORE.read(dataset), STORE.info(dataset)
+    if dataset in ("toa", "fech_sir"):
+        # Histórico mês a mês em memória: {ANOMES: DataFrame}
+        return {int(mes): parte for mes, parte in STORE.partition_frames(dataset).items()}
+    return STORE.read(dataset)
+
+
+# Sem upload e sem base local: tela de boas-vindas
+if not _disponivel("uploaded_bytes"):
     st.markdown("---")
     st.markdown("### 👋 Bem-vindo!")
     st.markdown(
@@ -482,9 +569,7 @@ if "uploaded_bytes" not in st.session_state:
 # PROCESSAR DADOS — Produtividade
 # =====================================================
 try:
-    with st.spinner("Carregando e processando dados de produtividade..."):
-        file_obj = io.BytesIO(st.session_state["uploaded_bytes"])
-        df = load_produtividade(file_obj)
+    df = _resultado_carga("uploaded_bytes")
     if df.empty:
         st.error("Nenhum analista da equipe encontrado na planilha de produtividade.")
         st.stop()
@@ -501,14 +586,12 @@ except Exception as e:
 df_etit = pd.DataFrame()
 etit_loaded = False
 
-if "uploaded_etit_bytes" in st.session_state:
+if _disponivel("uploaded_etit_bytes"):
     try:
-        with st.spinner("Carregando dados ETIT POR EVENTO..."):
-            etit_obj = io.BytesIO(st.session_state["uploaded_etit_bytes"])
-            df_etit = load_etit(etit_obj)
-            etit_loaded = not df_etit.empty
-            if not etit_loaded:
-                st.warning("Nenhum analista da equipe encontrado nos dados ETIT POR EVENTO.")
+        df_etit = _resultado_carga("uploaded_etit_bytes")
+        etit_loaded = not df_etit.empty
+        if not etit_loaded:
+            st.warning("Nenhum analista da equipe encontrado nos dados ETIT POR EVENTO.")
     except Exception as e:
         st.warning(f"Erro ao processar planilha ETIT: {e}")
         with st.expander("Detalhes do erro"):
@@ -521,14 +604,12 @@ if "uploaded_etit_bytes" in st.session_state:
 df_res_ind = pd.DataFrame()
 res_ind_loaded = False
 
-if "uploaded_res_ind_bytes" in st.session_state:
+if _disponivel("uploaded_res_ind_bytes"):
     try:
-        with st.spinner("Carregando Indicadores Residencial..."):
-            res_ind_obj = io.BytesIO(st.session_state["uploaded_res_ind_bytes"])
-            df_res_ind = load_residencial_indicadores(res_ind_obj)
-            res_ind_loaded = not df_res_ind.empty
-            if not res_ind_loaded:
-                st.warning("Nenhum dado dos indicadores selecionados encontrado na planilha.")
+        df_res_ind = _resultado_carga("uploaded_res_ind_bytes")
+        res_ind_loaded = not df_res_ind.empty
+        if not res_ind_loaded:
+            st.warning("Nenhum dado dos indicadores selecionados encontrado na planilha.")
     except Exception as e:
         st.warning(f"Erro ao processar planilha de Indicadores Residencial: {e}")
         with st.expander("Detalhes do erro"):
@@ -542,14 +623,12 @@ df_dpa = pd.DataFrame()
 dpa_mes_info = {}
 dpa_loaded = False
 
-if "uploaded_dpa_bytes" in st.session_state:
+if _disponivel("uploaded_dpa_bytes"):
     try:
-        with st.spinner("Carregando Ocupação DPA..."):
-            dpa_obj = io.BytesIO(st.session_state["uploaded_dpa_bytes"])
-            df_dpa, dpa_mes_info = load_dpa_ocupacao(dpa_obj)
-            dpa_loaded = not df_dpa.empty
-            if not dpa_loaded:
-                st.warning("Nenhum analista da equipe encontrado na planilha de Ocupação DPA.")
+        df_dpa, dpa_mes_info = _resultado_carga("uploaded_dpa_bytes")
+        dpa_loaded = not df_dpa.empty
+        if not dpa_loaded:
+            st.warning("Nenhum analista da equipe encontrado na planilha de Ocupação DPA.")
     except Exception as e:
         st.warning(f"Erro ao processar planilha de Ocupação DPA: {e}")
         with st.expander("Detalhes do erro"):
@@ -560,19 +639,20 @@ if "uploaded_dpa_bytes" in st.session_state:
 # PROCESSAR DADOS — Indicadores TOA (opcional)
 # =====================================================
 df_toa = pd.DataFrame()
+toa_historico = {}
 toa_loaded = False
 toa_anomes = None
 
-if "uploaded_toa_bytes" in st.session_state:
+if _disponivel("uploaded_toa_bytes"):
     try:
-        with st.spinner("Carregando Indicadores TOA..."):
-            toa_obj = io.BytesIO(st.session_state["uploaded_toa_bytes"])
-            df_toa = load_toa_indicadores(toa_obj)
-            toa_loaded = not df_toa.empty
-            if toa_loaded and "ANOMES" in df_toa.columns:
-                toa_anomes = int(df_toa["ANOMES"].max())
-            if not toa_loaded:
-                st.warning("Nenhum analista da equipe encontrado nos Indicadores TOA.")
+        toa_historico = _resultado_carga("uploaded_toa_bytes")
+        toa_loaded = bool(toa_historico)
+        if toa_loaded:
+            # Mês mais recente por padrão; o filtro da sidebar troca a partição
+            toa_anomes = max(toa_historico)
+            df_toa = toa_historico[toa_anomes]
+        if not toa_loaded:
+            st.warning("Nenhum analista da equipe encontrado nos Indicadores TOA.")
     except Exception as e:
         st.warning(f"Erro ao processar planilha de Indicadores TOA: {e}")
         with st.expander("Detalhes do erro"):
@@ -583,18 +663,19 @@ if "uploaded_toa_bytes" in st.session_state:
 # PROCESSAR DADOS — Fechamento TOA x SIR (opcional)
 # =====================================================
 df_fech_sir = pd.DataFrame()
+fech_sir_historico = {}
 fech_sir_loaded = False
 fech_sir_anomes = None
 
-if "uploaded_fech_sir_bytes" in st.session_state:
+if _disponivel("uploaded_fech_sir_bytes"):
     try:
-        with st.spinner("Carregando Fechamento TOA x SIR (pivot cache)..."):
-            df_fech_sir = load_fechamento_toa_sir(st.session_state["uploaded_fech_sir_bytes"])
-            fech_sir_loaded = not df_fech_sir.empty
-            if fech_sir_loaded and FECH_SIR_COL_ANOMES in df_fech_sir.columns:
-                fech_sir_anomes = int(df_fech_sir[FECH_SIR_COL_ANOMES].max())
-            if not fech_sir_loaded:
-                st.warning("⚠️ Fech. TOA x SIR: nenhum analista da equipe encontrado (Madrugada).")
+        fech_sir_historico = _resultado_carga("uploaded_fech_sir_bytes")
+        fech_sir_loaded = bool(fech_sir_historico)
+        if fech_sir_loaded:
+            fech_sir_anomes = max(fech_sir_historico)
+            df_fech_sir = fech_sir_historico[fech_sir_anomes]
+        if not fech_sir_loaded:
+            st.warning("⚠️ Fech. TOA x SIR: nenhum analista da equipe encontrado (Madrugada).")
     except Exception as e:
         st.error(f"❌ Erro ao processar Fechamento TOA x SIR: {e}")
         with st.expander("Detalhes do erro Fech. TOA x SIR", expanded=True):
@@ -621,18 +702,25 @@ with st.sidebar:
         options=["Todos", "EMPRESARIAL", "RESIDENCIAL"],
     )
 
-    st.markdown("---")
-    if st.button("🗑️ Limpar dados carregados", use_container_width=True):
-        for key in [
-            "uploaded_bytes", "uploaded_bytes_name",
-            "uploaded_etit_bytes", "uploaded_etit_bytes_name",
-            "uploaded_res_ind_bytes", "uploaded_res_ind_bytes_name",
-            "uploaded_toa_bytes", "uploaded_toa_bytes_name",
-            "uploaded_dpa_bytes", "uploaded_dpa_bytes_name",
-            "uploaded_fech_sir_bytes", "uploaded_fech_sir_bytes_name",
-        ]:
-            st.session_state.pop(key, None)
-        st.rerun()
+    # Período dos indicadores TOA e do Fech. TOA x SIR: troca de partição em memória
+    if len(toa_historico) > 1:
+        toa_anomes = st.selectbox(
+            "Período (TOA)",
+            options=sorted(toa_historico),
+            index=len(toa_historico) - 1,
+            format_func=str,
+            key="toa_mes_filter",
+        )
+        df_toa = toa_historico[toa_anomes]
+    if len(fech_sir_historico) > 1:
+        fech_sir_anomes = st.selectbox(
+            "Período (Fech. TOA x SIR)",
+            options=sorted(fech_sir_historico),
+            index=len(fech_sir_historico) - 1,
+            format_func=str,
+            key="fech_sir_mes_filter",
+        )
+        df_fech_sir = fech_sir_historico[fech_sir_anomes]
 
     st.markdown("---")
     st.markdown("### 📊 Equipe")
@@ -647,6 +735,10 @@ with st.sidebar:
 
     st.markdown("---")
     st.markdown("### 📋 Status dos dados")
+    if warmup.STATUS["erro"] is not None:
+        st.caption(f"Aquecimento da base falhou ({warmup.STATUS['erro']}); dados carregados sob demanda.")
+    elif warmup.STATUS["segundos"] is not None:
+        st.caption(f"Base local aquecida em {warmup.STATUS['segundos']:.1f}s na subida do servidor.")
     if etit_loaded:
         st.success(f"✅ ETIT: {len(df_etit)} eventos")
     if res_ind_loaded:
@@ -669,7 +761,7 @@ with st.sidebar:
             f"✅ Fech. TOA x SIR {fech_sir_anomes} 🌙: "
             f"{_n_total} tarefas · {_pct_sir:.1f}% assertivo"
         )
-    elif "uploaded_fech_sir_bytes" in st.session_state:
+    elif _disponivel("uploaded_fech_sir_bytes"):
         st.warning("⚠️ Fech. TOA x SIR: carregado mas sem dados da equipe")
 
     # Filtro Indicadores Residencial
@@ -699,32 +791,51 @@ with st.sidebar:
 # =====================================================
 # APLICAR FILTROS
 # =====================================================
-df_filtrado = df.copy()
-if mes_selecionado != "Todos":
-    df_filtrado = df_filtrado[df_filtrado[COL_ANOMES] == mes_selecionado]
-if setor_selecionado != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["Setor"] == setor_selecionado]
-
-df_etit_filtrado = df_etit.copy()
+# Recortes pelos índices da base local (STORE.select): sem cópia do dataset
+# inteiro a cada rerun — só as linhas selecionadas são copiadas
+filtro_prod = {
+    COL_ANOMES: None if mes_selecionado == "Todos" else mes_selecionado,
+    "Setor": None if setor_selecionado == "Todos" else setor_selecionado,
+}
+df_filtrado = STORE.select("produtividade", filtro_prod)
+
+df_etit_filtrado = df_etit
 if etit_loaded:
-    if mes_selecionado != "Todos" and ETIT_COL_ANOMES in df_etit_filtrado.columns:
-        df_etit_filtrado = df_etit_filtrado[df_etit_filtrado[ETIT_COL_ANOMES] == str(mes_selecionado)]
-    if setor_selecionado != "Todos":
-        df_etit_filtrado = df_etit_filtrado[df_etit_filtrado["Setor"] == setor_selecionado]
-    if analista_selecionado != "Todos":
-        df_etit_filtrado = df_etit_filtrado[df_etit_filtrado[ETIT_COL_LOGIN] == analista_selecionado]
-
-df_res_filtrado = df_res_ind.copy()
+    df_etit_filtrado = STORE.select("etit", {
+        ETIT_COL_ANOMES: (
+            str(mes_selecionado)
+            if mes_selecionado != "Todos" and ETIT_COL_ANOMES in df_etit.columns else None
+        ),
+        "Setor": None if setor_selecionado == "Todos" else setor_selecionado,
+        ETIT_COL_LOGIN: None if analista_selecionado == "Todos" else analista_selecionado,
+    })
+
+df_res_filtrado = df_res_ind
 if res_ind_loaded:
-    if res_mes_sel != "Todos" and RES_ANOMES in df_res_filtrado.columns:
-        df_res_filtrado = df_res_filtrado[df_res_filtrado[RES_ANOMES] == str(res_mes_sel)]
-    if res_ind_selecionado != "Todos":
-        df_res_filtrado = df_res_filtrado[df_res_filtrado[RES_COL_INDICADOR_NOME] == res_ind_selecionado]
+    df_res_filtrado = STORE.select("res_ind", {
+        RES_ANOMES: str(res_mes_sel) if res_mes_sel != "Todos" and RES_ANOMES in df_res_ind.columns else None,
+        RES_COL_INDICADOR_NOME: None if res_ind_selecionado == "Todos" else res_ind_selecionado,
+    })
+
+# Mesmos recortes para as quebras de src/query.py (SQL sobre a base local, se houver DuckDB)
+recorte_etit = dict(
+    particoes=None if mes_selecionado == "Todos" else [mes_selecionado],
+    filtros={
+        "Setor": None if setor_selecionado == "Todos" else setor_selecionado,
+        ETIT_COL_LOGIN: None if analista_selecionado == "Todos" else analista_selecionado,
+    },
+)
+recorte_res = dict(
+    particoes=None if res_mes_sel == "Todos" else [res_mes_sel],
+    filtros={RES_COL_INDICADOR_NOME: None if res_ind_selecionado == "Todos" else res_ind_selecionado},
+)
+recorte_toa = dict(particoes=[toa_anomes] if toa_anomes else None)
+recorte_fech_sir = dict(particoes=[fech_sir_anomes] if fech_sir_anomes else None)
 
 # DPA não precisa de filtro — já é o mês mais recente detectado automaticamente
-df_dpa_filtrado = df_dpa.copy()
+df_dpa_filtrado = df_dpa
 if dpa_loaded and setor_selecionado != "Todos":
-    df_dpa_filtrado = df_dpa_filtrado[df_dpa_filtrado["Setor"] == setor_selecionado]
+    df_dpa_filtrado = STORE.select("dpa", {"Setor": setor_selecionado})
 
 
 # =====================================================
@@ -776,7 +887,7 @@ if dpa_loaded:
 # VISÃO INDIVIDUAL
 # =====================================================
 if analista_selecionado != "Todos":
-    df_analista = df_filtrado[df_filtrado[COL_LOGIN] == analista_selecionado]
+    df_analista = STORE.select("produtividade", {**filtro_prod, COL_LOGIN: analista_selecionado})
     if not df_analista.empty:
         nome_analista = df_analista[COL_NOME].iloc[0]
         st.markdown(f'<div class="section-header">👤 Detalhe: {nome_analista}</div>', unsafe_allow_html=True)
@@ -848,49 +959,26 @@ if analista_selecionado != "Todos":
 
 
 # =====================================================
-# TABS PRINCIPAIS
+# SEÇÕES PRINCIPAIS
 # =====================================================
-tab_labels = [
-    "🏆 Ranking",
-    "👑 Líderes",
-    "📅 Evolução Diária",
-    "🔍 Composição",
-    "📋 Dados Detalhados",
-]
-if etit_loaded:
-    tab_labels.append("⚡ ETIT por Evento")
-if res_ind_loaded:
-    tab_labels.append("🏠 Indicadores Residencial")
-if toa_loaded:
-    tab_labels.append("📋 Indicadores TOA")
-if dpa_loaded:
-    tab_labels.append("📊 Ocupação DPA")
-if fech_sir_loaded:
-    tab_labels.append("🌙 Fechamento TOA x SIR")
-
-tabs = st.tabs(tab_labels)
-
-_base_tabs = 5
-_tab_etit_idx  = _base_tabs if etit_loaded else None
-_tab_res_idx   = (_base_tabs + (1 if etit_loaded else 0)) if res_ind_loaded else None
-_tab_toa_idx   = (
-    _base_tabs + (1 if etit_loaded else 0) + (1 if res_ind_loaded else 0)
-) if toa_loaded else None
-_tab_dpa_idx   = (
-    _base_tabs + (1 if etit_loaded else 0) + (1 if res_ind_loaded else 0) + (1 if toa_loaded else 0)
-) if dpa_loaded else None
-_tab_fech_sir_idx = (
-    _base_tabs
-    + (1 if etit_loaded else 0)
-    + (1 if res_ind_loaded else 0)
-    + (1 if toa_loaded else 0)
-    + (1 if dpa_loaded else 0)
-) if fech_sir_loaded else None
+# Cada seção é uma função registrada aqui e só a escolhida no seletor roda no
+# rerun: as agregações, tabelas estilizadas e CSVs das outras não são calculados.
+_SECOES = {}
+
+
+def _secao(rotulo, disponivel=True):
+    """Registra a função que desenha a seção (se os dados dela foram carregados)."""
+    def registra(func):
+        if disponivel:
+            _SECOES[rotulo] = func
+        return func
+    return registra
 
 
 # ---- TAB 1: RANKING ----
-with tabs[0]:
-    resumo = resumo_geral(df_filtrado)
+@_secao("🏆 Ranking")
+def _secao_ranking():
+    resumo = resumo_produtividade(df_filtrado, mes_selecionado, setor_selecionado)
     if not resumo.empty:
         resumo_equipe = resumo[~resumo[COL_LOGIN].isin(LIDERES_IDS)].copy()
 
@@ -898,7 +986,7 @@ with tabs[0]:
         with col_rank1:
             st.markdown("#### 📦 Ranking por Volume Total")
             rank_vol = resumo_equipe[[COL_LOGIN, COL_NOME, "Setor", COL_VOL_TOTAL, "Dias_Trabalhados", "Media_Diaria"]].copy()
-            rank_vol["Nome"] = rank_vol[COL_NOME].apply(primeiro_nome)
+            rank_vol["Nome"] = primeiros_nomes(rank_vol[COL_NOME])
             rank_vol = rank_vol.sort_values(COL_VOL_TOTAL, ascending=False).reset_index(drop=True)
             rank_vol.index += 1; rank_vol.index.name = "#"
             display_vol = rank_vol[["Nome", "Setor", COL_VOL_TOTAL, "Dias_Trabalhados", "Media_Diaria"]].copy()
@@ -922,7 +1010,7 @@ with tabs[0]:
                 )
 
                 # Adicionar semáforo
-                rank_dpa_of["Status"] = rank_dpa_of["DPA %"].apply(_dpa_semaforo)
+                rank_dpa_of["Status"] = por_valor(rank_dpa_of["DPA %"], _dpa_semaforo)
                 rank_dpa_of = rank_dpa_of[["Status", "Analista", "Setor", "DPA %"]]
                 st.dataframe(
                     rank_dpa_of.style
@@ -932,7 +1020,7 @@ with tabs[0]:
                 )
             else:
                 rank_dpa = resumo_equipe[[COL_LOGIN, COL_NOME, "Setor", "DPA_Media"]].copy()
-                rank_dpa["Nome"] = rank_dpa[COL_NOME].apply(primeiro_nome)
+                rank_dpa["Nome"] = primeiros_nomes(rank_dpa[COL_NOME])
                 rank_dpa = rank_dpa.dropna(subset=["DPA_Media"])
                 rank_dpa = rank_dpa.sort_values("DPA_Media", ascending=False).reset_index(drop=True)
                 rank_dpa.index += 1; rank_dpa.index.name = "#"
@@ -947,7 +1035,7 @@ with tabs[0]:
 
         st.markdown("#### 📊 Ranking por Média Diária")
         rank_media = resumo_equipe[[COL_NOME, "Media_Diaria"]].copy()
-        rank_media["Nome"] = rank_media[COL_NOME].apply(primeiro_nome)
+        rank_media["Nome"] = primeiros_nomes(rank_media[COL_NOME])
         chart_data = rank_media[["Nome", "Media_Diaria"]].set_index("Nome").sort_values("Media_Diaria")
         st.bar_chart(chart_data, horizontal=True, color=COR_PRIMARIA, height=500)
 
@@ -965,8 +1053,9 @@ with tabs[0]:
 
 
 # ---- TAB LÍDERES ----
-with tabs[1]:
-    resumo_full = resumo_geral(df_filtrado)
+@_secao("👑 Líderes")
+def _secao_lideres():
+    resumo_full = resumo_produtividade(df_filtrado, mes_selecionado, setor_selecionado)
     resumo_lid = resumo_full[resumo_full[COL_LOGIN].isin(LIDERES_IDS)].copy()
     resumo_equipe_all = resumo_full[~resumo_full[COL_LOGIN].isin(LIDERES_IDS)].copy()
 
@@ -1024,7 +1113,7 @@ with tabs[1]:
         base_cols_lid = [COL_NOME, "Setor", COL_VOL_TOTAL, "Dias_Trabalhados", "Media_Diaria", "DPA_Media"]
         avail_lid = [c for c in base_cols_lid if c in resumo_lid.columns]
         det_lid = resumo_lid[avail_lid + vol_keys_lid].copy()
-        det_lid[COL_NOME] = det_lid[COL_NOME].apply(primeiro_nome)
+        det_lid[COL_NOME] = primeiros_nomes(det_lid[COL_NOME])
         rename_lid = {
             COL_NOME: "Líder", "Setor": "Setor", COL_VOL_TOTAL: "Vol. Total",
             "Dias_Trabalhados": "Dias", "Media_Diaria": "Média/Dia", "DPA_Media": "DPA %",
@@ -1054,7 +1143,7 @@ with tabs[1]:
                 st.markdown(f"#### 🌙 Fechamento TOA x SIR — Madrugada ({fech_sir_anomes}) — Líderes")
                 _fl = fech_sir_resumo_analista(_fech_lid)
                 if not _fl.empty:
-                    _fl["Analista"] = _fl["Nome"].apply(primeiro_nome)
+                    _fl["Analista"] = primeiros_nomes(_fl["Nome"])
                     _fl_show = _fl[["Analista", "Setor", "Volume", "Assertivos", "Assertividade_Pct"]].copy()
                     _fl_show.columns = ["Analista", "Setor", "Tarefas", "Assertivos", "Assertividade %"]
                     _fl_show = _fl_show.reset_index(drop=True)
@@ -1071,7 +1160,8 @@ with tabs[1]:
 
 
 # ---- TAB 2: EVOLUÇÃO DIÁRIA ----
-with tabs[2]:
+@_secao("📅 Evolução Diária")
+def _secao_evolucao():
     daily = evolucao_diaria(df_filtrado)
     if not daily.empty:
         st.markdown("#### Volume Total da Equipe por Dia")
@@ -1085,18 +1175,19 @@ with tabs[2]:
     if len(meses_unicos) > 1 and mes_selecionado == "Todos":
         st.markdown("---")
         st.markdown("#### 📅 Comparação Mensal por Analista")
-        mensal = resumo_mensal(df_filtrado)
+        mensal = resumo_produtividade(df_filtrado, mes_selecionado, setor_selecionado, mensal=True)
         if not mensal.empty:
             pivot = mensal.pivot_table(
                 index=COL_NOME, columns=COL_MES, values="Media_Diaria", aggfunc="first"
             ).reset_index()
-            pivot["Nome"] = pivot[COL_NOME].apply(primeiro_nome)
+            pivot["Nome"] = primeiros_nomes(pivot[COL_NOME])
             pivot = pivot.drop(columns=[COL_NOME])
             st.dataframe(pivot, use_container_width=True, hide_index=True)
 
 
 # ---- TAB 3: COMPOSIÇÃO ----
-with tabs[3]:
+@_secao("🔍 Composição")
+def _secao_composicao():
     comp = composicao_volume(df_filtrado)
     if not comp.empty:
         st.markdown("#### Distribuição por Tipo de Atividade")
@@ -1115,7 +1206,7 @@ with tabs[3]:
     if setor_selecionado == "Todos":
         st.markdown("#### Comparação por Setor")
         for setor in ["EMPRESARIAL", "RESIDENCIAL"]:
-            df_setor = df_filtrado[df_filtrado["Setor"] == setor]
+            df_setor = STORE.select("produtividade", {**filtro_prod, "Setor": setor})
             if not df_setor.empty:
                 comp_setor = composicao_volume(df_setor)
                 if not comp_setor.empty:
@@ -1129,9 +1220,10 @@ with tabs[3]:
 
 
 # ---- TAB 4: DADOS DETALHADOS ----
-with tabs[4]:
+@_secao("📋 Dados Detalhados")
+def _secao_dados_detalhados():
     st.markdown("#### Resumo por Analista")
-    resumo_det = resumo_geral(df_filtrado)
+    resumo_det = resumo_produtividade(df_filtrado, mes_selecionado, setor_selecionado)
     if not resumo_det.empty:
         display_cols = [COL_NOME, "Setor", "Dias_Trabalhados", COL_VOL_TOTAL, "Media_Diaria", "DPA_Media"]
         display_labels = ["Analista", "Setor", "Dias", "Vol. Total", "Média/Dia", "DPA Calc. %"]
@@ -1159,990 +1251,1027 @@ with tabs[4]:
     csv = df_filtrado[cols_existing].to_csv(index=False).encode("utf-8")
     st.download_button("📥 Baixar dados filtrados (CSV)", csv, "produtividade_equipe.csv", "text/csv")
 
+    # O que mudou entre as duas últimas cargas (planilha reenviada corrigida)
+    _versionados = {
+        rotulo: ds for rotulo, ds in [("Produtividade", "produtividade"), ("ETIT", "etit")]
+        if len(STORE.versions(ds)) > 1
+    }
+    if _versionados:
+        st.markdown("---")
+        st.markdown("#### 🔄 O que mudou desde o envio anterior")
+        _rotulo_diff = st.radio("Planilha", list(_versionados), horizontal=True, key="diff_dataset")
+        _ds_diff = _versionados[_rotulo_diff]
+        _v_ant, _v_atu = STORE.versions(_ds_diff)[-2:]
+        st.caption(
+            f"Envio de {_v_atu['data'].replace('T', ' ')} ({_v_atu['linhas']:,} linhas) comparado ao de "
+            f"{_v_ant['data'].replace('T', ' ')} ({_v_ant['linhas']:,} linhas)"
+        )
+        mudancas = STORE.diff(_ds_diff)
+        _contagem = mudancas["Mudança"].value_counts() if not mudancas.empty else pd.Series(dtype=int)
+        col_d1, col_d2, col_d3 = st.columns(3)
+        col_d1.metric("Linhas incluídas", f"{_contagem.get('Incluída', 0):,}")
+        col_d2.metric("Linhas removidas", f"{_contagem.get('Removida', 0):,}")
+        col_d3.metric("Linhas alteradas", f"{_contagem.get('Depois', 0):,}")
+        if mudancas.empty:
+            st.info("Nenhuma linha mudou entre os dois envios.")
+        else:
+            st.dataframe(mudancas, use_container_width=True, hide_index=True, height=400)
+
 
 # ---- TAB 5: ETIT POR EVENTO ----
-if etit_loaded and _tab_etit_idx is not None:
-    with tabs[_tab_etit_idx]:
-        st.markdown("#### ⚡ ETIT POR EVENTO — Análise da Equipe")
-        if df_etit_filtrado.empty:
-            st.warning("Nenhum dado ETIT POR EVENTO encontrado com os filtros atuais.")
-        else:
-            etit_total_eventos = df_etit_filtrado[ETIT_COL_VOLUME].sum()
-            etit_total_ader = df_etit_filtrado[ETIT_COL_INDICADOR_VAL].sum()
-            etit_pct_ader = (etit_total_ader / etit_total_eventos * 100) if etit_total_eventos > 0 else 0
-            etit_n_analistas = df_etit_filtrado[ETIT_COL_LOGIN].nunique()
-            etit_tma_geral = df_etit_filtrado[ETIT_COL_TMA].mean()
-            etit_tmr_geral = df_etit_filtrado[ETIT_COL_TMR].mean()
-
-            ek1, ek2, ek3, ek4, ek5, ek6 = st.columns(6)
-            with ek1:
-                st.markdown(kpi_card("Total Eventos", f"{etit_total_eventos:,.0f}", "#8E44AD"), unsafe_allow_html=True)
-            with ek2:
-                st.markdown(kpi_card("Aderentes", f"{etit_total_ader:,.0f}", COR_SUCESSO), unsafe_allow_html=True)
-            with ek3:
-                ad_c = COR_SUCESSO if etit_pct_ader >= 90 else (COR_ALERTA if etit_pct_ader >= 70 else COR_PERIGO)
-                st.markdown(kpi_card("Aderência", f"{etit_pct_ader:.1f}", ad_c, suffix="%"), unsafe_allow_html=True)
-            with ek4:
-                st.markdown(kpi_card("Analistas", f"{etit_n_analistas}", COR_INFO), unsafe_allow_html=True)
-            with ek5:
-                st.markdown(kpi_card("TMA Médio", f"{etit_tma_geral:.4f}", COR_PRIMARIA), unsafe_allow_html=True)
-            with ek6:
-                st.markdown(kpi_card("TMR Médio", f"{etit_tmr_geral:.4f}", COR_ALERTA), unsafe_allow_html=True)
-
-            st.markdown("##### 🏆 Ranking ETIT por Analista")
-            resumo_etit = etit_resumo_analista(df_etit_filtrado)
-            if not resumo_etit.empty:
-                disp_etit = resumo_etit.copy()
-                disp_etit["Nome"] = disp_etit["Nome"].apply(primeiro_nome)
-                disp_cols_etit = ["Nome", "Setor", "Total_Eventos", "Eventos_Aderentes",
-                                  "Aderencia_Pct", "RAL_Count", "REC_Count", "TMA_Medio", "TMR_Medio"]
-                disp_cols_etit = [c for c in disp_cols_etit if c in disp_etit.columns]
-                tbl_etit = disp_etit[disp_cols_etit].copy()
-                tbl_etit.columns = [
-                    c.replace("Total_Eventos","Eventos").replace("Eventos_Aderentes","Aderentes")
-                     .replace("Aderencia_Pct","Aderência %").replace("RAL_Count","RAL")
-                     .replace("REC_Count","REC").replace("TMA_Medio","TMA").replace("TMR_Medio","TMR")
-                    for c in disp_cols_etit
-                ]
-                tbl_etit = tbl_etit.reset_index(drop=True); tbl_etit.index += 1; tbl_etit.index.name = "#"
-                styled_etit = tbl_etit.style.format({"Aderência %": "{:.1f}", "TMA": "{:.4f}", "TMR": "{:.4f}"}, na_rep="—")
-                styled_etit = styled_etit.background_gradient(cmap="Purples", subset=["Eventos"])
-                if "Aderência %" in tbl_etit.columns and tbl_etit["Aderência %"].notna().any():
-                    styled_etit = styled_etit.background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100)
-                st.dataframe(styled_etit, use_container_width=True)
-
-            col_dem, col_tipo = st.columns(2)
-            with col_dem:
-                st.markdown("**Por Demanda (RAL/REC)**")
-                dem = etit_por_demanda(df_etit_filtrado)
-                if not dem.empty:
-                    dem["Aderência %"] = (dem["Aderentes"] / dem["Eventos"] * 100).round(1)
-                    st.dataframe(
-                        dem.rename(columns={"TMA_Medio": "TMA", "TMR_Medio": "TMR"})
-                           .style.format({"Aderência %": "{:.1f}", "TMA": "{:.4f}", "TMR": "{:.4f}"}, na_rep="—"),
-                        use_container_width=True, hide_index=True,
+@_secao("⚡ ETIT por Evento", etit_loaded)
+def _secao_etit():
+    st.markdown("#### ⚡ ETIT POR EVENTO — Análise da Equipe")
+    if df_etit_filtrado.empty:
+        st.warning("Nenhum dado ETIT POR EVENTO encontrado com os filtros atuais.")
+    else:
+        etit_total_eventos = df_etit_filtrado[ETIT_COL_VOLUME].sum()
+        etit_total_ader = df_etit_filtrado[ETIT_COL_INDICADOR_VAL].sum()
+        etit_pct_ader = (etit_total_ader / etit_total_eventos * 100) if etit_total_eventos > 0 else 0
+        etit_n_analistas = df_etit_filtrado[ETIT_COL_LOGIN].nunique()
+        etit_tma_geral = df_etit_filtrado[ETIT_COL_TMA].mean()
+        etit_tmr_geral = df_etit_filtrado[ETIT_COL_TMR].mean()
+
+        ek1, ek2, ek3, ek4, ek5, ek6 = st.columns(6)
+        with ek1:
+            st.markdown(kpi_card("Total Eventos", f"{etit_total_eventos:,.0f}", "#8E44AD"), unsafe_allow_html=True)
+        with ek2:
+            st.markdown(kpi_card("Aderentes", f"{etit_total_ader:,.0f}", COR_SUCESSO), unsafe_allow_html=True)
+        with ek3:
+            ad_c = COR_SUCESSO if etit_pct_ader >= 90 else (COR_ALERTA if etit_pct_ader >= 70 else COR_PERIGO)
+            st.markdown(kpi_card("Aderência", f"{etit_pct_ader:.1f}", ad_c, suffix="%"), unsafe_allow_html=True)
+        with ek4:
+            st.markdown(kpi_card("Analistas", f"{etit_n_analistas}", COR_INFO), unsafe_allow_html=True)
+        with ek5:
+            st.markdown(kpi_card("TMA Médio", f"{etit_tma_geral:.4f}", COR_PRIMARIA), unsafe_allow_html=True)
+        with ek6:
+            st.markdown(kpi_card("TMR Médio", f"{etit_tmr_geral:.4f}", COR_ALERTA), unsafe_allow_html=True)
+
+        st.markdown("##### 🏆 Ranking ETIT por Analista")
+        resumo_etit = quebra("etit_resumo_analista", df_etit_filtrado, **recorte_etit)
+        if not resumo_etit.empty:
+            disp_etit = resumo_etit.copy()
+            disp_etit["Nome"] = primeiros_nomes(disp_etit["Nome"])
+            disp_cols_etit = ["Nome", "Setor", "Total_Eventos", "Eventos_Aderentes",
+                              "Aderencia_Pct", "RAL_Count", "REC_Count", "TMA_Medio", "TMR_Medio"]
+            disp_cols_etit = [c for c in disp_cols_etit if c in disp_etit.columns]
+            tbl_etit = disp_etit[disp_cols_etit].copy()
+            tbl_etit.columns = [
+                c.replace("Total_Eventos","Eventos").replace("Eventos_Aderentes","Aderentes")
+                 .replace("Aderencia_Pct","Aderência %").replace("RAL_Count","RAL")
+                 .replace("REC_Count","REC").replace("TMA_Medio","TMA").replace("TMR_Medio","TMR")
+                for c in disp_cols_etit
+            ]
+            tbl_etit = tbl_etit.reset_index(drop=True); tbl_etit.index += 1; tbl_etit.index.name = "#"
+            styled_etit = tbl_etit.style.format({"Aderência %": "{:.1f}", "TMA": "{:.4f}", "TMR": "{:.4f}"}, na_rep="—")
+            styled_etit = styled_etit.background_gradient(cmap="Purples", subset=["Eventos"])
+            if "Aderência %" in tbl_etit.columns and tbl_etit["Aderência %"].notna().any():
+                styled_etit = styled_etit.background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100)
+            st.dataframe(styled_etit, use_container_width=True)
+
+        col_dem, col_tipo = st.columns(2)
+        with col_dem:
+            st.markdown("**Por Demanda (RAL/REC)**")
+            dem = quebra("etit_por_demanda", df_etit_filtrado, **recorte_etit)
+            if not dem.empty:
+                dem["Aderência %"] = (dem["Aderentes"] / dem["Eventos"] * 100).round(1)
+                st.dataframe(
+                    dem.rename(columns={"TMA_Medio": "TMA", "TMR_Medio": "TMR"})
+                       .style.format({"Aderência %": "{:.1f}", "TMA": "{:.4f}", "TMR": "{:.4f}"}, na_rep="—"),
+                    use_container_width=True, hide_index=True,
+                )
+        with col_tipo:
+            st.markdown("**Por Tipo**")
+            tipo = quebra("etit_por_tipo", df_etit_filtrado, **recorte_etit)
+            if not tipo.empty:
+                tipo["Aderência %"] = (tipo["Aderentes"] / tipo["Eventos"] * 100).round(1)
+                st.dataframe(
+                    tipo.style.format({"Aderência %": "{:.1f}"}, na_rep="—")
+                        .background_gradient(cmap="Purples", subset=["Eventos"]),
+                    use_container_width=True, hide_index=True,
+                )
+
+        col_causa, col_reg = st.columns(2)
+        with col_causa:
+            st.markdown("**Por Causa**")
+            causa = quebra("etit_por_causa", df_etit_filtrado, **recorte_etit)
+            if not causa.empty:
+                causa["Aderência %"] = (causa["Aderentes"] / causa["Eventos"] * 100).round(1)
+                st.dataframe(
+                    causa.head(15).style.format({"Aderência %": "{:.1f}"}, na_rep="—")
+                        .background_gradient(cmap="Purples", subset=["Eventos"]),
+                    use_container_width=True, hide_index=True,
+                )
+        with col_reg:
+            st.markdown(f"**Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}**")
+            if ETIT_COL_GRUPO in _etit_eq.columns:
+                _gg_geral = _etit_eq.groupby(ETIT_COL_GRUPO).agg(
+                    Eventos=(ETIT_COL_VOLUME, "sum"),
+                    Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
+                ).reset_index().rename(columns={ETIT_COL_GRUPO: "Grupo"})
+                _gg_geral["Aderência %"] = (_gg_geral["Aderentes"] / _gg_geral["Eventos"] * 100).round(1)
+                _gg_geral = _gg_geral.sort_values("Eventos", ascending=False).reset_index(drop=True)
+                if not _gg_geral.empty:
+                    _bg_e = _gg_geral.loc[_gg_geral["Aderência %"].idxmax()]
+                    _bw_e = _gg_geral.loc[_gg_geral["Aderência %"].idxmin()]
+                    st.caption(
+                        f"🟢 Melhor: **{_bg_e['Grupo']}** ({_bg_e['Aderência %']:.1f}%) · "
+                        f"🔴 Pior: **{_bw_e['Grupo']}** ({_bw_e['Aderência %']:.1f}%)"
                     )
-            with col_tipo:
-                st.markdown("**Por Tipo**")
-                tipo = etit_por_tipo(df_etit_filtrado)
-                if not tipo.empty:
-                    tipo["Aderência %"] = (tipo["Aderentes"] / tipo["Eventos"] * 100).round(1)
                     st.dataframe(
-                        tipo.style.format({"Aderência %": "{:.1f}"}, na_rep="—")
+                        _gg_geral.style.format({"Aderência %": "{:.1f}"}, na_rep="—")
+                            .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100)
                             .background_gradient(cmap="Purples", subset=["Eventos"]),
                         use_container_width=True, hide_index=True,
                     )
 
-            col_causa, col_reg = st.columns(2)
-            with col_causa:
-                st.markdown("**Por Causa**")
-                causa = etit_por_causa(df_etit_filtrado)
-                if not causa.empty:
-                    causa["Aderência %"] = (causa["Aderentes"] / causa["Eventos"] * 100).round(1)
-                    st.dataframe(
-                        causa.head(15).style.format({"Aderência %": "{:.1f}"}, na_rep="—")
-                            .background_gradient(cmap="Purples", subset=["Eventos"]),
-                        use_container_width=True, hide_index=True,
-                    )
-            with col_reg:
-                st.markdown(f"**Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}**")
-                if ETIT_COL_GRUPO in _etit_eq.columns:
-                    _gg_geral = _etit_eq.groupby(ETIT_COL_GRUPO).agg(
-                        Eventos=(ETIT_COL_VOLUME, "sum"),
-                        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-                    ).reset_index().rename(columns={ETIT_COL_GRUPO: "Grupo"})
-                    _gg_geral["Aderência %"] = (_gg_geral["Aderentes"] / _gg_geral["Eventos"] * 100).round(1)
-                    _gg_geral = _gg_geral.sort_values("Eventos", ascending=False).reset_index(drop=True)
-                    if not _gg_geral.empty:
-                        _bg_e = _gg_geral.loc[_gg_geral["Aderência %"].idxmax()]
-                        _bw_e = _gg_geral.loc[_gg_geral["Aderência %"].idxmin()]
-                        st.caption(
-                            f"🟢 Melhor: **{_bg_e['Grupo']}** ({_bg_e['Aderência %']:.1f}%) · "
-                            f"🔴 Pior: **{_bw_e['Grupo']}** ({_bw_e['Aderência %']:.1f}%)"
-                        )
-                        st.dataframe(
-                            _gg_geral.style.format({"Aderência %": "{:.1f}"}, na_rep="—")
-                                .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100)
-                                .background_gradient(cmap="Purples", subset=["Eventos"]),
-                            use_container_width=True, hide_index=True,
-                        )
+        st.markdown("**Por Turno**")
+        turno = quebra("etit_por_turno", df_etit_filtrado, **recorte_etit)
+        if not turno.empty:
+            turno["Aderência %"] = (turno["Aderentes"] / turno["Eventos"] * 100).round(1)
+            col_t1, col_t2 = st.columns([1, 2])
+            with col_t1:
+                st.dataframe(turno.style.format({"Aderência %": "{:.1f}"}, na_rep="—"),
+                             use_container_width=True, hide_index=True)
+            with col_t2:
+                st.bar_chart(turno[["Turno", "Eventos"]].set_index("Turno"), color="#8E44AD", height=250)
 
-            st.markdown("**Por Turno**")
-            turno = etit_por_turno(df_etit_filtrado)
-            if not turno.empty:
-                turno["Aderência %"] = (turno["Aderentes"] / turno["Eventos"] * 100).round(1)
-                col_t1, col_t2 = st.columns([1, 2])
-                with col_t1:
-                    st.dataframe(turno.style.format({"Aderência %": "{:.1f}"}, na_rep="—"),
-                                 use_container_width=True, hide_index=True)
-                with col_t2:
-                    st.bar_chart(turno[["Turno", "Eventos"]].set_index("Turno"), color="#8E44AD", height=250)
-
-            st.markdown("---")
-            st.markdown("##### 📅 Evolução Diária ETIT")
-            daily_etit = etit_evolucao_diaria(df_etit_filtrado)
-            if not daily_etit.empty:
-                st.area_chart(daily_etit[["Data", "Eventos"]].set_index("Data"), color="#8E44AD", height=300)
-                st.line_chart(daily_etit[["Data", "Aderencia_Pct"]].set_index("Data"), color=COR_SUCESSO, height=250)
-
-            st.markdown("---")
-            etit_show_cols = [
-                ETIT_COL_LOGIN, "Nome", "Setor", ETIT_COL_DEMANDA, ETIT_COL_NOTA,
-                ETIT_COL_STATUS, ETIT_COL_TIPO, ETIT_COL_CAUSA,
-                ETIT_COL_REGIONAL, ETIT_COL_CIDADE, ETIT_COL_UF,
-                ETIT_COL_TURNO, ETIT_COL_TMA, ETIT_COL_TMR,
-                ETIT_COL_DT_ACIONAMENTO, ETIT_COL_ANOMES,
-            ]
-            etit_show_cols = [c for c in etit_show_cols if c in df_etit_filtrado.columns]
-            st.dataframe(
-                df_etit_filtrado[etit_show_cols].sort_values(
-                    [ETIT_COL_DT_ACIONAMENTO] if ETIT_COL_DT_ACIONAMENTO in df_etit_filtrado.columns else ["Nome"],
-                    ascending=False,
-                ),
-                use_container_width=True, height=500,
-            )
-            csv_etit = df_etit_filtrado[etit_show_cols].to_csv(index=False).encode("utf-8")
-            st.download_button("📥 Baixar ETIT filtrado (CSV)", csv_etit, "etit_por_evento_equipe.csv", "text/csv")
+        st.markdown("---")
+        st.markdown("##### 📅 Evolução Diária ETIT")
+        daily_etit = quebra("etit_evolucao_diaria", df_etit_filtrado, **recorte_etit)
+        if not daily_etit.empty:
+            st.area_chart(daily_etit[["Data", "Eventos"]].set_index("Data"), color="#8E44AD", height=300)
+            st.line_chart(daily_etit[["Data", "Aderencia_Pct"]].set_index("Data"), color=COR_SUCESSO, height=250)
+
+        st.markdown("---")
+        etit_show_cols = [
+            ETIT_COL_LOGIN, "Nome", "Setor", ETIT_COL_DEMANDA, ETIT_COL_NOTA,
+            ETIT_COL_STATUS, ETIT_COL_TIPO, ETIT_COL_CAUSA,
+            ETIT_COL_REGIONAL, ETIT_COL_CIDADE, ETIT_COL_UF,
+            ETIT_COL_TURNO, ETIT_COL_TMA, ETIT_COL_TMR,
+            ETIT_COL_DT_ACIONAMENTO, ETIT_COL_ANOMES,
+        ]
+        etit_show_cols = [c for c in etit_show_cols if c in df_etit_filtrado.columns]
+        st.dataframe(
+            df_etit_filtrado[etit_show_cols].sort_values(
+                [ETIT_COL_DT_ACIONAMENTO] if ETIT_COL_DT_ACIONAMENTO in df_etit_filtrado.columns else ["Nome"],
+                ascending=False,
+            ),
+            use_container_width=True, height=500,
+        )
+        csv_etit = df_etit_filtrado[etit_show_cols].to_csv(index=False).encode("utf-8")
+        st.download_button("📥 Baixar ETIT filtrado (CSV)", csv_etit, "etit_por_evento_equipe.csv", "text/csv")
 
 
 # ---- TAB: INDICADORES RESIDENCIAL ----
-if res_ind_loaded and _tab_res_idx is not None:
-    with tabs[_tab_res_idx]:
-        st.markdown("#### 🏠 Indicadores Residencial — ETIT Fibra HFC · ETIT GPON · Reprog. GPON · Assertividade")
-        if df_res_filtrado.empty:
-            st.warning("Nenhum dado encontrado com os filtros atuais.")
-        else:
-            kpis_df = res_kpis_por_indicador(df_res_filtrado)
-            st.markdown("##### 📊 Resumo por Indicador")
-            n_cols = len(kpis_df)
-            ind_cols = st.columns(n_cols) if n_cols > 0 else []
-            for i, row in kpis_df.iterrows():
-                ind_name = row["Indicador"]
-                label = RES_IND_LABELS.get(ind_name, ind_name)
-                color = RES_IND_COLORS.get(ind_name, "#5DADE2")
-                vol = int(row["Volume"]); ader = int(row["Aderentes"]); pct = row["Aderencia_Pct"]
-                tma_str = f"TMA: {row['TMA_Medio']:.4f}" if "TMA_Medio" in row and pd.notna(row.get("TMA_Medio")) else ""
-                tmr_str = f"TMR: {row['TMR_Medio']:.4f}" if "TMR_Medio" in row and pd.notna(row.get("TMR_Medio")) else ""
-                extra = " · ".join(filter(None, [tma_str, tmr_str]))
-                pct_color = COR_SUCESSO if pct >= 90 else (COR_ALERTA if pct >= 70 else COR_PERIGO)
-                with ind_cols[i]:
-                    st.markdown(f"""<div class="res-ind-card" style="border-top-color:{color};">
+@_secao("🏠 Indicadores Residencial", res_ind_loaded)
+def _secao_res_ind():
+    st.markdown("#### 🏠 Indicadores Residencial — ETIT Fibra HFC · ETIT GPON · Reprog. GPON · Assertividade")
+    if df_res_filtrado.empty:
+        st.warning("Nenhum dado encontrado com os filtros atuais.")
+    else:
+        kpis_df = quebra("res_kpis_por_indicador", df_res_filtrado, **recorte_res)
+        st.markdown("##### 📊 Resumo por Indicador")
+        n_cols = len(kpis_df)
+        ind_cols = st.columns(n_cols) if n_cols > 0 else []
+        for i, row in kpis_df.iterrows():
+            ind_name = row["Indicador"]
+            label = RES_IND_LABELS.get(ind_name, ind_name)
+            color = RES_IND_COLORS.get(ind_name, "#5DADE2")
+            vol = int(row["Volume"]); ader = int(row["Aderentes"]); pct = row["Aderencia_Pct"]
+            tma_str = f"TMA: {row['TMA_Medio']:.4f}" if "TMA_Medio" in row and pd.notna(row.get("TMA_Medio")) else ""
+            tmr_str = f"TMR: {row['TMR_Medio']:.4f}" if "TMR_Medio" in row and pd.notna(row.get("TMR_Medio")) else ""
+            extra = " · ".join(filter(None, [tma_str, tmr_str]))
+            pct_color = COR_SUCESSO if pct >= 90 else (COR_ALERTA if pct >= 70 else COR_PERIGO)
+            with ind_cols[i]:
+                st.markdown(f"""<div class="res-ind-card" style="border-top-color:{color};">
                         <div class="ri-title">{label}</div>
                         <div class="ri-vol" style="color:{color};">{vol:,}</div>
                         <div class="ri-pct" style="color:{pct_color};">✅ {ader:,} aderentes &nbsp;·&nbsp; {pct:.1f}%</div>
                         <div class="ri-detail">{extra}</div>
                     </div>""", unsafe_allow_html=True)
 
-            st.markdown("")
-            st.markdown("##### 📈 Comparativo de Aderência por Indicador")
-            if not kpis_df.empty:
-                chart_ader = kpis_df[["Indicador", "Aderencia_Pct"]].copy()
-                chart_ader["Indicador"] = chart_ader["Indicador"].map(RES_IND_LABELS)
-                chart_ader = chart_ader.set_index("Indicador")
-                chart_ader.columns = ["Aderência %"]
-                st.bar_chart(chart_ader, color=COR_SUCESSO, height=300)
-
-            st.markdown("---")
-            ind_to_show = (
-                [res_ind_selecionado] if res_ind_selecionado != "Todos" else RES_INDICADORES_FILTRO
-            )
-            ind_to_show = [i for i in ind_to_show if i in df_res_filtrado[RES_COL_INDICADOR_NOME].unique()]
+        st.markdown("")
+        st.markdown("##### 📈 Comparativo de Aderência por Indicador")
+        if not kpis_df.empty:
+            chart_ader = kpis_df[["Indicador", "Aderencia_Pct"]].copy()
+            chart_ader["Indicador"] = chart_ader["Indicador"].map(RES_IND_LABELS)
+            chart_ader = chart_ader.set_index("Indicador")
+            chart_ader.columns = ["Aderência %"]
+            st.bar_chart(chart_ader, color=COR_SUCESSO, height=300)
 
-            for ind in ind_to_show:
-                label = RES_IND_LABELS.get(ind, ind)
-                color = RES_IND_COLORS.get(ind, "#5DADE2")
-                sub = df_res_filtrado[df_res_filtrado[RES_COL_INDICADOR_NOME] == ind]
-                if sub.empty:
-                    continue
-                vol_total = int(sub[RES_COL_VOLUME].sum())
-                ader_total = int(sub["ADERENTE"].sum())
-                pct_total = (ader_total / vol_total * 100) if vol_total > 0 else 0
-
-                with st.expander(f"🔍 {label} — {vol_total:,} registros · {pct_total:.1f}% aderência",
-                                 expanded=(len(ind_to_show) == 1)):
-                    sk1, sk2, sk3, sk4, sk5 = st.columns(5)
-                    with sk1:
-                        st.markdown(kpi_card("Volume", f"{vol_total:,}", color), unsafe_allow_html=True)
-                    with sk2:
-                        st.markdown(kpi_card("Aderentes", f"{ader_total:,}", COR_SUCESSO), unsafe_allow_html=True)
-                    with sk3:
-                        pct_c = COR_SUCESSO if pct_total >= 90 else (COR_ALERTA if pct_total >= 70 else COR_PERIGO)
-                        st.markdown(kpi_card("Aderência", f"{pct_total:.1f}", pct_c, suffix="%"), unsafe_allow_html=True)
-                    with sk4:
-                        if RES_TMA in sub.columns:
-                            st.markdown(kpi_card("TMA Médio", f"{sub[RES_TMA].mean():.4f}", COR_INFO), unsafe_allow_html=True)
-                    with sk5:
-                        if RES_TMR in sub.columns:
-                            st.markdown(kpi_card("TMR Médio", f"{sub[RES_TMR].mean():.4f}", COR_ALERTA), unsafe_allow_html=True)
-
-                    cr, cn = st.columns(2)
-                    with cr:
-                        if RES_COL_GRUPO in sub.columns:
-                            st.markdown(f"**Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}**")
-                            _rg_sub2 = sub.groupby(RES_COL_GRUPO).agg(
-                                Volume=(RES_COL_VOLUME, "sum"),
-                                Aderentes=("ADERENTE", "sum"),
-                            ).reset_index()
-                            _rg_sub2["Aderência %"] = (_rg_sub2["Aderentes"] / _rg_sub2["Volume"] * 100).round(1)
-                            _rg_sub2 = _rg_sub2.sort_values("Volume", ascending=False).reset_index(drop=True)
-                            if not _rg_sub2.empty:
-                                _rg_best2 = _rg_sub2.loc[_rg_sub2["Aderência %"].idxmax()]
-                                _rg_worst2 = _rg_sub2.loc[_rg_sub2["Aderência %"].idxmin()]
-                                st.caption(
-                                    f"🟢 Melhor: **{_rg_best2[RES_COL_GRUPO]}** ({_rg_best2['Aderência %']:.1f}%) · "
-                                    f"🔴 Pior: **{_rg_worst2[RES_COL_GRUPO]}** ({_rg_worst2['Aderência %']:.1f}%)"
-                                )
-                                st.dataframe(
-                                    _rg_sub2.style
-                                        .format({"Aderência %": "{:.1f}"}, na_rep="—")
-                                        .background_gradient(cmap="Blues", subset=["Volume"])
-                                        .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100),
-                                    use_container_width=True, hide_index=True,
-                                )
-                    with cn:
-                        st.markdown("**Por Natureza**")
-                        nat_df = res_por_natureza(sub)
-                        if not nat_df.empty:
+        st.markdown("---")
+        ind_to_show = (
+            [res_ind_selecionado] if res_ind_selecionado != "Todos" else RES_INDICADORES_FILTRO
+        )
+        ind_to_show = [i for i in ind_to_show if i in df_res_filtrado[RES_COL_INDICADOR_NOME].unique()]
+
+        for ind in ind_to_show:
+            label = RES_IND_LABELS.get(ind, ind)
+            color = RES_IND_COLORS.get(ind, "#5DADE2")
+            sub = df_res_filtrado[df_res_filtrado[RES_COL_INDICADOR_NOME] == ind]
+            if sub.empty:
+                continue
+            vol_total = int(sub[RES_COL_VOLUME].sum())
+            ader_total = int(sub["ADERENTE"].sum())
+            pct_total = (ader_total / vol_total * 100) if vol_total > 0 else 0
+
+            with st.expander(f"🔍 {label} — {vol_total:,} registros · {pct_total:.1f}% aderência",
+                             expanded=(len(ind_to_show) == 1)):
+                sk1, sk2, sk3, sk4, sk5 = st.columns(5)
+                with sk1:
+                    st.markdown(kpi_card("Volume", f"{vol_total:,}", color), unsafe_allow_html=True)
+                with sk2:
+                    st.markdown(kpi_card("Aderentes", f"{ader_total:,}", COR_SUCESSO), unsafe_allow_html=True)
+                with sk3:
+                    pct_c = COR_SUCESSO if pct_total >= 90 else (COR_ALERTA if pct_total >= 70 else COR_PERIGO)
+                    st.markdown(kpi_card("Aderência", f"{pct_total:.1f}", pct_c, suffix="%"), unsafe_allow_html=True)
+                with sk4:
+                    if RES_TMA in sub.columns:
+                        st.markdown(kpi_card("TMA Médio", f"{sub[RES_TMA].mean():.4f}", COR_INFO), unsafe_allow_html=True)
+                with sk5:
+                    if RES_TMR in sub.columns:
+                        st.markdown(kpi_card("TMR Médio", f"{sub[RES_TMR].mean():.4f}", COR_ALERTA), unsafe_allow_html=True)
+
+                cr, cn = st.columns(2)
+                with cr:
+                    if RES_COL_GRUPO in sub.columns:
+                        st.markdown(f"**Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}**")
+                        _rg_sub2 = sub.groupby(RES_COL_GRUPO).agg(
+                            Volume=(RES_COL_VOLUME, "sum"),
+                            Aderentes=("ADERENTE", "sum"),
+                        ).reset_index()
+                        _rg_sub2["Aderência %"] = (_rg_sub2["Aderentes"] / _rg_sub2["Volume"] * 100).round(1)
+                        _rg_sub2 = _rg_sub2.sort_values("Volume", ascending=False).reset_index(drop=True)
+                        if not _rg_sub2.empty:
+                            _rg_best2 = _rg_sub2.loc[_rg_sub2["Aderência %"].idxmax()]
+                            _rg_worst2 = _rg_sub2.loc[_rg_sub2["Aderência %"].idxmin()]
+                            st.caption(
+                                f"🟢 Melhor: **{_rg_best2[RES_COL_GRUPO]}** ({_rg_best2['Aderência %']:.1f}%) · "
+                                f"🔴 Pior: **{_rg_worst2[RES_COL_GRUPO]}** ({_rg_worst2['Aderência %']:.1f}%)"
+                            )
                             st.dataframe(
-                                nat_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—"),
+                                _rg_sub2.style
+                                    .format({"Aderência %": "{:.1f}"}, na_rep="—")
+                                    .background_gradient(cmap="Blues", subset=["Volume"])
+                                    .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=50, vmax=100),
                                 use_container_width=True, hide_index=True,
                             )
-                        st.markdown("**Por Impacto**")
-                        imp_df = res_por_impacto(sub)
-                        if not imp_df.empty:
-                            st.dataframe(imp_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—"),
-                                         use_container_width=True, hide_index=True)
-
-                    st.markdown("**Top 15 Soluções**")
-                    sol_df = res_por_solucao(sub, top_n=15)
-                    if not sol_df.empty:
+                with cn:
+                    st.markdown("**Por Natureza**")
+                    nat_df = quebra("res_por_natureza", sub, indicador=ind, **recorte_res)
+                    if not nat_df.empty:
                         st.dataframe(
-                            sol_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—")
-                                .background_gradient(cmap="YlOrRd", subset=["Volume"]),
-                            use_container_width=True, hide_index=True, height=350,
+                            nat_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—"),
+                            use_container_width=True, hide_index=True,
                         )
+                    st.markdown("**Por Impacto**")
+                    imp_df = quebra("res_por_impacto", sub, indicador=ind, **recorte_res)
+                    if not imp_df.empty:
+                        st.dataframe(imp_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—"),
+                                     use_container_width=True, hide_index=True)
+
+                st.markdown("**Top 15 Soluções**")
+                sol_df = quebra("res_por_solucao", sub, indicador=ind, top_n=15, **recorte_res)
+                if not sol_df.empty:
+                    st.dataframe(
+                        sol_df.style.format({"Aderencia_Pct": "{:.1f}"}, na_rep="—")
+                            .background_gradient(cmap="YlOrRd", subset=["Volume"]),
+                        use_container_width=True, hide_index=True, height=350,
+                    )
 
-                    st.markdown("**Evolução Diária**")
-                    evo_df = res_evolucao_diaria(sub)
-                    if not evo_df.empty:
-                        c_evo1, c_evo2 = st.columns(2)
-                        with c_evo1:
-                            st.caption("Volume diário")
-                            st.area_chart(evo_df[["Data", "Volume"]].set_index("Data"), color=color, height=200)
-                        with c_evo2:
-                            st.caption("Aderência diária (%)")
-                            st.line_chart(evo_df[["Data", "Aderencia_Pct"]].set_index("Data"), color=COR_SUCESSO, height=200)
-
-            st.markdown("---")
-            st.markdown(f"##### 📋 Tabela Consolidada por Grupo (IN_GRUPO) e Indicador — Regional {REGIONAL_FILTRO}")
-            if not kpis_df.empty and RES_COL_GRUPO in df_res_filtrado.columns:
-                pivot_list = []
-                for ind in RES_INDICADORES_FILTRO:
-                    sub = df_res_filtrado[df_res_filtrado[RES_COL_INDICADOR_NOME] == ind]
-                    if sub.empty:
-                        continue
-                    _gdf = sub.groupby(RES_COL_GRUPO).agg(
-                        Volume=(RES_COL_VOLUME, "sum"),
-                        Aderentes=("ADERENTE", "sum"),
+                st.markdown("**Evolução Diária**")
+                evo_df = quebra("res_evolucao_diaria", sub, indicador=ind, **recorte_res)
+                if not evo_df.empty:
+                    c_evo1, c_evo2 = st.columns(2)
+                    with c_evo1:
+                        st.caption("Volume diário")
+                        st.area_chart(evo_df[["Data", "Volume"]].set_index("Data"), color=color, height=200)
+                    with c_evo2:
+                        st.caption("Aderência diária (%)")
+                        st.line_chart(evo_df[["Data", "Aderencia_Pct"]].set_index("Data"), color=COR_SUCESSO, height=200)
+
+        st.markdown("---")
+        st.markdown(f"##### 📋 Tabela Consolidada por Grupo (IN_GRUPO) e Indicador — Regional {REGIONAL_FILTRO}")
+        if not kpis_df.empty and RES_COL_GRUPO in df_res_filtrado.columns:
+            pivot_list = []
+            for ind in RES_INDICADORES_FILTRO:
+                sub = df_res_filtrado[df_res_filtrado[RES_COL_INDICADOR_NOME] == ind]
+                if sub.empty:
+                    continue
+                _gdf = sub.groupby(RES_COL_GRUPO).agg(
+                    Volume=(RES_COL_VOLUME, "sum"),
+                    Aderentes=("ADERENTE", "sum"),
+                ).reset_index()
+                _gdf["Aderencia_Pct"] = (_gdf["Aderentes"] / _gdf["Volume"] * 100).round(1)
+                _gdf["Indicador"] = RES_IND_LABELS.get(ind, ind)
+                pivot_list.append(_gdf)
+            if pivot_list:
+                all_grp_res = pd.concat(pivot_list, ignore_index=True)
+                try:
+                    pivot_tbl = all_grp_res.pivot_table(
+                        index=RES_COL_GRUPO, columns="Indicador",
+                        values="Aderencia_Pct", aggfunc="first",
                     ).reset_index()
-                    _gdf["Aderencia_Pct"] = (_gdf["Aderentes"] / _gdf["Volume"] * 100).round(1)
-                    _gdf["Indicador"] = RES_IND_LABELS.get(ind, ind)
-                    pivot_list.append(_gdf)
-                if pivot_list:
-                    all_grp_res = pd.concat(pivot_list, ignore_index=True)
-                    try:
-                        pivot_tbl = all_grp_res.pivot_table(
-                            index=RES_COL_GRUPO, columns="Indicador",
-                            values="Aderencia_Pct", aggfunc="first",
-                        ).reset_index()
-                        pivot_tbl = pivot_tbl.rename(columns={RES_COL_GRUPO: "Grupo"})
-                        st.dataframe(
-                            pivot_tbl.style.format(
-                                {c: "{:.1f}" for c in pivot_tbl.columns if c != "Grupo"}, na_rep="—"
-                            ).background_gradient(cmap="RdYlGn", vmin=50, vmax=100,
-                                subset=[c for c in pivot_tbl.columns if c != "Grupo"]),
-                            use_container_width=True, hide_index=True,
-                        )
-                    except Exception:
-                        st.dataframe(all_grp_res, use_container_width=True, hide_index=True)
-
-            st.markdown("---")
-            res_show_cols = [
-                RES_COL_INDICADOR_NOME, RES_COL_ID_MOSTRA, RES_COL_VOLUME,
-                "ADERENTE", RES_COL_STATUS, RES_REGIONAL, RES_COL_NATUREZA,
-                RES_COL_IMPACTO, RES_COL_SOLUCAO, RES_TMA, RES_TMR,
-                RES_COL_DT_INICIO, RES_ANOMES,
-            ]
-            res_show_cols = [c for c in res_show_cols if c in df_res_filtrado.columns]
-            st.dataframe(
-                df_res_filtrado[res_show_cols].sort_values(
-                    [RES_COL_DT_INICIO] if RES_COL_DT_INICIO in df_res_filtrado.columns else [RES_COL_INDICADOR_NOME],
-                    ascending=False,
-                ),
-                use_container_width=True, height=400,
-            )
-            csv_res = df_res_filtrado[res_show_cols].to_csv(index=False).encode("utf-8")
-            st.download_button("📥 Baixar Indicadores Residencial (CSV)", csv_res, "indicadores_residencial.csv", "text/csv")
+                    pivot_tbl = pivot_tbl.rename(columns={RES_COL_GRUPO: "Grupo"})
+                    st.dataframe(
+                        pivot_tbl.style.format(
+                            {c: "{:.1f}" for c in pivot_tbl.columns if c != "Grupo"}, na_rep="—"
+                        ).background_gradient(cmap="RdYlGn", vmin=50, vmax=100,
+                            subset=[c for c in pivot_tbl.columns if c != "Grupo"]),
+                        use_container_width=True, hide_index=True,
+                    )
+                except Exception:
+                    st.dataframe(all_grp_res, use_container_width=True, hide_index=True)
+
+        st.markdown("---")
+        res_show_cols = [
+            RES_COL_INDICADOR_NOME, RES_COL_ID_MOSTRA, RES_COL_VOLUME,
+            "ADERENTE", RES_COL_STATUS, RES_REGIONAL, RES_COL_NATUREZA,
+            RES_COL_IMPACTO, RES_COL_SOLUCAO, RES_TMA, RES_TMR,
+            RES_COL_DT_INICIO, RES_ANOMES,
+        ]
+        res_show_cols = [c for c in res_show_cols if c in df_res_filtrado.columns]
+        st.dataframe(
+            df_res_filtrado[res_show_cols].sort_values(
+                [RES_COL_DT_INICIO] if RES_COL_DT_INICIO in df_res_filtrado.columns else [RES_COL_INDICADOR_NOME],
+                ascending=False,
+            ),
+            use_container_width=True, height=400,
+        )
+        csv_res = df_res_filtrado[res_show_cols].to_csv(index=False).encode("utf-8")
+        st.download_button("📥 Baixar Indicadores Residencial (CSV)", csv_res, "indicadores_residencial.csv", "text/csv")
 
 
 
 # ---- TAB: INDICADORES TOA ----
-if toa_loaded and _tab_toa_idx is not None:
-    with tabs[_tab_toa_idx]:
-        anomes_str = str(toa_anomes) if toa_anomes else "?"
-        st.markdown(
-            f"#### 📋 Indicadores TOA — Tarefas Canceladas · Tempo de Validação do Formulário · "
-            f"Período: **{anomes_str}** (mês mais recente)"
-        )
-        st.caption(
-            "ℹ️ Dados filtrados automaticamente para o mês mais recente disponível na planilha. "
-            "Tarefas Canceladas: menor = melhor. Tempo de Validação: maior aderência% = melhor."
-        )
+@_secao("📋 Indicadores TOA", toa_loaded)
+def _secao_toa():
+    anomes_str = str(toa_anomes) if toa_anomes else "?"
+    st.markdown(
+        f"#### 📋 Indicadores TOA — Tarefas Canceladas · Tempo de Validação do Formulário · "
+        f"Período: **{anomes_str}**"
+    )
+    st.caption(
+        f"ℹ️ Dados do período {anomes_str}, escolhido em **Período (TOA)** na barra lateral "
+        "(padrão: mês mais recente da base). "
+        "Tarefas Canceladas: menor = melhor. Tempo de Validação: maior aderência% = melhor."
+    )
 
-        # ---- KPIs gerais ----
-        resumo_toa = toa_resumo_por_indicador(df_toa)
-        if not resumo_toa.empty:
-            tk_cols = st.columns(len(resumo_toa) * 2)
-            ci = 0
-            for _, trow in resumo_toa.iterrows():
-                ind_nome = trow["Indicador"]
-                cor = TOA_IND_COLORS.get(ind_nome, COR_INFO)
-                label = TOA_IND_LABELS.get(ind_nome, ind_nome)
-                with tk_cols[ci]:
-                    st.markdown(kpi_card(f"Total — {label[:20]}", f"{trow['Total']:,}", cor), unsafe_allow_html=True)
-                ci += 1
-                with tk_cols[ci]:
-                    if ind_nome == TOA_IND_CANCELADAS:
-                        # Para canceladas: mostrar total (menor = melhor)
-                        st.markdown(kpi_card("Canceladas (⚠️ menor melhor)", f"{trow['Total']:,}", COR_PERIGO), unsafe_allow_html=True)
-                    else:
-                        pct = trow["Aderencia_Pct"]
-                        pct_c = COR_SUCESSO if pct >= 90 else (COR_ALERTA if pct >= 70 else COR_PERIGO)
-                        st.markdown(kpi_card(f"Aderência — {label[:15]}", f"{pct:.1f}", pct_c, suffix="%"), unsafe_allow_html=True)
-                ci += 1
+    # ---- KPIs gerais ----
+    resumo_toa = quebra("toa_resumo_por_indicador", df_toa, **recorte_toa)
+    if not resumo_toa.empty:
+        tk_cols = st.columns(len(resumo_toa) * 2)
+        ci = 0
+        for _, trow in resumo_toa.iterrows():
+            ind_nome = trow["Indicador"]
+            cor = TOA_IND_COLORS.get(ind_nome, COR_INFO)
+            label = TOA_IND_LABELS.get(ind_nome, ind_nome)
+            with tk_cols[ci]:
+                st.markdown(kpi_card(f"Total — {label[:20]}", f"{trow['Total']:,}", cor), unsafe_allow_html=True)
+            ci += 1
+            with tk_cols[ci]:
+                if ind_nome == TOA_IND_CANCELADAS:
+                    # Para canceladas: mostrar total (menor = melhor)
+                    st.markdown(kpi_card("Canceladas (⚠️ menor melhor)", f"{trow['Total']:,}", COR_PERIGO), unsafe_allow_html=True)
+                else:
+                    pct = trow["Aderencia_Pct"]
+                    pct_c = COR_SUCESSO if pct >= 90 else (COR_ALERTA if pct >= 70 else COR_PERIGO)
+                    st.markdown(kpi_card(f"Aderência — {label[:15]}", f"{pct:.1f}", pct_c, suffix="%"), unsafe_allow_html=True)
+            ci += 1
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # =============================================
-        # SEÇÃO 1: TAREFAS CANCELADAS
-        # =============================================
-        st.markdown("### ❌ Tarefas Canceladas")
-        st.caption("Cada linha representa uma tarefa cancelada por um analista da equipe no período.")
-
-        col_canc1, col_canc2 = st.columns([1, 1])
-
-        with col_canc1:
-            st.markdown("##### 🏆 Ranking por Analista")
-            df_canc_anal = toa_canceladas_por_analista(df_toa)
-            if not df_canc_anal.empty:
-                df_canc_anal["Analista"] = df_canc_anal["Nome"].apply(primeiro_nome)
-                df_canc_anal["TMR Médio (h)"] = df_canc_anal["TMR_Medio_h"]
-                tbl_canc = df_canc_anal[["Analista", "Setor", "Canceladas", "TMR Médio (h)"]].copy()
-                tbl_canc = tbl_canc.reset_index(drop=True)
-                tbl_canc.index += 1; tbl_canc.index.name = "#"
-                st.dataframe(
-                    tbl_canc.style
-                        .format({"TMR Médio (h)": "{:.2f}"}, na_rep="—")
-                        .background_gradient(cmap="Reds", subset=["Canceladas"]),
-                    use_container_width=True,
-                )
-                # Mini bar chart
-                chart_canc = df_canc_anal[["Analista", "Canceladas"]].set_index("Analista").sort_values("Canceladas")
-                st.bar_chart(chart_canc, color="#E74C3C", height=300)
-
-        with col_canc2:
-            # Aging
-            st.markdown("##### ⏱️ Distribuição por Faixa de Tempo (AGING)")
-            df_aging = toa_canceladas_por_aging(df_toa)
-            if not df_aging.empty:
-                st.dataframe(
-                    df_aging.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
-                    use_container_width=True, hide_index=True,
-                )
-                chart_aging = df_aging.set_index("Aging")
-                st.bar_chart(chart_aging, color="#E74C3C", height=250)
+    # =============================================
+    # SEÇÃO 1: TAREFAS CANCELADAS
+    # =============================================
+    st.markdown("### ❌ Tarefas Canceladas")
+    st.caption("Cada linha representa uma tarefa cancelada por um analista da equipe no período.")
+
+    col_canc1, col_canc2 = st.columns([1, 1])
+
+    with col_canc1:
+        st.markdown("##### 🏆 Ranking por Analista")
+        df_canc_anal = quebra("toa_canceladas_por_analista", df_toa, **recorte_toa)
+        if not df_canc_anal.empty:
+            df_canc_anal["Analista"] = primeiros_nomes(df_canc_anal["Nome"])
+            df_canc_anal["TMR Médio (h)"] = df_canc_anal["TMR_Medio_h"]
+            tbl_canc = df_canc_anal[["Analista", "Setor", "Canceladas", "TMR Médio (h)"]].copy()
+            tbl_canc = tbl_canc.reset_index(drop=True)
+            tbl_canc.index += 1; tbl_canc.index.name = "#"
+            st.dataframe(
+                tbl_canc.style
+                    .format({"TMR Médio (h)": "{:.2f}"}, na_rep="—")
+                    .background_gradient(cmap="Reds", subset=["Canceladas"]),
+                use_container_width=True,
+            )
+            # Mini bar chart
+            chart_canc = df_canc_anal[["Analista", "Canceladas"]].set_index("Analista").sort_values("Canceladas")
+            st.bar_chart(chart_canc, color="#E74C3C", height=300)
+
+    with col_canc2:
+        # Aging
+        st.markdown("##### ⏱️ Distribuição por Faixa de Tempo (AGING)")
+        df_aging = quebra("toa_canceladas_por_aging", df_toa, **recorte_toa)
+        if not df_aging.empty:
+            st.dataframe(
+                df_aging.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
+                use_container_width=True, hide_index=True,
+            )
+            chart_aging = df_aging.set_index("Aging")
+            st.bar_chart(chart_aging, color="#E74C3C", height=250)
+
+        # Tipo de Atividade
+        st.markdown("##### 🔧 Por Tipo de Atividade")
+        df_canc_tipo = quebra("toa_canceladas_por_tipo", df_toa, **recorte_toa)
+        if not df_canc_tipo.empty:
+            st.dataframe(
+                df_canc_tipo.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
+                use_container_width=True, hide_index=True,
+            )
 
-            # Tipo de Atividade
-            st.markdown("##### 🔧 Por Tipo de Atividade")
-            df_canc_tipo = toa_canceladas_por_tipo(df_toa)
-            if not df_canc_tipo.empty:
+    # Breakdown por Rede e Grupo (linha abaixo)
+    col_cr, col_creg = st.columns(2)
+    with col_cr:
+        st.markdown("##### 📡 Por Rede")
+        df_canc_rede = quebra("toa_canceladas_por_rede", df_toa, **recorte_toa)
+        if not df_canc_rede.empty:
+            st.dataframe(
+                df_canc_rede.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
+                use_container_width=True, hide_index=True,
+            )
+    with col_creg:
+        st.markdown(f"##### 🗺️ Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}")
+        _canc_grp_col = "IN_GRUPO"
+        if _canc_grp_col in df_toa.columns:
+            _df_canc_grp = df_toa[df_toa["INDICADOR_NOME"] == "TAREFAS CANCELADAS"]
+            if not _df_canc_grp.empty:
+                _cg = _df_canc_grp.groupby(_canc_grp_col).size().reset_index(name="Canceladas")
+                _cg.columns = ["Grupo", "Canceladas"]
+                _cg = _cg.sort_values("Canceladas", ascending=False).reset_index(drop=True)
                 st.dataframe(
-                    df_canc_tipo.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
+                    _cg.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
                     use_container_width=True, hide_index=True,
                 )
 
-        # Breakdown por Rede e Grupo (linha abaixo)
-        col_cr, col_creg = st.columns(2)
-        with col_cr:
-            st.markdown("##### 📡 Por Rede")
-            df_canc_rede = toa_canceladas_por_rede(df_toa)
-            if not df_canc_rede.empty:
+    # Evolução diária canceladas
+    st.markdown("##### 📅 Evolução Diária")
+    df_canc_evo = quebra("toa_canceladas_evolucao", df_toa, **recorte_toa)
+    if not df_canc_evo.empty:
+        st.area_chart(df_canc_evo[["Data", "Canceladas"]].set_index("Data"), color="#E74C3C", height=220)
+
+    # Detalhe de canceladas por setor
+    st.markdown("##### 🏢🏠 Canceladas por Setor")
+    c_emp_c, c_res_c = st.columns(2)
+    for col_s, setor_s in [(c_emp_c, "EMPRESARIAL"), (c_res_c, "RESIDENCIAL")]:
+        icon_s = "🏢" if setor_s == "EMPRESARIAL" else "🏠"
+        with col_s:
+            st.markdown(f"**{icon_s} {setor_s}**")
+            sub_s = df_canc_anal[df_canc_anal["Setor"] == setor_s][["Analista", "Canceladas", "TMR Médio (h)"]].copy()
+            if sub_s.empty:
+                st.caption("Nenhum registro.")
+            else:
+                sub_s = sub_s.reset_index(drop=True); sub_s.index += 1; sub_s.index.name = "#"
                 st.dataframe(
-                    df_canc_rede.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
-                    use_container_width=True, hide_index=True,
+                    sub_s.style.format({"TMR Médio (h)": "{:.2f}"}).background_gradient(cmap="Reds", subset=["Canceladas"]),
+                    use_container_width=True,
                 )
-        with col_creg:
-            st.markdown(f"##### 🗺️ Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}")
-            _canc_grp_col = "IN_GRUPO"
-            if _canc_grp_col in df_toa.columns:
-                _df_canc_grp = df_toa[df_toa["INDICADOR_NOME"] == "TAREFAS CANCELADAS"]
-                if not _df_canc_grp.empty:
-                    _cg = _df_canc_grp.groupby(_canc_grp_col).size().reset_index(name="Canceladas")
-                    _cg.columns = ["Grupo", "Canceladas"]
-                    _cg = _cg.sort_values("Canceladas", ascending=False).reset_index(drop=True)
-                    st.dataframe(
-                        _cg.style.background_gradient(cmap="Reds", subset=["Canceladas"]),
-                        use_container_width=True, hide_index=True,
-                    )
-
-        # Evolução diária canceladas
-        st.markdown("##### 📅 Evolução Diária")
-        df_canc_evo = toa_canceladas_evolucao(df_toa)
-        if not df_canc_evo.empty:
-            st.area_chart(df_canc_evo[["Data", "Canceladas"]].set_index("Data"), color="#E74C3C", height=220)
-
-        # Detalhe de canceladas por setor
-        st.markdown("##### 🏢🏠 Canceladas por Setor")
-        c_emp_c, c_res_c = st.columns(2)
-        for col_s, setor_s in [(c_emp_c, "EMPRESARIAL"), (c_res_c, "RESIDENCIAL")]:
-            icon_s = "🏢" if setor_s == "EMPRESARIAL" else "🏠"
-            with col_s:
-                st.markdown(f"**{icon_s} {setor_s}**")
-                sub_s = df_canc_anal[df_canc_anal["Setor"] == setor_s][["Analista", "Canceladas", "TMR Médio (h)"]].copy()
-                if sub_s.empty:
-                    st.caption("Nenhum registro.")
-                else:
-                    sub_s = sub_s.reset_index(drop=True); sub_s.index += 1; sub_s.index.name = "#"
-                    st.dataframe(
-                        sub_s.style.format({"TMR Médio (h)": "{:.2f}"}).background_gradient(cmap="Reds", subset=["Canceladas"]),
-                        use_container_width=True,
-                    )
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # =============================================
-        # SEÇÃO 2: TEMPO DE VALIDAÇÃO DO FORMULÁRIO
-        # =============================================
-        st.markdown("### ✅ Tempo de Validação do Formulário")
-        st.caption("Aderência ao tempo máximo permitido para validar o formulário TOA. Maior aderência% = melhor.")
-
-        col_val1, col_val2 = st.columns([1, 1])
-
-        with col_val1:
-            st.markdown("##### 🏆 Ranking por Analista")
-            df_val_anal = toa_validacao_por_analista(df_toa)
-            if not df_val_anal.empty:
-                df_val_anal["Analista"] = df_val_anal["Nome"].apply(primeiro_nome)
-                tbl_val = df_val_anal[["Analista", "Setor", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
-                tbl_val.columns = ["Analista", "Setor", "Total", "Aderentes", "Aderência %", "TMR Médio (min)"]
-                tbl_val = tbl_val.reset_index(drop=True)
-                tbl_val.index += 1; tbl_val.index.name = "#"
-                styled_val = tbl_val.style.format(
-                    {"Aderência %": "{:.1f}", "TMR Médio (min)": "{:.1f}"}, na_rep="—"
-                )
-                styled_val = styled_val.background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100)
-                styled_val = styled_val.background_gradient(cmap="RdYlGn_r", subset=["TMR Médio (min)"], vmin=5, vmax=60)
-                st.dataframe(styled_val, use_container_width=True)
-
-                # Destaques
-                best_v = tbl_val.iloc[0]
-                worst_v = tbl_val.iloc[-1]
-                cv1, cv2 = st.columns(2)
-                with cv1:
-                    st.markdown(f"""<div class="perf-card perf-best">
+    # =============================================
+    # SEÇÃO 2: TEMPO DE VALIDAÇÃO DO FORMULÁRIO
+    # =============================================
+    st.markdown("### ✅ Tempo de Validação do Formulário")
+    st.caption("Aderência ao tempo máximo permitido para validar o formulário TOA. Maior aderência% = melhor.")
+
+    col_val1, col_val2 = st.columns([1, 1])
+
+    with col_val1:
+        st.markdown("##### 🏆 Ranking por Analista")
+        df_val_anal = quebra("toa_validacao_por_analista", df_toa, **recorte_toa)
+        if not df_val_anal.empty:
+            df_val_anal["Analista"] = primeiros_nomes(df_val_anal["Nome"])
+            tbl_val = df_val_anal[["Analista", "Setor", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
+            tbl_val.columns = ["Analista", "Setor", "Total", "Aderentes", "Aderência %", "TMR Médio (min)"]
+            tbl_val = tbl_val.reset_index(drop=True)
+            tbl_val.index += 1; tbl_val.index.name = "#"
+            styled_val = tbl_val.style.format(
+                {"Aderência %": "{:.1f}", "TMR Médio (min)": "{:.1f}"}, na_rep="—"
+            )
+            styled_val = styled_val.background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100)
+            styled_val = styled_val.background_gradient(cmap="RdYlGn_r", subset=["TMR Médio (min)"], vmin=5, vmax=60)
+            st.dataframe(styled_val, use_container_width=True)
+
+            # Destaques
+            best_v = tbl_val.iloc[0]
+            worst_v = tbl_val.iloc[-1]
+            cv1, cv2 = st.columns(2)
+            with cv1:
+                st.markdown(f"""<div class="perf-card perf-best">
                         <div class="p-title">🏆 Melhor Aderência</div>
                         <div class="p-name" style="color:#2ECC71;">{best_v['Analista']}</div>
                         <div class="p-detail">{best_v['Aderência %']:.1f}% · TMR: {best_v['TMR Médio (min)']:.1f} min</div>
                     </div>""", unsafe_allow_html=True)
-                with cv2:
-                    st.markdown(f"""<div class="perf-card perf-worst">
+            with cv2:
+                st.markdown(f"""<div class="perf-card perf-worst">
                         <div class="p-title">⚠️ Menor Aderência</div>
                         <div class="p-name" style="color:#E74C3C;">{worst_v['Analista']}</div>
                         <div class="p-detail">{worst_v['Aderência %']:.1f}% · TMR: {worst_v['TMR Médio (min)']:.1f} min</div>
                     </div>""", unsafe_allow_html=True)
 
-        with col_val2:
-            # Bar chart aderência
-            st.markdown("##### 📊 Aderência por Analista")
-            chart_val = df_val_anal[["Analista", "Aderencia_Pct"]].set_index("Analista").sort_values("Aderencia_Pct")
-            chart_val.columns = ["Aderência %"]
-            st.bar_chart(chart_val, horizontal=True, color="#16A085", height=400)
-
-        # Breakdowns por tipo, rede e grupo
-        col_v1, col_v2 = st.columns(2)
-        with col_v1:
-            st.markdown("##### 🔧 Por Tipo de Atividade")
-            df_val_tipo = toa_validacao_por_tipo(df_toa)
-            if not df_val_tipo.empty:
-                df_val_tipo_show = df_val_tipo[["Tipo Atividade", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
-                df_val_tipo_show.columns = ["Tipo Atividade", "Total", "Aderentes", "Aderência %", "TMR (min)"]
-                st.dataframe(
-                    df_val_tipo_show.style
-                        .format({"Aderência %": "{:.1f}", "TMR (min)": "{:.1f}"}, na_rep="—")
-                        .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
-                    use_container_width=True, hide_index=True,
+    with col_val2:
+        # Bar chart aderência
+        st.markdown("##### 📊 Aderência por Analista")
+        chart_val = df_val_anal[["Analista", "Aderencia_Pct"]].set_index("Analista").sort_values("Aderencia_Pct")
+        chart_val.columns = ["Aderência %"]
+        st.bar_chart(chart_val, horizontal=True, color="#16A085", height=400)
+
+    # Breakdowns por tipo, rede e grupo
+    col_v1, col_v2 = st.columns(2)
+    with col_v1:
+        st.markdown("##### 🔧 Por Tipo de Atividade")
+        df_val_tipo = quebra("toa_validacao_por_tipo", df_toa, **recorte_toa)
+        if not df_val_tipo.empty:
+            df_val_tipo_show = df_val_tipo[["Tipo Atividade", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
+            df_val_tipo_show.columns = ["Tipo Atividade", "Total", "Aderentes", "Aderência %", "TMR (min)"]
+            st.dataframe(
+                df_val_tipo_show.style
+                    .format({"Aderência %": "{:.1f}", "TMR (min)": "{:.1f}"}, na_rep="—")
+                    .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
+                use_container_width=True, hide_index=True,
+            )
+    with col_v2:
+        st.markdown("##### 📡 Por Rede")
+        df_val_rede = quebra("toa_validacao_por_rede", df_toa, **recorte_toa)
+        if not df_val_rede.empty:
+            df_val_rede_show = df_val_rede[["Rede", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
+            df_val_rede_show.columns = ["Rede", "Total", "Aderentes", "Aderência %", "TMR (min)"]
+            st.dataframe(
+                df_val_rede_show.style
+                    .format({"Aderência %": "{:.1f}", "TMR (min)": "{:.1f}"}, na_rep="—")
+                    .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
+                use_container_width=True, hide_index=True,
+            )
+
+    # Breakdown por IN_GRUPO (dentro da Regional Leste)
+    st.markdown(f"##### 🗺️ Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}")
+    _val_grp_col = "IN_GRUPO"
+    if _val_grp_col in df_toa.columns:
+        _df_val_grp = df_toa[df_toa["INDICADOR_NOME"] == "TEMPO DE VALIDAÇÃO DO FORMULÁRIO"]
+        if not _df_val_grp.empty:
+            _vg = _df_val_grp.groupby(_val_grp_col).agg(
+                Total=("INDICADOR", "count"),
+                Aderentes=("ADERENTE", "sum"),
+                TMR_Medio_min=("TMR_min", "mean"),
+            ).reset_index().rename(columns={_val_grp_col: "Grupo"})
+            _vg["Aderência %"] = (_vg["Aderentes"] / _vg["Total"] * 100).round(1)
+            _vg["TMR (min)"] = _vg["TMR_Medio_min"].round(1)
+            _vg = _vg.sort_values("Total", ascending=False).reset_index(drop=True)
+            if not _vg.empty:
+                _vg_best = _vg.loc[_vg["Aderência %"].idxmax()]
+                _vg_worst = _vg.loc[_vg["Aderência %"].idxmin()]
+                st.caption(
+                    f"🟢 Melhor: **{_vg_best['Grupo']}** ({_vg_best['Aderência %']:.1f}%) · "
+                    f"🔴 Pior: **{_vg_worst['Grupo']}** ({_vg_worst['Aderência %']:.1f}%)"
                 )
-        with col_v2:
-            st.markdown("##### 📡 Por Rede")
-            df_val_rede = toa_validacao_por_rede(df_toa)
-            if not df_val_rede.empty:
-                df_val_rede_show = df_val_rede[["Rede", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]].copy()
-                df_val_rede_show.columns = ["Rede", "Total", "Aderentes", "Aderência %", "TMR (min)"]
                 st.dataframe(
-                    df_val_rede_show.style
+                    _vg[["Grupo", "Total", "Aderentes", "Aderência %", "TMR (min)"]].style
                         .format({"Aderência %": "{:.1f}", "TMR (min)": "{:.1f}"}, na_rep="—")
-                        .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
+                        .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100)
+                        .background_gradient(cmap="Blues", subset=["Total"]),
                     use_container_width=True, hide_index=True,
                 )
 
-        # Breakdown por IN_GRUPO (dentro da Regional Leste)
-        st.markdown(f"##### 🗺️ Por Grupo (IN_GRUPO) — Regional {REGIONAL_FILTRO}")
-        _val_grp_col = "IN_GRUPO"
-        if _val_grp_col in df_toa.columns:
-            _df_val_grp = df_toa[df_toa["INDICADOR_NOME"] == "TEMPO DE VALIDAÇÃO DO FORMULÁRIO"]
-            if not _df_val_grp.empty:
-                _vg = _df_val_grp.groupby(_val_grp_col).agg(
-                    Total=("INDICADOR", "count"),
-                    Aderentes=("ADERENTE", "sum"),
-                    TMR_Medio_min=("TMR_min", "mean"),
-                ).reset_index().rename(columns={_val_grp_col: "Grupo"})
-                _vg["Aderência %"] = (_vg["Aderentes"] / _vg["Total"] * 100).round(1)
-                _vg["TMR (min)"] = _vg["TMR_Medio_min"].round(1)
-                _vg = _vg.sort_values("Total", ascending=False).reset_index(drop=True)
-                if not _vg.empty:
-                    _vg_best = _vg.loc[_vg["Aderência %"].idxmax()]
-                    _vg_worst = _vg.loc[_vg["Aderência %"].idxmin()]
-                    st.caption(
-                        f"🟢 Melhor: **{_vg_best['Grupo']}** ({_vg_best['Aderência %']:.1f}%) · "
-                        f"🔴 Pior: **{_vg_worst['Grupo']}** ({_vg_worst['Aderência %']:.1f}%)"
-                    )
-                    st.dataframe(
-                        _vg[["Grupo", "Total", "Aderentes", "Aderência %", "TMR (min)"]].style
-                            .format({"Aderência %": "{:.1f}", "TMR (min)": "{:.1f}"}, na_rep="—")
-                            .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100)
-                            .background_gradient(cmap="Blues", subset=["Total"]),
-                        use_container_width=True, hide_index=True,
-                    )
-
-        # Validação por setor
-        st.markdown("##### 🏢🏠 Aderência por Setor")
-        c_emp_v, c_res_v = st.columns(2)
-        for col_sv, setor_sv in [(c_emp_v, "EMPRESARIAL"), (c_res_v, "RESIDENCIAL")]:
-            icon_sv = "🏢" if setor_sv == "EMPRESARIAL" else "🏠"
-            with col_sv:
-                st.markdown(f"**{icon_sv} {setor_sv}**")
-                sub_sv = df_val_anal[df_val_anal["Setor"] == setor_sv].copy()
-                if sub_sv.empty:
-                    st.caption("Nenhum registro.")
-                    continue
-                media_ader_sv = sub_sv["Aderencia_Pct"].mean()
-                media_tmr_sv  = sub_sv["TMR_Medio_min"].mean()
-                sv1, sv2 = st.columns(2)
-                with sv1:
-                    pct_c_sv = COR_SUCESSO if media_ader_sv >= 90 else (COR_ALERTA if media_ader_sv >= 70 else COR_PERIGO)
-                    st.markdown(kpi_card("Aderência Média", f"{media_ader_sv:.1f}", pct_c_sv, suffix="%"), unsafe_allow_html=True)
-                with sv2:
-                    st.markdown(kpi_card("TMR Médio (min)", f"{media_tmr_sv:.1f}", COR_INFO), unsafe_allow_html=True)
-                sub_sv_show = sub_sv[["Analista", "Total", "Aderência %", "TMR Médio (min)"]].reset_index(drop=True)
-                sub_sv_show.index += 1; sub_sv_show.index.name = "#"
-                st.dataframe(
-                    sub_sv_show.style
-                        .format({"Aderência %": "{:.1f}", "TMR Médio (min)": "{:.1f}"})
-                        .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
-                    use_container_width=True,
-                )
+    # Validação por setor
+    st.markdown("##### 🏢🏠 Aderência por Setor")
+    c_emp_v, c_res_v = st.columns(2)
+    for col_sv, setor_sv in [(c_emp_v, "EMPRESARIAL"), (c_res_v, "RESIDENCIAL")]:
+        icon_sv = "🏢" if setor_sv == "EMPRESARIAL" else "🏠"
+        with col_sv:
+            st.markdown(f"**{icon_sv} {setor_sv}**")
+            sub_sv = df_val_anal[df_val_anal["Setor"] == setor_sv].copy()
+            if sub_sv.empty:
+                st.caption("Nenhum registro.")
+                continue
+            media_ader_sv = sub_sv["Aderencia_Pct"].mean()
+            media_tmr_sv  = sub_sv["TMR_Medio_min"].mean()
+            sv1, sv2 = st.columns(2)
+            with sv1:
+                pct_c_sv = COR_SUCESSO if media_ader_sv >= 90 else (COR_ALERTA if media_ader_sv >= 70 else COR_PERIGO)
+                st.markdown(kpi_card("Aderência Média", f"{media_ader_sv:.1f}", pct_c_sv, suffix="%"), unsafe_allow_html=True)
+            with sv2:
+                st.markdown(kpi_card("TMR Médio (min)", f"{media_tmr_sv:.1f}", COR_INFO), unsafe_allow_html=True)
+            sub_sv_show = sub_sv[["Analista", "Total", "Aderência %", "TMR Médio (min)"]].reset_index(drop=True)
+            sub_sv_show.index += 1; sub_sv_show.index.name = "#"
+            st.dataframe(
+                sub_sv_show.style
+                    .format({"Aderência %": "{:.1f}", "TMR Médio (min)": "{:.1f}"})
+                    .background_gradient(cmap="RdYlGn", subset=["Aderência %"], vmin=40, vmax=100),
+                use_container_width=True,
+            )
 
-        # Evolução diária validação
-        st.markdown("##### 📅 Evolução Diária — Validação do Formulário")
-        df_val_evo = toa_validacao_evolucao(df_toa)
-        if not df_val_evo.empty:
-            c_evo1, c_evo2 = st.columns(2)
-            with c_evo1:
-                st.caption("Aderência diária (%)")
-                st.line_chart(df_val_evo[["Data", "Aderencia_Pct"]].set_index("Data"), color="#16A085", height=220)
-            with c_evo2:
-                st.caption("TMR médio diário (min)")
-                st.line_chart(df_val_evo[["Data", "TMR_Medio_min"]].set_index("Data"), color=COR_ALERTA, height=220)
+    # Evolução diária validação
+    st.markdown("##### 📅 Evolução Diária — Validação do Formulário")
+    df_val_evo = quebra("toa_validacao_evolucao", df_toa, **recorte_toa)
+    if not df_val_evo.empty:
+        c_evo1, c_evo2 = st.columns(2)
+        with c_evo1:
+            st.caption("Aderência diária (%)")
+            st.line_chart(df_val_evo[["Data", "Aderencia_Pct"]].set_index("Data"), color="#16A085", height=220)
+        with c_evo2:
+            st.caption("TMR médio diário (min)")
+            st.line_chart(df_val_evo[["Data", "TMR_Medio_min"]].set_index("Data"), color=COR_ALERTA, height=220)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ---- Export combinado ----
-        st.markdown("##### 📥 Exportar dados TOA")
-        toa_export_cols = [
-            "INDICADOR_NOME", "ID_ATIVIDADE", "LOGIN", "Nome", "Setor",
-            "IN_REGIONAL", "TIPO_ATIVIDADE", "REDE", "MERCADO", "NATUREZA",
-            "INDICADOR", "INDICADOR_STATUS", "ADERENTE",
-            "TMR_min", "AGING", "DATA", "DT_CANCELAMENTO",
-            "DT_INICIO_FORM", "DT_FIM_FORM", "ANOMES",
-        ]
-        toa_export_cols = [c for c in toa_export_cols if c in df_toa.columns]
-        csv_toa = df_toa[toa_export_cols].to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "📥 Baixar Indicadores TOA (CSV)",
-            csv_toa,
-            f"indicadores_toa_{anomes_str}.csv",
-            "text/csv",
-        )
+    # ---- Export combinado ----
+    st.markdown("##### 📥 Exportar dados TOA")
+    toa_export_cols = [
+        "INDICADOR_NOME", "ID_ATIVIDADE", "LOGIN", "Nome", "Setor",
+        "IN_REGIONAL", "TIPO_ATIVIDADE", "REDE", "MERCADO", "NATUREZA",
+        "INDICADOR", "INDICADOR_STATUS", "ADERENTE",
+        "TMR_min", "AGING", "DATA", "DT_CANCELAMENTO",
+        "DT_INICIO_FORM", "DT_FIM_FORM", "ANOMES",
+    ]
+    toa_export_cols = [c for c in toa_export_cols if c in df_toa.columns]
+    csv_toa = df_toa[toa_export_cols].to_csv(index=False).encode("utf-8")
+    st.download_button(
+        "📥 Baixar Indicadores TOA (CSV)",
+        csv_toa,
+        f"indicadores_toa_{anomes_str}.csv",
+        "text/csv",
+    )
 
 
 # ---- TAB: OCUPAÇÃO DPA ----
-if dpa_loaded and _tab_dpa_idx is not None:
-    with tabs[_tab_dpa_idx]:
-        mes_nome_dpa  = dpa_mes_info.get("mes_nome", "—")
-        mes_num_dpa   = dpa_mes_info.get("mes_num")
-        dpa_geral_pct = dpa_mes_info.get("dpa_geral_pct")
+@_secao("📊 Ocupação DPA", dpa_loaded)
+def _secao_dpa():
+    mes_nome_dpa  = dpa_mes_info.get("mes_nome", "—")
+    mes_num_dpa   = dpa_mes_info.get("mes_num")
+    dpa_geral_pct = dpa_mes_info.get("dpa_geral_pct")
 
-        st.markdown(
-            f"#### 📊 Ocupação DPA — Dados Oficiais · "
-            f"Mês mais recente: **{mes_nome_dpa} 2026**"
-        )
+    st.markdown(
+        f"#### 📊 Ocupação DPA — Dados Oficiais · "
+        f"Mês mais recente: **{mes_nome_dpa} 2026**"
+    )
 
-        if mes_num_dpa:
-            st.caption(
-                f"ℹ️ O mês mais recente com dados disponíveis na planilha é **{mes_nome_dpa}**. "
-                f"Os percentuais refletem a ocupação acumulada de Janeiro a {mes_nome_dpa} de 2026."
-            )
+    if mes_num_dpa:
+        st.caption(
+            f"ℹ️ O mês mais recente com dados disponíveis na planilha é **{mes_nome_dpa}**. "
+            f"Os percentuais refletem a ocupação acumulada de Janeiro a {mes_nome_dpa} de 2026."
+        )
 
-        # KPIs gerais
-        k1, k2, k3, k4 = st.columns(4)
-        with k1:
-            dpa_g_str = f"{dpa_geral_pct:.1f}" if dpa_geral_pct else "—"
-            st.markdown(kpi_card(f"DPA Equipe ({mes_nome_dpa[:3]})", dpa_g_str, _dpa_color(dpa_geral_pct), suffix="%"),
-                        unsafe_allow_html=True)
-        with k2:
-            st.markdown(kpi_card("Analistas Monitorados", str(len(df_dpa_filtrado)), COR_INFO), unsafe_allow_html=True)
-        with k3:
-            above = (df_dpa_filtrado["DPA_Pct_Oficial"] >= DPA_THRESHOLD_OK).sum()
-            st.markdown(kpi_card(f"Acima de {DPA_THRESHOLD_OK:.0f}% 🟢", str(above), COR_SUCESSO), unsafe_allow_html=True)
-        with k4:
-            below = (df_dpa_filtrado["DPA_Pct_Oficial"] < DPA_THRESHOLD_ALERTA).sum()
-            st.markdown(kpi_card(f"Abaixo de {DPA_THRESHOLD_ALERTA:.0f}% 🔴", str(below), COR_PERIGO), unsafe_allow_html=True)
+    # KPIs gerais
+    k1, k2, k3, k4 = st.columns(4)
+    with k1:
+        dpa_g_str = f"{dpa_geral_pct:.1f}" if dpa_geral_pct else "—"
+        st.markdown(kpi_card(f"DPA Equipe ({mes_nome_dpa[:3]})", dpa_g_str, _dpa_color(dpa_geral_pct), suffix="%"),
+                    unsafe_allow_html=True)
+    with k2:
+        st.markdown(kpi_card("Analistas Monitorados", str(len(df_dpa_filtrado)), COR_INFO), unsafe_allow_html=True)
+    with k3:
+        above = (df_dpa_filtrado["DPA_Pct_Oficial"] >= DPA_THRESHOLD_OK).sum()
+        st.markdown(kpi_card(f"Acima de {DPA_THRESHOLD_OK:.0f}% 🟢", str(above), COR_SUCESSO), unsafe_allow_html=True)
+    with k4:
+        below = (df_dpa_filtrado["DPA_Pct_Oficial"] < DPA_THRESHOLD_ALERTA).sum()
+        st.markdown(kpi_card(f"Abaixo de {DPA_THRESHOLD_ALERTA:.0f}% 🔴", str(below), COR_PERIGO), unsafe_allow_html=True)
 
-        st.markdown("")
-        st.markdown("---")
+    st.markdown("")
+    st.markdown("---")
 
-        # ---- Ranking principal ----
-        st.markdown("##### 🏆 Ranking de Ocupação DPA por Analista")
-        rank_of = dpa_ranking(df_dpa_filtrado)
-        if not rank_of.empty:
-            rank_of = rank_of[~rank_of["Login"].isin(LIDERES_IDS)].reset_index(drop=True)
-            rank_of.index += 1; rank_of.index.name = "#"
-            rank_of["Status"] = rank_of["DPA %"].apply(_dpa_semaforo)
-            rank_of_display = rank_of[["Status", "Analista", "Setor", "DPA %"]]
-
-            col_tbl, col_chart = st.columns([1, 1])
-            with col_tbl:
-                st.dataframe(
-                    rank_of_display.style
-                        .format({"DPA %": "{:.1f}"})
-                        .background_gradient(cmap="RdYlGn", subset=["DPA %"], vmin=50, vmax=100),
-                    use_container_width=True, height=560,
-                )
-            with col_chart:
-                chart_dpa = rank_of[["Analista", "DPA %"]].set_index("Analista").sort_values("DPA %")
-                st.bar_chart(chart_dpa, color="#16A085", height=560)
+    # ---- Ranking principal ----
+    st.markdown("##### 🏆 Ranking de Ocupação DPA por Analista")
+    rank_of = dpa_ranking(df_dpa_filtrado)
+    if not rank_of.empty:
+        rank_of = rank_of[~rank_of["Login"].isin(LIDERES_IDS)].reset_index(drop=True)
+        rank_of.index += 1; rank_of.index.name = "#"
+        rank_of["Status"] = por_valor(rank_of["DPA %"], _dpa_semaforo)
+        rank_of_display = rank_of[["Status", "Analista", "Setor", "DPA %"]]
+
+        col_tbl, col_chart = st.columns([1, 1])
+        with col_tbl:
+            st.dataframe(
+                rank_of_display.style
+                    .format({"DPA %": "{:.1f}"})
+                    .background_gradient(cmap="RdYlGn", subset=["DPA %"], vmin=50, vmax=100),
+                use_container_width=True, height=560,
+            )
+        with col_chart:
+            chart_dpa = rank_of[["Analista", "DPA %"]].set_index("Analista").sort_values("DPA %")
+            st.bar_chart(chart_dpa, color="#16A085", height=560)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ---- Breakdown por Setor ----
-        st.markdown("##### 🏢🏠 Ocupação DPA por Setor")
-        c_emp, c_res = st.columns(2)
-        for col_s, setor_s, cmap_s in [
-            (c_emp, "EMPRESARIAL", "Oranges"),
-            (c_res, "RESIDENCIAL", "Blues"),
-        ]:
-            with col_s:
-                icon_s = "🏢" if setor_s == "EMPRESARIAL" else "🏠"
-                st.markdown(f"**{icon_s} {setor_s}**")
-                df_sec_s = df_dpa_filtrado[df_dpa_filtrado["Setor"] == setor_s].copy()
-                if df_sec_s.empty:
-                    st.caption("Sem dados.")
-                    continue
-                media_s = df_sec_s["DPA_Pct_Oficial"].mean()
-                df_sec_s["Nome_Curto"] = df_sec_s["Nome"].apply(primeiro_nome)
-                df_sec_s["Status"] = df_sec_s["DPA_Pct_Oficial"].apply(_dpa_semaforo)
-                df_sec_s_show = df_sec_s[["Status", "Nome_Curto", "DPA_Pct_Oficial"]].copy()
-                df_sec_s_show.columns = ["Status", "Analista", "DPA %"]
-                df_sec_s_show = df_sec_s_show.sort_values("DPA %", ascending=False).reset_index(drop=True)
-                df_sec_s_show.index += 1; df_sec_s_show.index.name = "#"
-                st.caption(f"Média do setor: **{media_s:.1f}%** {_dpa_semaforo(media_s)}")
-                st.dataframe(
-                    df_sec_s_show.style
-                        .format({"DPA %": "{:.1f}"})
-                        .background_gradient(cmap="RdYlGn", subset=["DPA %"], vmin=50, vmax=100),
-                    use_container_width=True, height=400,
-                )
+    # ---- Breakdown por Setor ----
+    st.markdown("##### 🏢🏠 Ocupação DPA por Setor")
+    c_emp, c_res = st.columns(2)
+    for col_s, setor_s, cmap_s in [
+        (c_emp, "EMPRESARIAL", "Oranges"),
+        (c_res, "RESIDENCIAL", "Blues"),
+    ]:
+        with col_s:
+            icon_s = "🏢" if setor_s == "EMPRESARIAL" else "🏠"
+            st.markdown(f"**{icon_s} {setor_s}**")
+            df_sec_s = df_dpa_filtrado[df_dpa_filtrado["Setor"] == setor_s].copy()
+            if df_sec_s.empty:
+                st.caption("Sem dados.")
+                continue
+            media_s = df_sec_s["DPA_Pct_Oficial"].mean()
+            df_sec_s["Nome_Curto"] = primeiros_nomes(df_sec_s["Nome"])
+            df_sec_s["Status"] = por_valor(df_sec_s["DPA_Pct_Oficial"], _dpa_semaforo)
+            df_sec_s_show = df_sec_s[["Status", "Nome_Curto", "DPA_Pct_Oficial"]].copy()
+            df_sec_s_show.columns = ["Status", "Analista", "DPA %"]
+            df_sec_s_show = df_sec_s_show.sort_values("DPA %", ascending=False).reset_index(drop=True)
+            df_sec_s_show.index += 1; df_sec_s_show.index.name = "#"
+            st.caption(f"Média do setor: **{media_s:.1f}%** {_dpa_semaforo(media_s)}")
+            st.dataframe(
+                df_sec_s_show.style
+                    .format({"DPA %": "{:.1f}"})
+                    .background_gradient(cmap="RdYlGn", subset=["DPA %"], vmin=50, vmax=100),
+                use_container_width=True, height=400,
+            )
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ---- Semáforos visuais ----
-        st.markdown("##### 🚦 Painel de Semáforo — Todos os Analistas")
-        n_cards = 4
-        card_cols = st.columns(n_cards)
-        sorted_dpa = df_dpa_filtrado.sort_values("DPA_Pct_Oficial", ascending=False).reset_index(drop=True)
-        for ci, (_, arow) in enumerate(sorted_dpa.iterrows()):
-            pct_v = arow["DPA_Pct_Oficial"]
-            nome_c = primeiro_nome(arow["Nome"])
-            setor_c = arow["Setor"][:3]
-            sem_icon = _dpa_semaforo(pct_v)
-            sem_color = (
-                "#27AE60" if pct_v >= DPA_THRESHOLD_OK
-                else "#F39C12" if pct_v >= DPA_THRESHOLD_ALERTA
-                else "#E74C3C"
-            )
-            with card_cols[ci % n_cards]:
-                st.markdown(f"""<div class="dpa-card" style="border-left-color:{sem_color};">
+    # ---- Semáforos visuais ----
+    st.markdown("##### 🚦 Painel de Semáforo — Todos os Analistas")
+    n_cards = 4
+    card_cols = st.columns(n_cards)
+    sorted_dpa = df_dpa_filtrado.sort_values("DPA_Pct_Oficial", ascending=False).reset_index(drop=True)
+    for ci, (_, arow) in enumerate(sorted_dpa.iterrows()):
+        pct_v = arow["DPA_Pct_Oficial"]
+        nome_c = primeiro_nome(arow["Nome"])
+        setor_c = arow["Setor"][:3]
+        sem_icon = _dpa_semaforo(pct_v)
+        sem_color = (
+            "#27AE60" if pct_v >= DPA_THRESHOLD_OK
+            else "#F39C12" if pct_v >= DPA_THRESHOLD_ALERTA
+            else "#E74C3C"
+        )
+        with card_cols[ci % n_cards]:
+            st.markdown(f"""<div class="dpa-card" style="border-left-color:{sem_color};">
                     <div class="dpa-nome">{sem_icon} {nome_c} <span style="font-size:0.72rem;opacity:0.55;">{setor_c}</span></div>
                     <div class="dpa-val" style="color:{sem_color};">{pct_v:.1f}%</div>
                 </div>""", unsafe_allow_html=True)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ---- Comparativo DPA Oficial vs Calculado (se produtividade carregada) ----
-        resumo_prod_for_comp = resumo_geral(df_filtrado)
-        if not resumo_prod_for_comp.empty:
-            comp_df = dpa_comparativo(df_dpa_filtrado, resumo_prod_for_comp)
-            if not comp_df.empty and "DPA Calculado %" in comp_df.columns:
-                st.markdown("##### 🔄 Comparativo: DPA Oficial vs DPA Calculado (Produtividade)")
-                st.caption(
-                    "DPA Oficial = extraído da planilha Ocupação DPA 2026. "
-                    "DPA Calculado = derivado da coluna DPA_RESULTADO da planilha de Produtividade."
-                )
-                comp_df = comp_df.sort_values("DPA Oficial %", ascending=False).reset_index(drop=True)
-                comp_df.index += 1; comp_df.index.name = "#"
-                fmt_comp = {"DPA Oficial %": "{:.1f}", "DPA Calculado %": "{:.1f}", "Diferença": "{:+.1f}"}
-                styled_comp = comp_df.style.format(fmt_comp, na_rep="—")
-                styled_comp = styled_comp.background_gradient(cmap="RdYlGn", subset=["DPA Oficial %"], vmin=50, vmax=100)
-                if comp_df["Diferença"].notna().any():
-                    styled_comp = styled_comp.background_gradient(cmap="RdYlGn", subset=["Diferença"], vmin=-20, vmax=20)
-                st.dataframe(styled_comp, use_container_width=True)
-
-        # ---- Export ----
-        st.markdown("---")
-        csv_dpa = df_dpa_filtrado[["Login", "Nome", "Setor", "DPA_Pct_Oficial"]].copy()
-        csv_dpa.columns = ["Login", "Nome", "Setor", "DPA % Oficial"]
-        st.download_button(
-            "📥 Baixar Ocupação DPA (CSV)",
-            csv_dpa.to_csv(index=False).encode("utf-8"),
-            f"ocupacao_dpa_{mes_nome_dpa.lower()}_2026.csv",
-            "text/csv",
-        )
+    # ---- Comparativo DPA Oficial vs Calculado (se produtividade carregada) ----
+    resumo_prod_for_comp = resumo_produtividade(df_filtrado, mes_selecionado, setor_selecionado)
+    if not resumo_prod_for_comp.empty:
+        comp_df = dpa_comparativo(df_dpa_filtrado, resumo_prod_for_comp)
+        if not comp_df.empty and "DPA Calculado %" in comp_df.columns:
+            st.markdown("##### 🔄 Comparativo: DPA Oficial vs DPA Calculado (Produtividade)")
+            st.caption(
+                "DPA Oficial = extraído da planilha Ocupação DPA 2026. "
+                "DPA Calculado = derivado da coluna DPA_RESULTADO da planilha de Produtividade."
+            )
+            comp_df = comp_df.sort_values("DPA Oficial %", ascending=False).reset_index(drop=True)
+            comp_df.index += 1; comp_df.index.name = "#"
+            fmt_comp = {"DPA Oficial %": "{:.1f}", "DPA Calculado %": "{:.1f}", "Diferença": "{:+.1f}"}
+            styled_comp = comp_df.style.format(fmt_comp, na_rep="—")
+            styled_comp = styled_comp.background_gradient(cmap="RdYlGn", subset=["DPA Oficial %"], vmin=50, vmax=100)
+            if comp_df["Diferença"].notna().any():
+                styled_comp = styled_comp.background_gradient(cmap="RdYlGn", subset=["Diferença"], vmin=-20, vmax=20)
+            st.dataframe(styled_comp, use_container_width=True)
+
+    # ---- Export ----
+    st.markdown("---")
+    csv_dpa = df_dpa_filtrado[["Login", "Nome", "Setor", "DPA_Pct_Oficial"]].copy()
+    csv_dpa.columns = ["Login", "Nome", "Setor", "DPA % Oficial"]
+    st.download_button(
+        "📥 Baixar Ocupação DPA (CSV)",
+        csv_dpa.to_csv(index=False).encode("utf-8"),
+        f"ocupacao_dpa_{mes_nome_dpa.lower()}_2026.csv",
+        "text/csv",
+    )
 
 
 # ---- TAB: FECHAMENTO TOA x SIR (Madrugada) ----
-if fech_sir_loaded and _tab_fech_sir_idx is not None:
-    with tabs[_tab_fech_sir_idx]:
-        anomes_str_fech = str(fech_sir_anomes) if fech_sir_anomes else "?"
-        st.markdown(
-            f"#### 🌙 Fechamento TOA x SIR — **Madrugada** · "
-            f"Período: **{anomes_str_fech}** (mês mais recente)"
-        )
-        st.caption(
-            "📌 Dados extraídos automaticamente do turno **Madrugada**. "
-            "Assertividade = fechamento TOA com causa compatível com o fechamento SIR. "
-            "Líderes (Marley, Kelly, Bruno, Leandro) aparecem em destaque separado abaixo."
-        )
+@_secao("🌙 Fechamento TOA x SIR", fech_sir_loaded)
+def _secao_fech_sir():
+    anomes_str_fech = str(fech_sir_anomes) if fech_sir_anomes else "?"
+    st.markdown(
+        f"#### 🌙 Fechamento TOA x SIR — **Madrugada** · "
+        f"Período: **{anomes_str_fech}**"
+    )
+    st.caption(
+        "📌 Dados extraídos automaticamente do turno **Madrugada**, no período escolhido em "
+        "**Período (Fech. TOA x SIR)** na barra lateral (padrão: mês mais recente da base). "
+        "Assertividade = fechamento TOA com causa compatível com o fechamento SIR. "
+        "Líderes (Marley, Kelly, Bruno, Leandro) aparecem em destaque separado abaixo."
+    )
 
-        # Separar líderes e analistas
-        _fech_eq   = df_fech_sir[~df_fech_sir[FECH_SIR_COL_LOGIN].str.upper().isin({l.upper() for l in LIDERES_IDS})].copy()
-        _fech_lids = df_fech_sir[df_fech_sir[FECH_SIR_COL_LOGIN].str.upper().isin({l.upper() for l in LIDERES_IDS})].copy()
-
-        # KPIs gerais (equipe toda)
-        _n_total_all  = int(df_fech_sir[FECH_SIR_COL_VOLUME].sum())
-        _n_asser_all  = int(df_fech_sir['ASSERTIVO'].sum())
-        _n_nao_all    = _n_total_all - _n_asser_all
-        _pct_all      = (_n_asser_all / _n_total_all * 100) if _n_total_all > 0 else 0
-        _n_analistas_fech = df_fech_sir['Nome'].nunique()
-
-        kf1, kf2, kf3, kf4, kf5 = st.columns(5)
-        with kf1:
-            st.markdown(kpi_card("Total Tarefas", f"{_n_total_all:,}", FECH_SIR_COR), unsafe_allow_html=True)
-        with kf2:
-            st.markdown(kpi_card("Assertivos ✅", f"{_n_asser_all:,}", COR_SUCESSO), unsafe_allow_html=True)
-        with kf3:
-            st.markdown(kpi_card("Não Assertivos ❌", f"{_n_nao_all:,}", COR_PERIGO), unsafe_allow_html=True)
-        with kf4:
-            _pct_c = COR_SUCESSO if _pct_all >= 90 else (COR_ALERTA if _pct_all >= 70 else COR_PERIGO)
-            st.markdown(kpi_card("Assertividade", f"{_pct_all:.1f}", _pct_c, suffix="%"), unsafe_allow_html=True)
-        with kf5:
-            st.markdown(kpi_card("Analistas", f"{_n_analistas_fech}", COR_INFO), unsafe_allow_html=True)
+    # Separar líderes e analistas
+    _fech_eq   = df_fech_sir[~df_fech_sir[FECH_SIR_COL_LOGIN].str.upper().isin({l.upper() for l in LIDERES_IDS})].copy()
+    _fech_lids = df_fech_sir[df_fech_sir[FECH_SIR_COL_LOGIN].str.upper().isin({l.upper() for l in LIDERES_IDS})].copy()
+
+    # KPIs gerais (equipe toda)
+    _n_total_all  = int(df_fech_sir[FECH_SIR_COL_VOLUME].sum())
+    _n_asser_all  = int(df_fech_sir['ASSERTIVO'].sum())
+    _n_nao_all    = _n_total_all - _n_asser_all
+    _pct_all      = (_n_asser_all / _n_total_all * 100) if _n_total_all > 0 else 0
+    _n_analistas_fech = df_fech_sir['Nome'].nunique()
+
+    kf1, kf2, kf3, kf4, kf5 = st.columns(5)
+    with kf1:
+        st.markdown(kpi_card("Total Tarefas", f"{_n_total_all:,}", FECH_SIR_COR), unsafe_allow_html=True)
+    with kf2:
+        st.markdown(kpi_card("Assertivos ✅", f"{_n_asser_all:,}", COR_SUCESSO), unsafe_allow_html=True)
+    with kf3:
+        st.markdown(kpi_card("Não Assertivos ❌", f"{_n_nao_all:,}", COR_PERIGO), unsafe_allow_html=True)
+    with kf4:
+        _pct_c = COR_SUCESSO if _pct_all >= 90 else (COR_ALERTA if _pct_all >= 70 else COR_PERIGO)
+        st.markdown(kpi_card("Assertividade", f"{_pct_all:.1f}", _pct_c, suffix="%"), unsafe_allow_html=True)
+    with kf5:
+        st.markdown(kpi_card("Analistas", f"{_n_analistas_fech}", COR_INFO), unsafe_allow_html=True)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ==================================
-        # SEÇÃO: ANALISTAS (sem líderes)
-        # ==================================
-        st.markdown("### 👥 Analistas — Assertividade Madrugada")
-
-        col_ra, col_ca = st.columns([1, 1])
-
-        with col_ra:
-            st.markdown("##### 🏆 Ranking por Analista")
-            _resumo_eq = fech_sir_resumo_analista(_fech_eq if not _fech_eq.empty else df_fech_sir)
-            if not _resumo_eq.empty:
-                _resumo_eq["Analista"] = _resumo_eq["Nome"].apply(primeiro_nome)
-                _tbl_eq = _resumo_eq[["Analista", "Setor", "Volume", "Assertivos", "Assertividade_Pct"]].copy()
-                _tbl_eq.columns = ["Analista", "Setor", "Tarefas", "Assertivos", "Assertividade %"]
-                _tbl_eq = _tbl_eq.reset_index(drop=True)
-                _tbl_eq.index += 1; _tbl_eq.index.name = "#"
-                st.dataframe(
-                    _tbl_eq.style
-                        .format({"Assertividade %": "{:.1f}"}, na_rep="—")
-                        .background_gradient(cmap="RdYlGn", subset=["Assertividade %"], vmin=50, vmax=100)
-                        .background_gradient(cmap=FECH_SIR_COR and "Purples", subset=["Tarefas"]),
-                    use_container_width=True,
-                )
-                if len(_tbl_eq) >= 2:
-                    _best_a = _tbl_eq.iloc[0]; _worst_a = _tbl_eq.iloc[-1]
-                    ca1, ca2 = st.columns(2)
-                    with ca1:
-                        st.markdown(f"""<div class="perf-card perf-best">
+    # ==================================
+    # SEÇÃO: ANALISTAS (sem líderes)
+    # ==================================
+    st.markdown("### 👥 Analistas — Assertividade Madrugada")
+
+    col_ra, col_ca = st.columns([1, 1])
+
+    with col_ra:
+        st.markdown("##### 🏆 Ranking por Analista")
+        _resumo_eq = fech_sir_resumo_analista(_fech_eq if not _fech_eq.empty else df_fech_sir)
+        if not _resumo_eq.empty:
+            _resumo_eq["Analista"] = primeiros_nomes(_resumo_eq["Nome"])
+            _tbl_eq = _resumo_eq[["Analista", "Setor", "Volume", "Assertivos", "Assertividade_Pct"]].copy()
+            _tbl_eq.columns = ["Analista", "Setor", "Tarefas", "Assertivos", "Assertividade %"]
+            _tbl_eq = _tbl_eq.reset_index(drop=True)
+            _tbl_eq.index += 1; _tbl_eq.index.name = "#"
+            st.dataframe(
+                _tbl_eq.style
+                    .format({"Assertividade %": "{:.1f}"}, na_rep="—")
+                    .background_gradient(cmap="RdYlGn", subset=["Assertividade %"], vmin=50, vmax=100)
+                    .background_gradient(cmap=FECH_SIR_COR and "Purples", subset=["Tarefas"]),
+                use_container_width=True,
+            )
+            if len(_tbl_eq) >= 2:
+                _best_a = _tbl_eq.iloc[0]; _worst_a = _tbl_eq.iloc[-1]
+                ca1, ca2 = st.columns(2)
+                with ca1:
+                    st.markdown(f"""<div class="perf-card perf-best">
                             <div class="p-title">🏆 Melhor Assertividade</div>
                             <div class="p-name" style="color:#2ECC71;">{_best_a['Analista']}</div>
                             <div class="p-detail">{_best_a['Assertividade %']:.1f}% · {int(_best_a['Tarefas'])} tarefas</div>
                         </div>""", unsafe_allow_html=True)
-                    with ca2:
-                        st.markdown(f"""<div class="perf-card perf-worst">
+                with ca2:
+                    st.markdown(f"""<div class="perf-card perf-worst">
                             <div class="p-title">⚠️ Menor Assertividade</div>
                             <div class="p-name" style="color:#E74C3C;">{_worst_a['Analista']}</div>
                             <div class="p-detail">{_worst_a['Assertividade %']:.1f}% · {int(_worst_a['Tarefas'])} tarefas</div>
                         </div>""", unsafe_allow_html=True)
 
-        with col_ca:
-            st.markdown("##### 📊 Assertividade por Analista")
-            if not _resumo_eq.empty:
-                _chart_eq = _resumo_eq[["Analista", "Assertividade_Pct"]].set_index("Analista").sort_values("Assertividade_Pct")
-                _chart_eq.columns = ["Assertividade %"]
-                st.bar_chart(_chart_eq, horizontal=True, color=FECH_SIR_COR, height=400)
+    with col_ca:
+        st.markdown("##### 📊 Assertividade por Analista")
+        if not _resumo_eq.empty:
+            _chart_eq = _resumo_eq[["Analista", "Assertividade_Pct"]].set_index("Analista").sort_values("Assertividade_Pct")
+            _chart_eq.columns = ["Assertividade %"]
+            st.bar_chart(_chart_eq, horizontal=True, color=FECH_SIR_COR, height=400)
 
-        st.markdown("---")
+    st.markdown("---")
 
-        # ==================================
-        # LÍDERES
-        # ==================================
-        if not _fech_lids.empty:
-            st.markdown("### 👑 Líderes — Assertividade Madrugada")
-            _resumo_lid_fech = fech_sir_resumo_analista(_fech_lids)
-            if not _resumo_lid_fech.empty:
-                _resumo_lid_fech["Analista"] = _resumo_lid_fech["Nome"].apply(primeiro_nome)
-                _tbl_lid = _resumo_lid_fech[["Analista", "Setor", "Volume", "Assertivos", "Assertividade_Pct"]].copy()
-                _tbl_lid.columns = ["Analista", "Setor", "Tarefas", "Assertivos", "Assertividade %"]
-                _tbl_lid = _tbl_lid.reset_index(drop=True)
-                _tbl_lid.index += 1; _tbl_lid.index.name = "#"
-                _cl1, _cl2 = st.columns([1, 1])
-                with _cl1:
-                    st.dataframe(
-                        _tbl_lid.style
-                            .format({"Assertividade %": "{:.1f}"}, na_rep="—")
-                            .background_gradient(cmap="RdYlGn", subset=["Assertividade %"], vmin=50, vmax=100),
-                        use_container_width=True,
-                    )
-                with _cl2:
-                    _chart_lid = _tbl_lid[["Analista", "Assertividade %"]].set_index("Analista").sort_values("Assertividade %")
-                    st.bar_chart(_chart_lid, horizontal=True, color="#F39C12", height=250)
-            st.markdown("---")
-
-        # ==================================
-        # BREAKDOWNS
-        # ==================================
-        bc1, bc2 = st.columns(2)
-        with bc1:
-            st.markdown("##### ❌ Top Causas Não Assertivas — TOA")
-            _causa_toa = fech_sir_por_causa_toa(df_fech_sir)
-            if not _causa_toa.empty:
+    # ==================================
+    # LÍDERES
+    # ==================================
+    if not _fech_lids.empty:
+        st.markdown("### 👑 Líderes — Assertividade Madrugada")
+        _resumo_lid_fech = fech_sir_resumo_analista(_fech_lids)
+        if not _resumo_lid_fech.empty:
+            _resumo_lid_fech["Analista"] = primeiros_nomes(_resumo_lid_fech["Nome"])
+            _tbl_lid = _resumo_lid_fech[["Analista", "Setor", "Volume", "Assertivos", "Assertividade_Pct"]].copy()
+            _tbl_lid.columns = ["Analista", "Setor", "Tarefas", "Assertivos", "Assertividade %"]
+            _tbl_lid = _tbl_lid.reset_index(drop=True)
+            _tbl_lid.index += 1; _tbl_lid.index.name = "#"
+            _cl1, _cl2 = st.columns([1, 1])
+            with _cl1:
                 st.dataframe(
-                    _causa_toa.style.background_gradient(cmap="Reds", subset=["Não Assertivo"]),
-                    use_container_width=True, hide_index=True,
+                    _tbl_lid.style
+                        .format({"Assertividade %": "{:.1f}"}, na_rep="—")
+                        .background_gradient(cmap="RdYlGn", subset=["Assertividade %"], vmin=50, vmax=100),
+                    use_container_width=True,
                 )
+            with _cl2:
+                _chart_lid = _tbl_lid[["Analista", "Assertividade %"]].set_index("Analista").sort_values("Assertividade %")
+                st.bar_chart(_chart_lid, horizontal=True, color="#F39C12", height=250)
+        st.markdown("---")
 
-        with bc2:
-            st.markdown("##### ❌ Top Causas Não Assertivas — SIR")
-            _causa_sir = fech_sir_por_causa_sir(df_fech_sir)
-            if not _causa_sir.empty:
-                st.dataframe(
-                    _causa_sir.style.background_gradient(cmap="Reds", subset=["Não Assertivo"]),
-                    use_container_width=True, hide_index=True,
-                )
+    # ==================================
+    # BREAKDOWNS
+    # ==================================
+    bc1, bc2 = st.columns(2)
+    with bc1:
+        st.markdown("##### ❌ Top Causas Não Assertivas — TOA")
+        _causa_toa = quebra("fech_sir_por_causa_toa", df_fech_sir, **recorte_fech_sir)
+        if not _causa_toa.empty:
+            st.dataframe(
+                _causa_toa.style.background_gradient(cmap="Reds", subset=["Não Assertivo"]),
+                use_container_width=True, hide_index=True,
+            )
+
+    with bc2:
+        st.markdown("##### ❌ Top Causas Não Assertivas — SIR")
+        _causa_sir = quebra("fech_sir_por_causa_sir", df_fech_sir, **recorte_fech_sir)
+        if not _causa_sir.empty:
+            st.dataframe(
+                _causa_sir.style.background_gradient(cmap="Reds", subset=["Não Assertivo"]),
+                use_container_width=True, hide_index=True,
+            )
 
-        bc3, bc4 = st.columns(2)
-        with bc3:
-            st.markdown("##### 🗺️ Por Grupo (IN_GRUPO) — Regional Leste")
-            _grp_fech = fech_sir_por_grupo(df_fech_sir)
+    bc3, bc4 = st.columns(2)
+    with bc3:
+        st.markdown("##### 🗺️ Por Grupo (IN_GRUPO) — Regional Leste")
+        _grp_fech = quebra("fech_sir_por_grupo", df_fech_sir, **recorte_fech_sir)
+        if not _grp_fech.empty:
             if not _grp_fech.empty:
-                if not _grp_fech.empty:
-                    _bg_f = _grp_fech.loc[_grp_fech["Assertividade_Pct"].idxmax()]
-                    _bw_f = _grp_fech.loc[_grp_fech["Assertividade_Pct"].idxmin()]
-                    st.caption(
-                        f"🟢 Melhor: **{_bg_f['Grupo']}** ({_bg_f['Assertividade_Pct']:.1f}%) · "
-                        f"🔴 Pior: **{_bw_f['Grupo']}** ({_bw_f['Assertividade_Pct']:.1f}%)"
-                    )
-                st.dataframe(
-                    _grp_fech.style
-                        .format({"Assertividade_Pct": "{:.1f}"}, na_rep="—")
-                        .background_gradient(cmap="RdYlGn", subset=["Assertividade_Pct"], vmin=50, vmax=100)
-                        .background_gradient(cmap="Purples", subset=["Volume"]),
-                    use_container_width=True, hide_index=True,
-                )
-        with bc4:
-            st.markdown("##### 📋 Por Tipo de Demanda")
-            _dem_fech = fech_sir_por_demanda(df_fech_sir)
-            if not _dem_fech.empty:
-                st.dataframe(
-                    _dem_fech.style
-                        .format({"Assertividade_Pct": "{:.1f}"}, na_rep="—")
-                        .background_gradient(cmap="RdYlGn", subset=["Assertividade_Pct"], vmin=50, vmax=100),
-                    use_container_width=True, hide_index=True,
+                _bg_f = _grp_fech.loc[_grp_fech["Assertividade_Pct"].idxmax()]
+                _bw_f = _grp_fech.loc[_grp_fech["Assertividade_Pct"].idxmin()]
+                st.caption(
+                    f"🟢 Melhor: **{_bg_f['Grupo']}** ({_bg_f['Assertividade_Pct']:.1f}%) · "
+                    f"🔴 Pior: **{_bw_f['Grupo']}** ({_bw_f['Assertividade_Pct']:.1f}%)"
                 )
+            st.dataframe(
+                _grp_fech.style
+                    .format({"Assertividade_Pct": "{:.1f}"}, na_rep="—")
+                    .background_gradient(cmap="RdYlGn", subset=["Assertividade_Pct"], vmin=50, vmax=100)
+                    .background_gradient(cmap="Purples", subset=["Volume"]),
+                use_container_width=True, hide_index=True,
+            )
+    with bc4:
+        st.markdown("##### 📋 Por Tipo de Demanda")
+        _dem_fech = quebra("fech_sir_por_demanda", df_fech_sir, **recorte_fech_sir)
+        if not _dem_fech.empty:
+            st.dataframe(
+                _dem_fech.style
+                    .format({"Assertividade_Pct": "{:.1f}"}, na_rep="—")
+                    .background_gradient(cmap="RdYlGn", subset=["Assertividade_Pct"], vmin=50, vmax=100),
+                use_container_width=True, hide_index=True,
+            )
 
-        # Evolução diária
-        st.markdown("---")
-        st.markdown("##### 📅 Evolução Diária — Assertividade Madrugada")
-        _dia_fech = fech_sir_por_dia(df_fech_sir)
-        if not _dia_fech.empty:
-            _evo1, _evo2 = st.columns(2)
-            with _evo1:
-                st.caption("Volume diário de tarefas")
-                st.bar_chart(_dia_fech[["Dia", "Volume"]].set_index("Dia"), color=FECH_SIR_COR, height=220)
-            with _evo2:
-                st.caption("Assertividade diária (%)")
-                st.line_chart(_dia_fech[["Dia", "Assertividade_Pct"]].set_index("Dia"), color=COR_SUCESSO, height=220)
-
-        # Insights
-        st.markdown("---")
-        st.markdown("### 💡 Insights — Fechamento TOA x SIR Madrugada")
-        _fech_insights = []
-        if not _resumo_eq.empty:
-            _avg_asser  = _resumo_eq["Assertividade_Pct"].mean()
-            _best_fech  = _resumo_eq.iloc[0]
-            _worst_fech = _resumo_eq.iloc[-1]
-            _fech_insights.append(f"📊 Assertividade média da equipe na madrugada: **{_avg_asser:.1f}%**.")
-            _fech_insights.append(f"🏆 Melhor: **{_best_fech['Analista']}** com **{_best_fech['Assertividade_Pct']:.1f}%** ({int(_best_fech['Volume'])} tarefas).")
-            _fech_insights.append(f"⚠️ Atenção: **{_worst_fech['Analista']}** com **{_worst_fech['Assertividade_Pct']:.1f}%** ({int(_worst_fech['Volume'])} tarefas).")
-            _low_asser = _resumo_eq[_resumo_eq["Assertividade_Pct"] < 80]
-            if len(_low_asser) > 0:
-                _fech_insights.append(f"🔴 {len(_low_asser)} analista(s) com assertividade abaixo de 80%: {', '.join(_low_asser['Analista'].tolist())}.")
-        if not _causa_toa.empty:
-            _top_c = _causa_toa.iloc[0]
-            _fech_insights.append(f"🔧 Causa TOA mais frequente nos não assertivos: **{_top_c['Causa TOA']}** ({int(_top_c['Não Assertivo'])} ocorrências).")
-        if _fech_insights:
-            for ins in _fech_insights:
-                st.markdown(ins)
+    # Evolução diária
+    st.markdown("---")
+    st.markdown("##### 📅 Evolução Diária — Assertividade Madrugada")
+    _dia_fech = quebra("fech_sir_por_dia", df_fech_sir, **recorte_fech_sir)
+    if not _dia_fech.empty:
+        _evo1, _evo2 = st.columns(2)
+        with _evo1:
+            st.caption("Volume diário de tarefas")
+            st.bar_chart(_dia_fech[["Dia", "Volume"]].set_index("Dia"), color=FECH_SIR_COR, height=220)
+        with _evo2:
+            st.caption("Assertividade diária (%)")
+            st.line_chart(_dia_fech[["Dia", "Assertividade_Pct"]].set_index("Dia"), color=COR_SUCESSO, height=220)
+
+    # Insights
+    st.markdown("---")
+    st.markdown("### 💡 Insights — Fechamento TOA x SIR Madrugada")
+    _fech_insights = []
+    if not _resumo_eq.empty:
+        _avg_asser  = _resumo_eq["Assertividade_Pct"].mean()
+        _best_fech  = _resumo_eq.iloc[0]
+        _worst_fech = _resumo_eq.iloc[-1]
+        _fech_insights.append(f"📊 Assertividade média da equipe na madrugada: **{_avg_asser:.1f}%**.")
+        _fech_insights.append(f"🏆 Melhor: **{_best_fech['Analista']}** com **{_best_fech['Assertividade_Pct']:.1f}%** ({int(_best_fech['Volume'])} tarefas).")
+        _fech_insights.append(f"⚠️ Atenção: **{_worst_fech['Analista']}** com **{_worst_fech['Assertividade_Pct']:.1f}%** ({int(_worst_fech['Volume'])} tarefas).")
+        _low_asser = _resumo_eq[_resumo_eq["Assertividade_Pct"] < 80]
+        if len(_low_asser) > 0:
+            _fech_insights.append(f"🔴 {len(_low_asser)} analista(s) com assertividade abaixo de 80%: {', '.join(_low_asser['Analista'].tolist())}.")
+    if not _causa_toa.empty:
+        _top_c = _causa_toa.iloc[0]
+        _fech_insights.append(f"🔧 Causa TOA mais frequente nos não assertivos: **{_top_c['Causa TOA']}** ({int(_top_c['Não Assertivo'])} ocorrências).")
+    if _fech_insights:
+        for ins in _fech_insights:
+            st.markdown(ins)
+
+    # Export
+    st.markdown("---")
+    _fech_export_cols = [c for c in [
+        FECH_SIR_COL_LOGIN, 'Nome', 'Setor', FECH_SIR_COL_ANOMES,
+        FECH_SIR_COL_VOLUME, 'ASSERTIVO', FECH_SIR_COL_CAUSA_TOA,
+        FECH_SIR_COL_CAUSA_SIR, FECH_SIR_COL_REGIONAL, FECH_SIR_COL_DEMANDA,
+        FECH_SIR_COL_DIA,
+    ] if c in df_fech_sir.columns]
+    csv_fech = df_fech_sir[_fech_export_cols].to_csv(index=False).encode("utf-8")
+    st.download_button(
+        "📥 Baixar Fechamento TOA x SIR Madrugada (CSV)",
+        csv_fech,
+        f"fech_toa_sir_madrugada_{anomes_str_fech}.csv",
+        "text/csv",
+    )
 
-        # Export
-        st.markdown("---")
-        _fech_export_cols = [c for c in [
-            FECH_SIR_COL_LOGIN, 'Nome', 'Setor', FECH_SIR_COL_ANOMES,
-            FECH_SIR_COL_VOLUME, 'ASSERTIVO', FECH_SIR_COL_CAUSA_TOA,
-            FECH_SIR_COL_CAUSA_SIR, FECH_SIR_COL_REGIONAL, FECH_SIR_COL_DEMANDA,
-            FECH_SIR_COL_DIA,
-        ] if c in df_fech_sir.columns]
-        csv_fech = df_fech_sir[_fech_export_cols].to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "📥 Baixar Fechamento TOA x SIR Madrugada (CSV)",
-            csv_fech,
-            f"fech_toa_sir_madrugada_{anomes_str_fech}.csv",
-            "text/csv",
-        )
+
+# Seção ativa (a escolha de uma seção que sumiu volta para a primeira)
+if st.session_state.get("secao_ativa") not in _SECOES:
+    st.session_state.pop("secao_ativa", None)
+secao_ativa = st.radio(
+    "Seção", list(_SECOES), horizontal=True, key="secao_ativa", label_visibility="collapsed",
+)
+_SECOES[secao_ativa]()
 
 
 # =====================================================
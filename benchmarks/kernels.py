@@ -0,0 +1,112 @@
+"""
+Benchmark dos kernels vetorizados (src/kernels.py) contra as versões linha a
+linha que eles substituíram. Rodar da raiz do projeto:
+
+    python -m benchmarks.kernels [--linhas 500000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import kernels
+from src.config import (
+    RES_INDICADORES_FILTRO, RES_IND_INVERTIDOS, BASE_EQUIPE,
+    DPA_THRESHOLD_OK, DPA_THRESHOLD_ALERTA,
+)
+from src.processors import primeiro_nome, primeiros_nomes
+
+
+# ---------- versões linha a linha (como eram) ----------
+
+def aderente_linha(df):
+    return df.apply(
+        lambda row: (
+            (row["INDICADOR"] == 0)
+            if row["INDICADOR_NOME"] in RES_IND_INVERTIDOS
+            else (row["INDICADOR"] == 1)
+        ),
+        axis=1,
+    ).astype(int)
+
+
+def semaforo(pct):
+    if pct is None:
+        return "—"
+    if pct >= DPA_THRESHOLD_OK:
+        return "🟢"
+    if pct >= DPA_THRESHOLD_ALERTA:
+        return "🟡"
+    return "🔴"
+
+
+def rank_linha(df, cols):
+    # O que build_insights fazia por analista: filtra o setor e compara
+    ranks = {}
+    for i, row in df.iterrows():
+        peers = df[df["Setor"] == row["Setor"]]
+        ranks[i] = [int((peers[k].fillna(0) > row[k]).sum() + 1) for k in cols]
+    return pd.DataFrame.from_dict(ranks, orient="index", columns=cols)
+
+
+# ---------- dados sintéticos ----------
+
+def residencial(n, rng):
+    return pd.DataFrame({
+        "INDICADOR_NOME": rng.choice(RES_INDICADORES_FILTRO, n),
+        "INDICADOR": rng.integers(0, 2, n).astype(float),
+    })
+
+
+def resumo(n, rng, cols=20):
+    df = pd.DataFrame(rng.random((n, cols)) * 100, columns=[f"VOL_{i}" for i in range(cols)])
+    df["Setor"] = rng.choice(["RESIDENCIAL", "EMPRESARIAL"], n)
+    return df
+
+
+def mede(func, *args, repeticoes=1):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=500_000)
+    parser.add_argument("--analistas", type=int, default=300)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    df = residencial(args.linhas, rng)
+    nomes = pd.Series(rng.choice(BASE_EQUIPE["Nome"].to_numpy(), args.linhas))
+    pcts = pd.Series(rng.choice(np.round(rng.random(200) * 100, 2), args.linhas))
+    res = resumo(args.analistas, rng)
+    cols = [c for c in res.columns if c.startswith("VOL_")]
+
+    casos = [
+        (f"ADERENTE ({args.linhas:,} linhas)",
+         lambda: aderente_linha(df),
+         lambda: kernels.aderente(df["INDICADOR_NOME"], df["INDICADOR"], RES_IND_INVERTIDOS)),
+        (f"primeiro_nome ({args.linhas:,} linhas)",
+         lambda: nomes.apply(primeiro_nome),
+         lambda: primeiros_nomes(nomes)),
+        (f"semáforo DPA ({args.linhas:,} linhas)",
+         lambda: pcts.apply(semaforo),
+         lambda: kernels.por_valor(pcts, semaforo)),
+        (f"ranking no setor ({args.analistas} analistas x {len(cols)} colunas)",
+         lambda: rank_linha(res, cols),
+         lambda: kernels.rank_no_grupo(res, cols, "Setor")),
+    ]
+    print(f"{'função':<48} {'linha a linha':>14} {'vetorizado':>11} {'ganho':>8}")
+    for nome, antes, depois in casos:
+        t_antes = mede(antes)
+        t_depois = mede(depois, repeticoes=3)
+        print(f"{nome:<48} {t_antes:>13.3f}s {t_depois:>10.4f}s {t_antes / t_depois:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
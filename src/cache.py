@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src import config
+from src.spill import SpilledFile
+
+
+def content_hash(data: bytes) -> str:
+    """Hash do conteúdo bruto do arquivo enviado."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _estavel(valor):
+    """Forma do valor com repr estável entre processos (conjuntos ordenados, DataFrame pelo conteúdo)."""
+    if isinstance(valor, pd.DataFrame):
+        return list(valor.columns), pd.util.hash_pandas_object(valor, index=False).tolist()
+    if isinstance(valor, (set, frozenset)):
+        return sorted((_estavel(v) for v in valor), key=repr)
+    if isinstance(valor, dict):
+        return sorted(((k, _estavel(v)) for k, v in valor.items()), key=lambda item: repr(item[0]))
+    if isinstance(valor, (list, tuple)):
+        return [_estavel(v) for v in valor]
+    if callable(valor):
+        return f"{valor.__module__}.{valor.__qualname__}"
+    return valor
+
+
+def config_fingerprint() -> str:
+    """
+    Hash das configurações que alteram o resultado dos loaders.
+    Os loaders leem boa parte de src/config.py (equipe e BASE_EQUIPE, regional,
+    header, filtros de indicadores, colunas projetadas...), então entram todas
+    as constantes do módulo: qualquer mudança invalida o cache de parse e as
+    planilhas já ingeridas na base local (ParquetStore.source_key_for).
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for nome in sorted(n for n in vars(config) if n.isupper()):
+        h.update(repr((nome, _estavel(getattr(config, nome)))).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache LRU de resultados dos loaders, chaveado por
+    (loader, hash do conteúdo, hash das configurações).
+
+    Cada arquivo é parseado uma única vez por versão de conteúdo; reruns do
+    Streamlit reaproveitam o resultado. Os objetos retornados são
+    compartilhados entre reruns — não devem ser modificados in-place.
+    O parse em si roda em src/ingest.py (load_all), que consulta e alimenta
+    o cache com get/put.
+    """
+
+    def __init__(self, max_entries: int = config.PARSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key_for(self, loader, data: bytes | SpilledFile) -> tuple:
+        # Upload no spill (src/spill.py) já traz o hash do conteúdo
+        digest = data.digest if hasattr(data, "digest") else content_hash(data)
+        return (f"{loader.__module__}.{loader.__qualname__}", digest, config_fingerprint())
+
+    def get(self, loader, data: bytes | SpilledFile, default=None):
+        """Resultado já em cache para (loader, data), ou `default`."""
+        key = self.key_for(loader, data)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return default
+
+    def put(self, loader, data: bytes | SpilledFile, result):
+        key = self.key_for(loader, data)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Instância única por processo (sobrevive aos reruns do script)
+PARSE_CACHE = ParseCache()
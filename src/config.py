@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 import pandas as pd
 
 # =====================================================
@@ -136,6 +139,16 @@ ETIT_COL_TMA = "TMA"
 ETIT_COL_TMR = "TMR"
 ETIT_COL_ANOMES = "ANOMES"
 
+# Colunas lidas da planilha ETIT (as demais nem chegam a ser decodificadas)
+ETIT_COLUNAS = [
+    ETIT_COL_INDICADOR, ETIT_COL_LOGIN, ETIT_COL_DEMANDA, ETIT_COL_NOTA,
+    ETIT_COL_VOLUME, ETIT_COL_INDICADOR_VAL, ETIT_COL_STATUS, ETIT_COL_TIPO,
+    ETIT_COL_AREA, ETIT_COL_CAUSA, ETIT_COL_REGIONAL, ETIT_COL_GRUPO,
+    ETIT_COL_CIDADE, ETIT_COL_UF, ETIT_COL_TOA, ETIT_COL_DT_INICIO,
+    ETIT_COL_DT_FIM, ETIT_COL_DT_EMISSAO, ETIT_COL_DT_ACIONAMENTO,
+    ETIT_COL_TURNO, ETIT_COL_TMA, ETIT_COL_TMR, ETIT_COL_ANOMES,
+]
+
 ETIT_SHEET_CANDIDATES = ["Empresarial", "ETIT", "Analítico"]
 
 # =====================================================
@@ -197,6 +210,17 @@ RES_COL_TMA             = "TMA"
 RES_COL_TMR             = "TMR"
 RES_COL_ANOMES          = "ANOMES"
 
+# Colunas lidas da planilha Residencial (as demais nem chegam a ser decodificadas)
+RES_COLUNAS = [
+    RES_COL_INDICADOR_NOME, RES_COL_ID_MOSTRA, RES_COL_VOLUME,
+    RES_COL_INDICADOR_VAL, RES_COL_STATUS, RES_COL_REGIONAL, RES_COL_GRUPO,
+    RES_COL_CIDADE, RES_COL_UF, RES_COL_TECNOLOGIA, RES_COL_SERVICO,
+    RES_COL_NATUREZA, RES_COL_SINTOMA, RES_COL_FERRAMENTA,
+    RES_COL_FECHAMENTO, RES_COL_SOLUCAO, RES_COL_IMPACTO,
+    RES_COL_ENVIADO_TOA, RES_COL_DT_INICIO, RES_COL_DT_FIM, RES_COL_TMA,
+    RES_COL_TMR, RES_COL_ANOMES,
+]
+
 RES_SHEET_CANDIDATES = ["Analitico", "Analítico", "Residencial", "Sheet1"]
 
 # =====================================================
@@ -207,6 +231,9 @@ RES_SHEET_CANDIDATES = ["Analitico", "Analítico", "Residencial", "Sheet1"]
 DPA_SHEET_ANALISTAS   = "Analistas"
 DPA_SHEET_CONSOLIDADO = "Consolidado"
 
+# Faixa de colunas (posições, 0-based) onde ficam os pivots das duas abas
+DPA_COLUNAS = list(range(26, 31))
+
 # Lista de meses em português (para detectar o mês mais recente)
 DPA_MESES_PT = [
     "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
@@ -278,6 +305,18 @@ TOA_COL_INDICADOR       = "INDICADOR"
 TOA_COL_STATUS          = "INDICADOR_STATUS"
 TOA_COL_ANOMES          = "ANOMES"
 
+# Colunas lidas da aba TOA (as demais nem chegam a ser decodificadas)
+TOA_COLUNAS = [
+    TOA_COL_INDICADOR_NOME, TOA_COL_ID_ATIVIDADE, TOA_COL_LOGIN,
+    TOA_COL_RESPONSAVEL, TOA_COL_REGIONAL, TOA_COL_GRUPO, TOA_COL_CIDADE,
+    TOA_COL_UF, TOA_COL_TIPO_ATIVIDADE, TOA_COL_TIPO_INCIDENTE, TOA_COL_REDE,
+    TOA_COL_MERCADO, TOA_COL_NATUREZA, TOA_COL_MDU, TOA_COL_FECHAMENTO,
+    TOA_COL_SOLUCAO, TOA_COL_DATA, TOA_COL_DT_ROTEAMENTO,
+    TOA_COL_DT_INICIO_FORM, TOA_COL_DT_FIM_FORM, TOA_COL_DT_CANCELAMENTO,
+    TOA_COL_TMR, TOA_COL_AGING, TOA_COL_INDICADOR, TOA_COL_STATUS,
+    TOA_COL_ANOMES,
+]
+
 # Ordenação dos faixas de AGING (do menor para o maior)
 TOA_AGING_ORDER = [
     "Até 1 Min", "Até 5 Min", "Até 15 Min", "Até 30 Min",
@@ -310,6 +349,12 @@ FECH_SIR_COL_DIA        = "DIA"
 FECH_SIR_COL_MES        = "MES"
 FECH_SIR_COL_STATUS     = "STATUS"
 
+# Campos que identificam o pivot cache certo quando o arquivo tem vários
+FECH_SIR_COLUNAS_CACHE = [
+    FECH_SIR_COL_LOGIN, FECH_SIR_COL_TURNO, FECH_SIR_COL_ANOMES,
+    FECH_SIR_COL_ASSERTIVO,
+]
+
 FECH_SIR_COR = "#8E44AD"   # roxo — assertividade TOA x SIR
 
 # =====================================================
@@ -319,6 +364,108 @@ FECH_SIR_COR = "#8E44AD"   # roxo — assertividade TOA x SIR
 # Altere aqui caso a regional mude.
 REGIONAL_FILTRO = "Leste"
 
+# =====================================================
+# CACHE DE PARSE
+# =====================================================
+# Quantos resultados de loader (um por arquivo/versão) ficam em memória.
+# Ao exceder, o menos usado recentemente é descartado (LRU).
+PARSE_CACHE_MAX_ENTRIES = 12
+
+# =====================================================
+# SPILL DOS UPLOADS (src/spill.py)
+# =====================================================
+# Uploads ficam em disco (um arquivo por hash de conteúdo), não na sessão.
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "dashboard_cop_rede_uploads")
+# Arquivos sem uso há mais que isso são removidos
+SPILL_TTL_SEC = 6 * 60 * 60
+# Limite do diretório; acima dele saem os parados há mais tempo
+SPILL_MAX_BYTES = 3 * 1024 ** 3
+
+# =====================================================
+# CARGA PARALELA
+# =====================================================
+# Processos usados para parsear as planilhas enviadas ao mesmo tempo
+# (uma planilha por processo).
+INGEST_MAX_WORKERS = 6
+
+# =====================================================
+# BASE LOCAL (Parquet em data/)
+# =====================================================
+# Um subdiretório por dataset; partições em ANOMES=<valor>/
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Datasets gravados na base local e a coluna de partição de cada um
+# (None = dataset sem partição, regravado a cada carga)
+STORE_DATASETS = {
+    "produtividade": COL_ANOMES,
+    "etit": ETIT_COL_ANOMES,
+    "res_ind": RES_COL_ANOMES,
+    "toa": TOA_COL_ANOMES,
+    "dpa": None,
+    "fech_sir": FECH_SIR_COL_ANOMES,
+}
+
+# Chave natural de cada dataset particionado, usada no upsert das cargas.
+# Datasets fora daqui (ex.: dados do pivot cache) usam o hash da linha inteira.
+# Linhas repetidas na mesma chave são diferenciadas pela ordem de ocorrência.
+STORE_CHAVES = {
+    "produtividade": [COL_LOGIN, COL_DATA],
+    "toa": [TOA_COL_ID_ATIVIDADE, TOA_COL_INDICADOR_NOME],
+    "res_ind": [RES_COL_ID_MOSTRA, RES_COL_INDICADOR_NOME],
+    "etit": [ETIT_COL_NOTA, ETIT_COL_LOGIN],
+}
+
+# Datasets com histórico de cargas: cada carga fica guardada como versão
+# imutável (linhas + hash por linha) para a visão "o que mudou desde o envio
+# anterior". Valor = quantas versões manter por dataset.
+STORE_VERSOES = {
+    "produtividade": 10,
+    "etit": 10,
+}
+
+# Arquivos de delta acumulados por partição antes de compactar em um só
+STORE_MAX_DELTAS = 8
+
+# Cubo de agregados gravado na carga (src/cube.py): dimensões no menor grão
+# que as quebras do dashboard usam e colunas somadas. "Data" e "Dia" são
+# dimensões derivadas (dia de DT_ACIONAMENTO no ETIT, DIA numérico no Fech).
+CUBO_DIMENSOES = {
+    "etit": [
+        ETIT_COL_LOGIN, "Nome", "Setor", ETIT_COL_DEMANDA, ETIT_COL_TIPO, ETIT_COL_CAUSA,
+        ETIT_COL_REGIONAL, ETIT_COL_GRUPO, ETIT_COL_TURNO, "Data",
+    ],
+    "res_ind": [
+        RES_COL_INDICADOR_NOME, RES_COL_REGIONAL, RES_COL_GRUPO, RES_COL_NATUREZA,
+        RES_COL_SOLUCAO, RES_COL_IMPACTO, "DATA_DIA",
+    ],
+    "toa": [
+        TOA_COL_INDICADOR_NOME, TOA_COL_LOGIN, "Nome", "Setor", TOA_COL_TIPO_ATIVIDADE,
+        TOA_COL_AGING, TOA_COL_REDE, TOA_COL_REGIONAL, TOA_COL_GRUPO, "DATA_DIA",
+    ],
+    "fech_sir": [
+        FECH_SIR_COL_LOGIN, "Nome", "Setor", FECH_SIR_COL_CAUSA_TOA, FECH_SIR_COL_CAUSA_SIR,
+        FECH_SIR_COL_REGIONAL, FECH_SIR_COL_DEMANDA, FECH_SIR_COL_GRUPO, "Dia", "ASSERTIVO",
+    ],
+}
+CUBO_MEDIDAS = {
+    "etit": [ETIT_COL_VOLUME, ETIT_COL_INDICADOR_VAL, ETIT_COL_TMA, ETIT_COL_TMR],
+    "res_ind": [RES_COL_VOLUME, "ADERENTE", RES_COL_TMA, RES_COL_TMR],
+    "toa": [TOA_COL_INDICADOR, "ADERENTE", "TMR_min"],
+    "fech_sir": [FECH_SIR_COL_VOLUME, "ASSERTIVO"],
+}
+
+# =====================================================
+# MOTOR DE CONSULTA
+# =====================================================
+# As quebras (etit_por_*, res_por_*, toa_*, fech_sir_por_*) saem do cubo de
+# agregados da base local (src/query.py).
+# "auto": em SQL no DuckDB direto sobre o Parquet do cubo, se o pacote estiver
+# instalado (senão, como "pandas");
+# "pandas": o cubo é reagrupado em pandas (cube.rollup).
+# Em ambos, as funções de processors sobre os DataFrames em memória só rodam
+# quando o dataset não tem cubo na base.
+QUERY_ENGINE = "auto"
+
 # =====================================================
 # CORES DO DASHBOARD
 # =====================================================
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from src.config import CUBO_DIMENSOES, CUBO_MEDIDAS, ETIT_COL_DT_ACIONAMENTO, FECH_SIR_COL_DIA
+
+
+# =====================================================
+# Cubo de agregados
+# =====================================================
+# Na carga, cada partição dos datasets de CUBO_DIMENSOES vira um cubo: uma
+# linha por combinação de dimensões presente nos dados, só com medidas
+# aditivas — para cada coluna de CUBO_MEDIDAS, a soma (<col>__soma) e a
+# quantidade de valores não nulos (<col>__n), mais o total de linhas
+# (_linhas). Médias saem de soma / quantidade, e qualquer quebra sobre essas
+# dimensões é um novo agrupamento do cubo, sem voltar às linhas brutas.
+
+LINHAS = "_linhas"
+
+
+def soma(col: str) -> str:
+    return f"{col}__soma"
+
+
+def contagem(col: str) -> str:
+    return f"{col}__n"
+
+
+# Dimensões derivadas: calculadas a partir das linhas antes de agrupar
+_DERIVADAS = {
+    "etit": {"Data": lambda df: pd.to_datetime(df[ETIT_COL_DT_ACIONAMENTO], errors="coerce").dt.normalize()},
+    "fech_sir": {"Dia": lambda df: pd.to_numeric(df[FECH_SIR_COL_DIA], errors="coerce")},
+}
+
+
+def has_cube(nome: str) -> bool:
+    return nome in CUBO_DIMENSOES
+
+
+def build_cube(nome: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Cubo do dataset `nome` a partir das linhas vigentes de uma partição."""
+    derivadas = _DERIVADAS.get(nome, {})
+    dims = [c for c in CUBO_DIMENSOES[nome] if c in df.columns or c in derivadas]
+    base = pd.DataFrame(index=df.index)
+    for col in dims:
+        base[col] = derivadas[col](df) if col in derivadas else df[col]
+    for col in CUBO_MEDIDAS[nome]:
+        if col in df.columns:
+            valores = pd.to_numeric(df[col], errors="coerce")
+            base[soma(col)] = valores
+            base[contagem(col)] = valores.notna().astype("int64")
+    base[LINHAS] = np.int64(1)
+    if base.empty or not dims:
+        return base.reset_index(drop=True)
+    # Linhas com dimensão nula continuam no cubo: só saem das quebras que
+    # agrupam por aquela dimensão, como no groupby das linhas brutas.
+    return base.groupby(dims, dropna=False, sort=False).sum().reset_index()
+
+
+# ---------- consulta ----------
+# Medidas das quebras, em termos das colunas do cubo:
+#   ("soma", col), ("media", col), ("conta", col)  — col em CUBO_MEDIDAS
+#   ("linhas",), ("conta_se", dim, valor), ("distintos", dim)
+
+def rollup(cubo: pd.DataFrame, por: dict, medidas: dict, filtros: dict = None) -> pd.DataFrame:
+    """
+    Reagrupa o cubo: `por` = {rótulo: dimensão}, `medidas` = {rótulo: medida},
+    `filtros` = {dimensão: valor ou lista}. Grupos com dimensão nula são
+    descartados. Saída ordenada pelas dimensões.
+    """
+    for col, valor in (filtros or {}).items():
+        if valor is None:
+            continue
+        valores = list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+        cubo = cubo[cubo[col].isin(valores)]
+
+    base = pd.DataFrame({rotulo: cubo[col] for rotulo, col in por.items()})
+    agg = {}
+    for rotulo, (tipo, *args) in medidas.items():
+        if tipo == "soma":
+            base[rotulo] = cubo[soma(args[0])]
+        elif tipo == "conta":
+            base[rotulo] = cubo[contagem(args[0])]
+        elif tipo == "linhas":
+            base[rotulo] = cubo[LINHAS]
+        elif tipo == "conta_se":
+            base[rotulo] = cubo[LINHAS].where(cubo[args[0]] == args[1], 0)
+        elif tipo == "media":
+            base[rotulo + "__s"] = cubo[soma(args[0])]
+            base[rotulo + "__n"] = cubo[contagem(args[0])]
+            agg[rotulo + "__s"] = agg[rotulo + "__n"] = "sum"
+            continue
+        elif tipo == "distintos":
+            base[rotulo] = cubo[args[0]]
+            agg[rotulo] = "nunique"
+            continue
+        else:
+            raise ValueError(f"medida desconhecida: {tipo}")
+        agg[rotulo] = "sum"
+
+    g = base.groupby(list(por), sort=True).agg(agg).reset_index()
+    for rotulo, (tipo, *args) in medidas.items():
+        if tipo == "media":
+            g[rotulo] = g[rotulo + "__s"] / g[rotulo + "__n"]
+    return g[list(por) + list(medidas)]
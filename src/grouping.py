@@ -0,0 +1,125 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from src.cube import LINHAS, contagem, soma
+
+
+# =====================================================
+# Agregação em grouping sets
+# =====================================================
+# Várias quebras do mesmo DataFrame numa passada só: cada coluna de dimensão
+# é codificada em inteiros uma vez (pd.factorize) e as medidas viram arrays
+# float uma vez; cada conjunto de dimensões vira um código de grupo inteiro
+# somado com np.bincount — sem um groupby por quebra.
+#
+# Cada conjunto sai com as dimensões (nulos são um grupo à parte, como
+# dropna=False) e as medidas aditivas, com os nomes de colunas do cubo
+# (src/cube.py): <col>__soma e <col>__n (valores não nulos) para cada coluna
+# de `medidas`, mais _linhas. Médias = soma / n.
+
+# Até quantas combinações de dimensões o bincount usa o código combinado direto
+_DIRETO = 1 << 16
+
+
+def _codifica(s: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """
+    Códigos inteiros na ordem dos valores, com os nulos como último código
+    (a ordem do groupby). A ordenação é a do groupby (safe_sort), que aceita
+    colunas com tipos misturados, como texto e número na mesma coluna do Excel.
+    """
+    codigos, valores = pd.factorize(s, sort=True)
+    nulos = codigos < 0
+    if nulos.any():
+        codigos = np.where(nulos, len(valores), codigos)
+        valores = valores.insert(len(valores), None)
+    return codigos.astype(np.int64, copy=False), valores
+
+
+def grouping_sets(df: pd.DataFrame, conjuntos: dict, medidas: list, derivadas: dict = None) -> dict:
+    """
+    Agrega `df` em cada conjunto de dimensões.
+    conjuntos: {nome: [colunas]}; medidas: colunas numéricas a somar/contar;
+    derivadas: {coluna: Series} usadas como colunas extras de `df`.
+    Retorna {nome: DataFrame}, ordenado pelas dimensões (nulos por último).
+    """
+    derivadas = derivadas or {}
+
+    def coluna(col):
+        return derivadas[col] if col in derivadas else df[col]
+
+    codigos, valores = {}, {}
+    for col in {c for dims in conjuntos.values() for c in dims}:
+        codigos[col], valores[col] = _codifica(coluna(col))
+
+    somas, contagens, inteiras = {}, {}, set()
+    for col in medidas:
+        v = coluna(col)
+        if pd.api.types.is_integer_dtype(v) or pd.api.types.is_bool_dtype(v):
+            inteiras.add(col)
+        v = pd.to_numeric(v, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        nulos = np.isnan(v)
+        somas[col] = np.where(nulos, 0.0, v)
+        contagens[col] = (~nulos).astype("float64")
+
+    resultado = {}
+    for nome, dims in conjuntos.items():
+        tamanhos = [max(len(valores[c]), 1) for c in dims]
+        chave = np.zeros(len(df), dtype=np.int64)
+        if np.prod(tamanhos, dtype=float) <= max(len(df), _DIRETO):
+            # Poucas combinações: o código combinado indexa o bincount direto
+            for col, t in zip(dims, tamanhos):
+                chave = chave * t + codigos[col]
+            total = int(np.prod(tamanhos))
+            grupos = np.flatnonzero(np.bincount(chave, minlength=total))
+            posicoes = dict(zip(dims, np.unravel_index(grupos, tamanhos))) if dims else {}
+            inverso, n = chave, total
+        else:
+            # Muitas combinações: compacta com np.unique (que preserva a ordem)
+            # sempre que o código parcial passa de 2**31, para não estourar
+            for col, t in zip(dims, tamanhos):
+                chave = chave * t + codigos[col]
+                if chave.size and int(chave.max()) >= 2**31:
+                    chave = np.unique(chave, return_inverse=True)[1].astype(np.int64)
+            _, primeira, inverso = np.unique(chave, return_index=True, return_inverse=True)
+            grupos = None
+            posicoes = {c: codigos[c][primeira] for c in dims}
+            n = len(primeira)
+
+        def agrega(pesos=None):
+            r = np.bincount(inverso, weights=pesos, minlength=n)
+            return r if grupos is None else r[grupos]
+
+        out = {c: valores[c].take(posicoes[c]) for c in dims}
+        for col in medidas:
+            s = agrega(somas[col])
+            out[soma(col)] = s.astype("int64") if col in inteiras else s
+            out[contagem(col)] = agrega(contagens[col]).astype("int64")
+        out[LINHAS] = agrega().astype("int64")
+        resultado[nome] = pd.DataFrame(out)
+    return resultado
+
+
+# ---------- cache por DataFrame ----------
+# O mesmo DataFrame (mesmo objeto) reaproveita o pacote já calculado enquanto
+# existir; os DataFrames recebidos não devem ser modificados in-place.
+
+_bundles = {}
+_lock = threading.Lock()
+
+
+def bundle(df: pd.DataFrame, nome: str, build) -> dict:
+    """Pacote `nome` de `df` (calculado por `build(df)` na primeira chamada)."""
+    chave = (nome, id(df))
+    with _lock:
+        item = _bundles.get(chave)
+    if item is not None and item[0]() is df:
+        return item[1]
+    resultado = build(df)
+    with _lock:
+        # Quando o DataFrame é coletado, o pacote sai junto
+        ref = weakref.ref(df, lambda _, chave=chave: _bundles.pop(chave, None))
+        _bundles[chave] = (ref, resultado)
+    return resultado
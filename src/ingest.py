@@ -0,0 +1,92 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.cache import PARSE_CACHE
+from src.config import INGEST_MAX_WORKERS
+from src.spill import SpilledFile
+
+
+# =====================================================
+# Carga paralela das planilhas enviadas
+# =====================================================
+# O parse do xlsx é CPU puro (XML); em threads ficaria preso no GIL.
+# Cada planilha vai para um processo do pool e o resultado volta serializado.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _run_loader(loader, data):
+    """Executado no processo do pool. `data`: bytes ou SpilledFile (lido via mmap)."""
+    if isinstance(data, SpilledFile):
+        with data.open() as f:
+            return loader(f)
+    return loader(io.BytesIO(data))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool único por processo, criado sob demanda e reaproveitado entre reruns."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max(1, min(INGEST_MAX_WORKERS, os.cpu_count() or 1))
+            # spawn: o Streamlit roda o script em thread, fork não é seguro aqui
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def load_all(jobs: dict) -> tuple[dict, dict]:
+    """
+    Carrega as planilhas em paralelo.
+
+    jobs: {nome: (loader, bytes do arquivo ou SpilledFile)}
+    Retorna ({nome: resultado do loader}, {nome: exceção}). Resultados já
+    presentes no cache de parse não passam pelo pool; os novos são gravados nele.
+    """
+    results, errors, pending = {}, {}, {}
+    for name, (loader, data) in jobs.items():
+        cached = PARSE_CACHE.get(loader, data)
+        if cached is not None:
+            results[name] = cached
+        else:
+            pending[name] = (loader, data)
+
+    def _run_here(name, loader, data):
+        try:
+            results[name] = _run_loader(loader, data)
+        except Exception as e:
+            errors[name] = e
+
+    # Um arquivo só: roda aqui mesmo, sem pagar o custo do pool
+    if len(pending) == 1:
+        name, (loader, data) = next(iter(pending.items()))
+        _run_here(name, loader, data)
+    elif pending:
+        pool = _get_pool()
+        futures = {name: pool.submit(_run_loader, loader, data) for name, (loader, data) in pending.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except BrokenProcessPool:
+                # Processo do pool morreu (ex.: falta de memória): refaz este arquivo aqui
+                _reset_pool()
+                _run_here(name, *pending[name])
+            except Exception as e:
+                errors[name] = e
+
+    for name in pending:
+        if name in results:
+            PARSE_CACHE.put(*pending[name], results[name])
+    return results, errors
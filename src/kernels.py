@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+# =====================================================
+# Kernels vetorizados
+# =====================================================
+# Versões em coluna do que antes rodava linha a linha em Python
+# (df.apply(axis=1), Series.apply, iterrows): os loaders e as tabelas do
+# dashboard chamam estas funções. benchmarks/kernels.py compara cada uma
+# com a versão linha a linha.
+
+def aderente(indicadores: pd.Series, valores: pd.Series, invertidos) -> pd.Series:
+    """
+    Coluna ADERENTE (0/1): nos indicadores `invertidos` adere quem tem valor 0;
+    nos demais, quem tem valor 1.
+    """
+    invertido = indicadores.isin(invertidos).to_numpy()
+    return pd.Series(
+        np.where(invertido, (valores == 0).to_numpy(), (valores == 1).to_numpy()).astype(int),
+        index=indicadores.index,
+    )
+
+
+def por_valor(s: pd.Series, func) -> pd.Series:
+    """
+    Mesmo resultado de `s.apply(func)`, chamando `func` uma vez por valor
+    distinto (nomes e percentuais se repetem muito nas tabelas).
+    """
+    codigos, valores = pd.factorize(s)
+    mapeados = np.empty(len(valores), dtype=object)
+    mapeados[:] = [func(v) for v in valores]
+    out = np.empty(len(s), dtype=object)
+    validos = codigos >= 0
+    out[validos] = mapeados[codigos[validos]]
+    # Nulos (None e NaN se comportam diferente em `func`) vão um a um
+    originais = s.to_numpy()
+    for i in np.flatnonzero(~validos):
+        out[i] = func(originais[i])
+    return pd.Series(out, index=s.index, name=s.name).infer_objects()
+
+
+def rank_no_grupo(df: pd.DataFrame, cols: list, por: str) -> pd.DataFrame:
+    """
+    Posição de cada linha dentro do seu grupo `por`, coluna a coluna:
+    1 + nº de linhas do grupo com valor maior (nulos do grupo contam como 0;
+    linha com valor nulo fica em 1). Linhas sem grupo ficam com NaN.
+    """
+    valores = df[cols]
+    rank = valores.fillna(0).groupby(df[por]).rank(method="min", ascending=False)
+    return rank.where(valores.notna() | df[por].isna().to_numpy()[:, None], 1.0)
@@ -0,0 +1,313 @@
+import html
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from src.xlsx_reader import part_rels
+
+
+# =====================================================
+# Leitura colunar do pivot cache de um xlsx
+# =====================================================
+# Os registros do pivot cache são uma sequência de <r> com um item por campo:
+# <x v="i"/> aponta para o i-ésimo sharedItem do campo; <n>, <s>, <b>, <d>,
+# <e> trazem o valor inline e <m/> é vazio. Em vez de montar um dict por
+# registro, cada campo vira um array de códigos inteiros que no final é
+# decodificado de uma vez (categórico, ou float para campos numéricos).
+
+_CHUNK_SIZE = 8 * 1024 * 1024
+
+_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+_RECORD_RE = re.compile(rb'<(?:\w+:)?r\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?r>)', re.S)
+_ITEM_RE = re.compile(rb'<(?:\w+:)?(\w+)\b([^>]*?)(?:/>|>.*?</(?:\w+:)?\1>)', re.S)
+_V_ATTR_RE = re.compile(rb'\bv="([^"]*)"')
+_RECORD_OPEN_RE = re.compile(rb'<(?:\w+:)?r>')
+_CACHE_FIELD_NAME_RE = re.compile(rb'<(?:\w+:)?cacheField\b[^>]*?\bname="([^"]*)"')
+_DEFINITION_NAME_RE = re.compile(r"xl/pivotCache/pivotCacheDefinition(\d+)\.xml$")
+
+_REL_OFFICE_DOCUMENT = "/officeDocument"
+_REL_PIVOT_DEFINITION = "/pivotCacheDefinition"
+_REL_PIVOT_RECORDS = "/pivotCacheRecords"
+
+_MISSING = -1       # <m/> ou campo ausente
+_INLINE_BASE = -2   # códigos <= -2 apontam para valores inline (-2 - id)
+
+
+def _fast_record_re(n_fields: int, prefix: bytes, allowed=None) -> re.Pattern:
+    """
+    Regex de um registro "bem comportado": exatamente `n_fields` itens
+    de uma letra com no máximo o atributo v. Cobre praticamente todo cache
+    gerado pelo Excel; o que não casar vai pelo caminho genérico.
+
+    `allowed` ({posição do campo: índices de sharedItems aceitos}) restringe
+    as referências <x> desses campos: registros com outra referência nem
+    chegam a casar. Valores inline passam e são filtrados depois.
+    """
+    p = re.escape(prefix)
+    allowed = allowed or {}
+    parts = [rb'<' + p + rb'r>']
+    for i in range(n_fields):
+        guard = b""
+        if i in allowed:
+            refs = b"|".join(str(ref).encode() for ref in sorted(allowed[i]))
+            guard = rb'(?=x v="(?:' + refs + rb')"|[^x])' if refs else rb'(?=[^x])'
+        # (?! v=) deixa a regex sem ambiguidade: sem isso um registro recusado
+        # no fim faria o motor retestar cada item anterior de outro jeito
+        parts.append(rb'<' + p + guard + rb'(\w)(?: v="([^"]*)"|(?! v=))[^>/]*/>')
+    parts.append(rb'</' + p + rb'r>')
+    return re.compile(b"".join(parts))
+
+
+def _is_regular(block: bytes, prefix: bytes, n_fields: int) -> bool:
+    """
+    O bloco só tem registros no formato da regex rápida? (contagem de tags,
+    sem casar nada: um item por "/>" e nenhum fechamento além de </r>)
+    """
+    n_records = block.count(b"<" + prefix + b"r>")
+    closes = block.count(b"</") - block.count(b"</" + prefix + b"pivotCacheRecords>")
+    return block.count(b"/>") == n_fields * n_records and closes == n_records
+
+
+def _last_record_end(buf: bytes) -> int:
+    """Posição logo após o último </r> completo do buffer (-1 se não houver)."""
+    pos = len(buf)
+    while True:
+        pos = buf.rfind(b"</", 0, pos)
+        if pos == -1:
+            return -1
+        end = buf.find(b">", pos)
+        if end != -1 and buf[pos + 2:end].rsplit(b":", 1)[-1] == b"r":
+            return end + 1
+
+
+def _generic_records(chunk: bytes, n_fields: int) -> list:
+    """Registros fora do padrão: item a item, completando com <m/>."""
+    rows = []
+    for record in _RECORD_RE.finditer(chunk):
+        row = []
+        for item in _ITEM_RE.finditer(record.group(1) or b""):
+            tag = item.group(1)
+            value = _V_ATTR_RE.search(item.group(2))
+            row += [tag, value.group(1) if value else (b"0" if tag == b"x" else b"")]
+            if len(row) == 2 * n_fields:
+                break
+        row += [b"m", b""] * (n_fields - len(row) // 2)
+        rows.append(row)
+    return rows
+
+
+def _shared_value(item):
+    tag = item.tag.split("}")[-1]
+    if tag == "s":
+        return item.get("v")
+    if tag == "n":
+        return float(item.get("v"))
+    if tag in ("b", "d"):
+        return item.get("v")
+    return None
+
+
+def _passes(value, keep, fn) -> bool:
+    """Valor passa no filtro? (vazio nunca passa, como NaN no pandas)"""
+    return value is not None and (fn(value) if fn else value) in keep
+
+
+def _inline_value(tag: bytes, raw: bytes):
+    if tag == b"n":
+        return float(raw)
+    if tag == b"m":
+        return None
+    return html.unescape(raw.decode("utf-8"))
+
+
+class _FieldColumn:
+    """Códigos de um campo acumulados bloco a bloco."""
+
+    def __init__(self, shared: list):
+        self.shared = shared
+        self.inline = {}     # (tag, valor bruto) -> id
+        self.chunks = []
+
+    def encode(self, tags: tuple, raws: tuple) -> np.ndarray:
+        if tags.count(b"x") == len(tags):
+            # Caso comum: o campo inteiro referencia sharedItems
+            return np.fromiter(map(int, raws), dtype=np.int32, count=len(raws))
+
+        tags = np.array(tags, dtype="S1")
+        is_ref = tags == b"x"
+
+        codes = np.full(len(tags), _MISSING, dtype=np.int32)
+        if is_ref.any():
+            codes[is_ref] = np.array(raws, dtype="S")[is_ref].astype(np.int32)
+
+        # Valores inline: fatoriza por tipo e só os distintos passam pelo dict
+        inline = ~is_ref & (tags != b"m")
+        if inline.any():
+            raws = np.array(raws, dtype=object)
+            for tag in np.unique(tags[inline]):
+                sel = np.flatnonzero(inline & (tags == tag))
+                inv, uniques = pd.factorize(raws[sel])
+                ids = np.array(
+                    [self.inline.setdefault((bytes(tag), raw), len(self.inline)) for raw in uniques],
+                    dtype=np.int32,
+                )
+                codes[sel] = _INLINE_BASE - ids[inv]
+        return codes
+
+    def accepts(self, codes: np.ndarray, allowed: set, keep, fn) -> np.ndarray:
+        """Máscara dos códigos que passam no filtro do campo."""
+        mask = np.isin(codes, np.fromiter(allowed, dtype=np.int32, count=len(allowed)))
+        inline = codes <= _INLINE_BASE
+        if inline.any():
+            good = [
+                ident for (tag, raw), ident in self.inline.items()
+                if _passes(_inline_value(tag, raw), keep, fn)
+            ]
+            mask[inline] = np.isin(_INLINE_BASE - codes[inline], good)
+        return mask
+
+    def decode(self) -> pd.Series:
+        codes = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int32)
+        items = list(self.shared) + [_inline_value(tag, raw) for tag, raw in self.inline]
+        codes = np.where(codes <= _INLINE_BASE, len(self.shared) + _INLINE_BASE - codes, codes)
+
+        # Categorias únicas e sem vazio; índices fora da tabela viram vazio
+        remap, categories = pd.factorize(pd.Series(items, dtype=object))
+        remap = np.append(remap, _MISSING).astype(np.int32)
+        codes = np.where((codes >= 0) & (codes < len(items)), codes, len(items))
+        codes = remap[codes]
+
+        if len(categories) and all(isinstance(v, float) for v in categories):
+            values = np.append(np.asarray(categories, dtype=float), np.nan)
+            return pd.Series(values[codes], dtype=float)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories))
+
+
+def _open_zip(source) -> zipfile.ZipFile:
+    """Zip do xlsx a partir de bytes ou de um arquivo aberto (ex.: upload mapeado do spill), sem copiá-lo."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return zipfile.ZipFile(source)
+
+
+def _definitions(zf: zipfile.ZipFile) -> list:
+    """Definições de pivot cache do arquivo, na ordem do workbook."""
+    workbook_part = "xl/workbook.xml"
+    for rel_type, path in part_rels(zf, "").values():
+        if rel_type.endswith(_REL_OFFICE_DOCUMENT):
+            workbook_part = path
+            break
+    found = [
+        path for rel_type, path in part_rels(zf, workbook_part).values()
+        if rel_type.endswith(_REL_PIVOT_DEFINITION)
+    ]
+    # Caches sem relacionamento no workbook (arquivos gerados por outras ferramentas)
+    loose = sorted(
+        (int(m.group(1)), name) for name in zf.namelist()
+        if (m := _DEFINITION_NAME_RE.match(name)) and name not in found
+    )
+    return [path for path in found if path in zf.namelist()] + [name for _, name in loose]
+
+
+def find_pivot_cache(source, required) -> tuple:
+    """
+    (definição, registros) do primeiro pivot cache de `source` (bytes ou
+    arquivo aberto) cujos campos incluem todos os nomes de `required`, ou None. Só as definições são lidas
+    (procurando os nomes dos cacheField); registros de outros caches não
+    são abertos.
+    """
+    required = set(required)
+    with _open_zip(source) as zf:
+        for definition in _definitions(zf):
+            names = {html.unescape(n.decode("utf-8")) for n in _CACHE_FIELD_NAME_RE.findall(zf.read(definition))}
+            if not required <= names:
+                continue
+            for rel_type, path in part_rels(zf, definition).values():
+                if rel_type.endswith(_REL_PIVOT_RECORDS) and path in zf.namelist():
+                    return definition, path
+    return None
+
+
+def _read_definition(zf: zipfile.ZipFile, definition: str) -> tuple[list, list]:
+    """Nomes dos campos e sharedItems (já convertidos) de cada um."""
+    tree_def = ET.fromstring(zf.read(definition))
+    fields = tree_def.findall(".//x:cacheField", _NS)
+    names, shared = [], []
+    for field in fields:
+        si = field.find("x:sharedItems", _NS)
+        names.append(field.get("name"))
+        shared.append([_shared_value(c) for c in si] if si is not None else [])
+    return names, shared
+
+
+def read_pivot_cache(source, definition: str, records: str, filters=None, normalize=None) -> pd.DataFrame:
+    """
+    Lê os registros de um pivot cache de `source` (bytes ou arquivo aberto)
+    em formato colunar.
+
+    Campos com texto viram categóricos; campos só numéricos viram float.
+    O XML dos registros é lido em blocos direto do zip, sem carregar a
+    árvore inteira nem criar um objeto por registro.
+
+    - definition, records: partes do cache no zip, como devolvidas por
+      find_pivot_cache.
+    - filters: {campo: valores aceitos}. Viram conjuntos de índices de
+      sharedItems antes da leitura; registros recusados não são montados.
+      Filtros sobre campos ausentes no cache são ignorados.
+    - normalize: {campo: função} aplicada ao valor antes de comparar.
+    """
+    normalize = normalize or {}
+    with _open_zip(source) as zf:
+        field_names, shared = _read_definition(zf, definition)
+        columns = [_FieldColumn(items) for items in shared]
+        n_fields = len(field_names)
+
+        checks = []
+        for name, keep in (filters or {}).items():
+            if name not in field_names:
+                continue
+            k = field_names.index(name)
+            fn = normalize.get(name)
+            allowed = {i for i, v in enumerate(shared[k]) if _passes(v, keep, fn)}
+            checks.append((k, allowed, keep, fn))
+
+        fast_re = None
+        with zf.open(records) as fh:
+            buf = b""
+            while True:
+                chunk = fh.read(_CHUNK_SIZE)
+                buf += chunk
+                end = _last_record_end(buf) if chunk else len(buf)
+                if end > 0:
+                    block, buf = buf[:end], buf[end:]
+                    if fast_re is None:
+                        opened = _RECORD_OPEN_RE.search(block)
+                        prefix = opened.group(0)[1:-2] if opened else b""
+                        fast_re = _fast_record_re(n_fields, prefix, {k: a for k, a, _, _ in checks})
+                    if _is_regular(block, prefix, n_fields):
+                        rows = fast_re.findall(block)
+                    else:
+                        rows = _generic_records(block, n_fields)
+                    if rows and checks:
+                        mask = np.ones(len(rows), dtype=bool)
+                        for k, allowed, keep, fn in checks:
+                            codes = columns[k].encode(
+                                tuple(row[2 * k] for row in rows), tuple(row[2 * k + 1] for row in rows)
+                            )
+                            mask &= columns[k].accepts(codes, allowed, keep, fn)
+                        rows = [row for row, ok in zip(rows, mask) if ok]
+                    if rows:
+                        flat = list(zip(*rows))
+                        for i, column in enumerate(columns):
+                            column.chunks.append(column.encode(flat[2 * i], flat[2 * i + 1]))
+                if not chunk:
+                    break
+
+    return pd.DataFrame({name: column.decode() for name, column in zip(field_names, columns)})
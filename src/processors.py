@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
-import openpyxl
-import io
+from src import grouping, kernels
+from src.pivot_cache import find_pivot_cache, read_pivot_cache
+from src.xlsx_reader import XlsxWorkbook
 from src.config import (
     EQUIPE_IDS, BASE_EQUIPE, HEADER_ROW, SHEET_NAME_CANDIDATES,
     REGIONAL_FILTRO,
@@ -16,7 +17,7 @@ from src.config import (
     ETIT_COL_TOA, ETIT_COL_DT_INICIO, ETIT_COL_DT_FIM,
     ETIT_COL_DT_ACIONAMENTO, ETIT_COL_TURNO,
     ETIT_COL_TMA, ETIT_COL_TMR, ETIT_COL_ANOMES,
-    ETIT_SHEET_CANDIDATES, ETIT_COL_INDICADOR_VAL,
+    ETIT_SHEET_CANDIDATES, ETIT_COL_INDICADOR_VAL, ETIT_COLUNAS,
     # Residencial Indicadores
     RES_INDICADORES_FILTRO, RES_IND_INVERTIDOS, RES_SHEET_CANDIDATES,
     RES_COL_INDICADOR_NOME, RES_COL_ID_MOSTRA, RES_COL_VOLUME,
@@ -25,9 +26,9 @@ from src.config import (
     RES_COL_SERVICO, RES_COL_NATUREZA, RES_COL_SINTOMA,
     RES_COL_FERRAMENTA, RES_COL_FECHAMENTO, RES_COL_SOLUCAO,
     RES_COL_IMPACTO, RES_COL_ENVIADO_TOA, RES_COL_DT_INICIO,
-    RES_COL_DT_FIM, RES_COL_TMA, RES_COL_TMR, RES_COL_ANOMES,
+    RES_COL_DT_FIM, RES_COL_TMA, RES_COL_TMR, RES_COL_ANOMES, RES_COLUNAS,
     # DPA Ocupação
-    DPA_MESES_PT, DPA_SHEET_ANALISTAS, DPA_SHEET_CONSOLIDADO,
+    DPA_MESES_PT, DPA_SHEET_ANALISTAS, DPA_SHEET_CONSOLIDADO, DPA_COLUNAS,
     # Indicadores TOA
     TOA_IND_SHEET, TOA_INDICADORES_FILTRO, TOA_IND_INVERTIDOS,
     TOA_COL_INDICADOR_NOME, TOA_COL_LOGIN, TOA_COL_INDICADOR,
@@ -36,37 +37,84 @@ from src.config import (
     TOA_COL_NATUREZA, TOA_COL_SOLUCAO,
     TOA_COL_TMR, TOA_COL_AGING, TOA_COL_DATA,
     TOA_COL_DT_CANCELAMENTO, TOA_COL_DT_INICIO_FORM, TOA_COL_DT_FIM_FORM,
-    TOA_COL_ANOMES, TOA_COL_ID_ATIVIDADE, TOA_AGING_ORDER,
+    TOA_COL_ANOMES, TOA_COL_ID_ATIVIDADE, TOA_AGING_ORDER, TOA_COLUNAS,
     TOA_IND_CANCELADAS, TOA_IND_VALIDACAO,
 )
 
 
+
+# =====================================================
+# QUEBRAS — pacote de grouping sets por dataset
+# =====================================================
+# As quebras de cada dataset (etit_por_*, res_por_*, toa_canceladas_*,
+# toa_validacao_* e fech_sir_por_*) saem de um único pacote de grouping sets
+# (src/grouping.py), calculado numa passada sobre o DataFrame e reaproveitado
+# enquanto o mesmo objeto existir; cada função só fatia o pacote.
+
+def _pacote(df: pd.DataFrame, nome: str, conjuntos: dict, medidas: list, derivadas=None) -> dict:
+    """Pacote do dataset `nome` (conjuntos com colunas ausentes ficam de fora)."""
+    def build(d):
+        extras = derivadas(d) if derivadas else {}
+        presentes = set(d.columns) | set(extras)
+        return grouping.grouping_sets(
+            d,
+            {k: dims for k, dims in conjuntos.items() if presentes.issuperset(dims)},
+            [c for c in medidas if c in presentes],
+            extras,
+        )
+    return grouping.bundle(df, nome, build)
+
+
+def _fatia(pacote: dict, conjunto: str, por, filtro: dict = None) -> pd.DataFrame | None:
+    """
+    Medidas do conjunto somadas por `por` (sem os nulos de `por`, como no
+    groupby), só nas linhas com `filtro` ({coluna: valor}). None se o filtro
+    não deixa nenhuma linha.
+    """
+    g = pacote[conjunto]
+    for col, val in (filtro or {}).items():
+        g = g[g[col] == val]
+    if g.empty:
+        return None
+    medidas = [c for c in g.columns if c.endswith(("__soma", "__n")) or c == grouping.LINHAS]
+    return g.groupby(por)[medidas].sum()
+
+
+def _media(g: pd.DataFrame, col: str) -> pd.Series:
+    n = g[grouping.contagem(col)]
+    return g[grouping.soma(col)] / n.where(n > 0)
+
+
 def list_sheets(uploaded_file):
-    data = uploaded_file.getvalue()
-    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
-    return wb.sheetnames
+    """Nomes das abas (lê só o xl/workbook.xml, sem parsear planilhas)."""
+    with XlsxWorkbook(uploaded_file) as wb:
+        return wb.sheetnames
 
 
 def load_produtividade(uploaded_file) -> pd.DataFrame:
     """Lê a planilha de produtividade e retorna DataFrame filtrado pela equipe."""
-    sheets = list_sheets(uploaded_file)
+    with XlsxWorkbook(uploaded_file) as wb:
+        sheets = wb.sheetnames
 
-    sheet_to_read = None
-    for candidate in SHEET_NAME_CANDIDATES:
-        if candidate in sheets:
-            sheet_to_read = candidate
-            break
-    if sheet_to_read is None:
-        sheet_to_read = sheets[0]
+        sheet_to_read = None
+        for candidate in SHEET_NAME_CANDIDATES:
+            if candidate in sheets:
+                sheet_to_read = candidate
+                break
+        if sheet_to_read is None:
+            sheet_to_read = sheets[0]
 
-    df = pd.read_excel(uploaded_file, sheet_name=sheet_to_read, header=HEADER_ROW)
+        # Leitura em streaming: só as linhas da equipe chegam a ser materializadas
+        df_equipe = wb.read_sheet(
+            sheet_to_read, header_row=HEADER_ROW,
+            filters={COL_LOGIN: EQUIPE_IDS},
+            normalize={COL_LOGIN: lambda v: str(v).strip()},
+        )
 
     # Remove coluna unnamed
-    df = df.loc[:, ~df.columns.str.startswith("Unnamed")]
+    df_equipe = df_equipe.loc[:, ~df_equipe.columns.astype(str).str.startswith("Unnamed")].copy()
 
-    # Filtra equipe
-    df[COL_LOGIN] = df[COL_LOGIN].astype(str).str.strip()
-    df_equipe = df[df[COL_LOGIN].isin(EQUIPE_IDS)].copy()
+    df_equipe[COL_LOGIN] = df_equipe[COL_LOGIN].astype(str).str.strip()
 
     # Garante tipos numéricos
     num_cols = [COL_VOL_TOTAL, COL_VOL_MEDIA, COL_DPA_USO, COL_DPA_JORNADA, COL_DPA_RESULTADO]
@@ -93,19 +141,28 @@ def load_produtividade(uploaded_file) -> pd.DataFrame:
 # =====================================================
 def load_etit(uploaded_file) -> pd.DataFrame:
     """Lê a planilha Analítico Empresarial e retorna apenas ETIT POR EVENTO da equipe."""
-    sheets = list_sheets(uploaded_file)
-    if hasattr(uploaded_file, 'seek'):
-        uploaded_file.seek(0)
-
-    sheet_to_read = None
-    for candidate in ETIT_SHEET_CANDIDATES:
-        if candidate in sheets:
-            sheet_to_read = candidate
-            break
-    if sheet_to_read is None:
-        sheet_to_read = sheets[0]
+    with XlsxWorkbook(uploaded_file) as wb:
+        sheets = wb.sheetnames
 
-    df = pd.read_excel(uploaded_file, sheet_name=sheet_to_read)
+        sheet_to_read = None
+        for candidate in ETIT_SHEET_CANDIDATES:
+            if candidate in sheets:
+                sheet_to_read = candidate
+                break
+        if sheet_to_read is None:
+            sheet_to_read = sheets[0]
+
+        # Só as colunas usadas pelo dashboard são decodificadas, e só das
+        # linhas de ETIT POR EVENTO da equipe na regional (filtro na leitura)
+        df = wb.read_sheet(
+            sheet_to_read, usecols=ETIT_COLUNAS,
+            filters={
+                ETIT_COL_INDICADOR: {ETIT_INDICADOR_FILTRO},
+                ETIT_COL_LOGIN: EQUIPE_IDS,
+                ETIT_COL_REGIONAL: {REGIONAL_FILTRO},
+            },
+            normalize={ETIT_COL_LOGIN: lambda v: str(v).strip()},
+        )
 
     # Filtra apenas ETIT POR EVENTO
     if ETIT_COL_INDICADOR in df.columns:
@@ -162,51 +219,59 @@ def etit_resumo_analista(df: pd.DataFrame) -> pd.DataFrame:
     return group.sort_values("Total_Eventos", ascending=False).reset_index(drop=True)
 
 
+_ETIT_QUEBRAS = [ETIT_COL_DEMANDA, ETIT_COL_TIPO, ETIT_COL_CAUSA, ETIT_COL_REGIONAL, ETIT_COL_TURNO]
+
+
+def _etit_pacote(df: pd.DataFrame) -> dict:
+    return _pacote(
+        df, "etit", {c: [c] for c in _ETIT_QUEBRAS},
+        [ETIT_COL_VOLUME, ETIT_COL_INDICADOR_VAL, ETIT_COL_TMA, ETIT_COL_TMR],
+    )
+
+
+def _etit_quebra(df: pd.DataFrame, col: str, rotulo: str) -> pd.DataFrame:
+    g = _fatia(_etit_pacote(df), col, col)
+    out = pd.DataFrame({
+        "Eventos": g[grouping.soma(ETIT_COL_VOLUME)],
+        "Aderentes": g[grouping.soma(ETIT_COL_INDICADOR_VAL)],
+    })
+    return out.reset_index().rename(columns={col: rotulo}).sort_values("Eventos", ascending=False)
+
+
 def etit_por_demanda(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    return df.groupby(ETIT_COL_DEMANDA).agg(
-        Eventos=(ETIT_COL_VOLUME, "sum"),
-        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-        TMA_Medio=(ETIT_COL_TMA, "mean"),
-        TMR_Medio=(ETIT_COL_TMR, "mean"),
-    ).reset_index().rename(columns={ETIT_COL_DEMANDA: "Demanda"})
+    g = _fatia(_etit_pacote(df), ETIT_COL_DEMANDA, ETIT_COL_DEMANDA)
+    return pd.DataFrame({
+        "Eventos": g[grouping.soma(ETIT_COL_VOLUME)],
+        "Aderentes": g[grouping.soma(ETIT_COL_INDICADOR_VAL)],
+        "TMA_Medio": _media(g, ETIT_COL_TMA),
+        "TMR_Medio": _media(g, ETIT_COL_TMR),
+    }).reset_index().rename(columns={ETIT_COL_DEMANDA: "Demanda"})
 
 
 def etit_por_tipo(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    return df.groupby(ETIT_COL_TIPO).agg(
-        Eventos=(ETIT_COL_VOLUME, "sum"),
-        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-    ).reset_index().rename(columns={ETIT_COL_TIPO: "Tipo"}).sort_values("Eventos", ascending=False)
+    return _etit_quebra(df, ETIT_COL_TIPO, "Tipo")
 
 
 def etit_por_causa(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    return df.groupby(ETIT_COL_CAUSA).agg(
-        Eventos=(ETIT_COL_VOLUME, "sum"),
-        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-    ).reset_index().rename(columns={ETIT_COL_CAUSA: "Causa"}).sort_values("Eventos", ascending=False)
+    return _etit_quebra(df, ETIT_COL_CAUSA, "Causa")
 
 
 def etit_por_regional(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    return df.groupby(ETIT_COL_REGIONAL).agg(
-        Eventos=(ETIT_COL_VOLUME, "sum"),
-        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-    ).reset_index().rename(columns={ETIT_COL_REGIONAL: "Regional"}).sort_values("Eventos", ascending=False)
+    return _etit_quebra(df, ETIT_COL_REGIONAL, "Regional")
 
 
 def etit_por_turno(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    return df.groupby(ETIT_COL_TURNO).agg(
-        Eventos=(ETIT_COL_VOLUME, "sum"),
-        Aderentes=(ETIT_COL_INDICADOR_VAL, "sum"),
-    ).reset_index().rename(columns={ETIT_COL_TURNO: "Turno"}).sort_values("Eventos", ascending=False)
+    return _etit_quebra(df, ETIT_COL_TURNO, "Turno")
 
 
 def etit_evolucao_diaria(df: pd.DataFrame) -> pd.DataFrame:
@@ -229,19 +294,26 @@ def etit_evolucao_diaria(df: pd.DataFrame) -> pd.DataFrame:
 # =====================================================
 
 def load_residencial_indicadores(uploaded_file) -> pd.DataFrame:
-    sheets = list_sheets(uploaded_file)
-    if hasattr(uploaded_file, "seek"):
-        uploaded_file.seek(0)
+    with XlsxWorkbook(uploaded_file) as wb:
+        sheets = wb.sheetnames
 
-    sheet_to_read = None
-    for candidate in RES_SHEET_CANDIDATES:
-        if candidate in sheets:
-            sheet_to_read = candidate
-            break
-    if sheet_to_read is None:
-        sheet_to_read = sheets[0]
-
-    df = pd.read_excel(uploaded_file, sheet_name=sheet_to_read)
+        sheet_to_read = None
+        for candidate in RES_SHEET_CANDIDATES:
+            if candidate in sheets:
+                sheet_to_read = candidate
+                break
+        if sheet_to_read is None:
+            sheet_to_read = sheets[0]
+
+        # Só as colunas usadas pelo dashboard são decodificadas, e só das
+        # linhas dos indicadores monitorados na regional (filtro na leitura)
+        df = wb.read_sheet(
+            sheet_to_read, usecols=RES_COLUNAS,
+            filters={
+                RES_COL_INDICADOR_NOME: set(RES_INDICADORES_FILTRO),
+                RES_COL_REGIONAL: {REGIONAL_FILTRO},
+            },
+        )
 
     if RES_COL_INDICADOR_NOME not in df.columns:
         return pd.DataFrame()
@@ -269,14 +341,9 @@ def load_residencial_indicadores(uploaded_file) -> pd.DataFrame:
     if RES_COL_ANOMES in df.columns:
         df[RES_COL_ANOMES] = df[RES_COL_ANOMES].astype(str).str.strip()
 
-    df["ADERENTE"] = df.apply(
-        lambda row: (
-            (row[RES_COL_INDICADOR_VAL] == 0)
-            if row[RES_COL_INDICADOR_NOME] in RES_IND_INVERTIDOS
-            else (row[RES_COL_INDICADOR_VAL] == 1)
-        ),
-        axis=1,
-    ).astype(int)
+    df["ADERENTE"] = kernels.aderente(
+        df[RES_COL_INDICADOR_NOME], df[RES_COL_INDICADOR_VAL], RES_IND_INVERTIDOS,
+    )
 
     if RES_COL_DT_INICIO in df.columns:
         df["DATA_DIA"] = df[RES_COL_DT_INICIO].dt.normalize()
@@ -306,69 +373,68 @@ def res_kpis_por_indicador(df: pd.DataFrame) -> pd.DataFrame:
     return g.sort_values("_ord").drop(columns="_ord").reset_index(drop=True)
 
 
+_RES_QUEBRAS = [RES_COL_REGIONAL, RES_COL_NATUREZA, RES_COL_SOLUCAO, RES_COL_IMPACTO, "DATA_DIA"]
+
+
+def _res_quebra(df: pd.DataFrame, col: str, rotulo: str, indicador=None) -> pd.DataFrame:
+    """Volume/aderentes por `col` (de um indicador ou de todos); None se o indicador não tem linhas."""
+    pacote = _pacote(
+        df, "res_ind", {c: [RES_COL_INDICADOR_NOME, c] for c in _RES_QUEBRAS},
+        [RES_COL_VOLUME, "ADERENTE"],
+    )
+    g = _fatia(pacote, col, col, {RES_COL_INDICADOR_NOME: indicador} if indicador else None)
+    if g is None:
+        return None
+    g = pd.DataFrame({
+        "Volume": g[grouping.soma(RES_COL_VOLUME)],
+        "Aderentes": g[grouping.soma("ADERENTE")],
+    }).reset_index().rename(columns={col: rotulo})
+    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
+    return g
+
+
 def res_por_regional(df: pd.DataFrame, indicador=None) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
-    sub = df[df[RES_COL_INDICADOR_NOME] == indicador] if indicador else df
-    if sub.empty:
+    g = _res_quebra(df, RES_COL_REGIONAL, "Regional", indicador)
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(RES_COL_REGIONAL).agg(
-        Volume=(RES_COL_VOLUME, "sum"), Aderentes=("ADERENTE", "sum"),
-    ).reset_index().rename(columns={RES_COL_REGIONAL: "Regional"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
     return g.sort_values("Volume", ascending=False).reset_index(drop=True)
 
 
 def res_por_natureza(df: pd.DataFrame, indicador=None) -> pd.DataFrame:
     if df.empty or RES_COL_NATUREZA not in df.columns:
         return pd.DataFrame()
-    sub = df[df[RES_COL_INDICADOR_NOME] == indicador] if indicador else df
-    if sub.empty:
+    g = _res_quebra(df, RES_COL_NATUREZA, "Natureza", indicador)
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(RES_COL_NATUREZA).agg(
-        Volume=(RES_COL_VOLUME, "sum"), Aderentes=("ADERENTE", "sum"),
-    ).reset_index().rename(columns={RES_COL_NATUREZA: "Natureza"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
     return g.sort_values("Volume", ascending=False).reset_index(drop=True)
 
 
 def res_por_solucao(df: pd.DataFrame, indicador=None, top_n=15) -> pd.DataFrame:
     if df.empty or RES_COL_SOLUCAO not in df.columns:
         return pd.DataFrame()
-    sub = df[df[RES_COL_INDICADOR_NOME] == indicador] if indicador else df
-    if sub.empty:
+    g = _res_quebra(df, RES_COL_SOLUCAO, "Solução", indicador)
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(RES_COL_SOLUCAO).agg(
-        Volume=(RES_COL_VOLUME, "sum"), Aderentes=("ADERENTE", "sum"),
-    ).reset_index().rename(columns={RES_COL_SOLUCAO: "Solução"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
     return g.sort_values("Volume", ascending=False).head(top_n).reset_index(drop=True)
 
 
 def res_por_impacto(df: pd.DataFrame, indicador=None) -> pd.DataFrame:
     if df.empty or RES_COL_IMPACTO not in df.columns:
         return pd.DataFrame()
-    sub = df[df[RES_COL_INDICADOR_NOME] == indicador] if indicador else df
-    if sub.empty:
+    g = _res_quebra(df, RES_COL_IMPACTO, "Impacto", indicador)
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(RES_COL_IMPACTO).agg(
-        Volume=(RES_COL_VOLUME, "sum"), Aderentes=("ADERENTE", "sum"),
-    ).reset_index().rename(columns={RES_COL_IMPACTO: "Impacto"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
     return g.sort_values("Volume", ascending=False).reset_index(drop=True)
 
 
 def res_evolucao_diaria(df: pd.DataFrame, indicador=None) -> pd.DataFrame:
     if df.empty or "DATA_DIA" not in df.columns:
         return pd.DataFrame()
-    sub = df[df[RES_COL_INDICADOR_NOME] == indicador] if indicador else df
-    if sub.empty:
+    g = _res_quebra(df, "DATA_DIA", "Data", indicador)
+    if g is None:
         return pd.DataFrame()
-    sub = sub.dropna(subset=["DATA_DIA"])
-    g = sub.groupby("DATA_DIA").agg(
-        Volume=(RES_COL_VOLUME, "sum"), Aderentes=("ADERENTE", "sum"),
-    ).reset_index().rename(columns={"DATA_DIA": "Data"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Volume"] * 100).round(1)
     return g.sort_values("Data").reset_index(drop=True)
 
 
@@ -383,19 +449,19 @@ def _dpa_detect_mes_recente(df_raw: pd.DataFrame) -> dict:
     Estrutura: col 26 = nome do mês, col 30 = % DPA 2026.
     """
     resultado = {"mes_nome": None, "mes_num": None, "dpa_geral_pct": None}
-    for _, row in df_raw.iterrows():
-        mes_val = str(row.get(26, "")).strip()
-        if mes_val in DPA_MESES_PT:
-            try:
-                pct_f = float(row.get(30, None))
-                if pct_f > 0:
-                    resultado = {
-                        "mes_nome": mes_val,
-                        "mes_num": DPA_MESES_PT.index(mes_val) + 1,
-                        "dpa_geral_pct": round(pct_f * 100, 2),
-                    }
-            except (TypeError, ValueError):
-                pass
+    if 26 not in df_raw.columns or 30 not in df_raw.columns:
+        return resultado
+
+    meses = df_raw[26].astype(str).str.strip()
+    pct = pd.to_numeric(df_raw[30], errors="coerce")
+    validos = meses.isin(DPA_MESES_PT) & (pct > 0)
+    if validos.any():
+        ultimo = validos[validos].index[-1]
+        resultado = {
+            "mes_nome": meses[ultimo],
+            "mes_num": DPA_MESES_PT.index(meses[ultimo]) + 1,
+            "dpa_geral_pct": round(float(pct[ultimo]) * 100, 2),
+        }
     return resultado
 
 
@@ -405,31 +471,29 @@ def _dpa_extract_analistas(df_raw: pd.DataFrame) -> pd.DataFrame:
     Pivot está na col 26 (Login), col 27 (Ocupação Produtiva), col 28 (% Produtivo).
     Procura a linha de header dinamicamente.
     """
-    header_row = None
-    for i, row in df_raw.iterrows():
-        if str(row.get(26, "")).strip() == "Rótulos de Linha":
-            header_row = i
-            break
-    if header_row is None:
+    if 26 not in df_raw.columns or 28 not in df_raw.columns:
         return pd.DataFrame()
 
-    rows = []
-    skip_tokens = {"nan", "Total Geral", "COP REDE RJ", "", "Rótulos de Linha"}
-    for i in range(header_row + 1, len(df_raw)):
-        row = df_raw.iloc[i]
-        login = str(row.get(26, "")).strip()
-        if not login or login in skip_tokens:
-            continue
-        try:
-            pct_f = float(row.get(28, None))
-            rows.append({"Login": login, "DPA_Pct_Oficial": round(pct_f * 100, 2)})
-        except (TypeError, ValueError):
-            pass
+    logins = df_raw[26].astype(str).str.strip()
+    header_pos = np.flatnonzero(logins.to_numpy() == "Rótulos de Linha")
+    if not len(header_pos):
+        return pd.DataFrame()
 
-    if not rows:
+    logins = logins.iloc[header_pos[0] + 1:]
+    pct_raw = df_raw[28].iloc[header_pos[0] + 1:]
+    pct = pd.to_numeric(pct_raw, errors="coerce")
+    skip_tokens = {"nan", "Total Geral", "COP REDE RJ", "", "Rótulos de Linha"}
+    # % vazio mantém o analista (NaN); texto não numérico descarta a linha
+    validos = ~logins.isin(skip_tokens) & (pct.notna() | pct_raw.isna())
+    rows = pd.DataFrame({
+        "Login": logins[validos].to_numpy(),
+        "DPA_Pct_Oficial": (pct[validos] * 100).round(2).to_numpy(),
+    })
+
+    if rows.empty:
         return pd.DataFrame()
 
-    df = pd.DataFrame(rows)
+    df = rows
     # Merge com nome e setor via BASE_EQUIPE
     df = df.merge(
         BASE_EQUIPE[["Matricula", "Nome", "Setor"]],
@@ -447,15 +511,11 @@ def load_dpa_ocupacao(uploaded_file) -> tuple[pd.DataFrame, dict]:
     - df_analistas: DataFrame com Login, Nome, Setor, DPA_Pct_Oficial
     - mes_info: dict com mes_nome, mes_num, dpa_geral_pct
     """
-    if hasattr(uploaded_file, "seek"):
-        uploaded_file.seek(0)
-
-    df_consolidado = pd.read_excel(uploaded_file, sheet_name=DPA_SHEET_CONSOLIDADO, header=None)
-
-    if hasattr(uploaded_file, "seek"):
-        uploaded_file.seek(0)
-
-    df_analistas_raw = pd.read_excel(uploaded_file, sheet_name=DPA_SHEET_ANALISTAS, header=None)
+    # As duas abas saem do mesmo arquivo aberto
+    with XlsxWorkbook(uploaded_file) as wb:
+        # Só a faixa de colunas do pivot (26 a 30) é decodificada
+        df_consolidado = wb.read_sheet(DPA_SHEET_CONSOLIDADO, header_row=None, usecols=DPA_COLUNAS)
+        df_analistas_raw = wb.read_sheet(DPA_SHEET_ANALISTAS, header_row=None, usecols=DPA_COLUNAS)
 
     mes_info = _dpa_detect_mes_recente(df_consolidado)
     df_analistas = _dpa_extract_analistas(df_analistas_raw)
@@ -468,7 +528,7 @@ def dpa_ranking(df_analistas: pd.DataFrame) -> pd.DataFrame:
     if df_analistas.empty:
         return pd.DataFrame()
     df = df_analistas.copy()
-    df["Nome_Curto"] = df["Nome"].apply(primeiro_nome)
+    df["Nome_Curto"] = primeiros_nomes(df["Nome"])
     return df[["Nome_Curto", "Login", "Setor", "DPA_Pct_Oficial"]].rename(
         columns={"Nome_Curto": "Analista", "DPA_Pct_Oficial": "DPA %"}
     )
@@ -494,7 +554,7 @@ def dpa_comparativo(df_analistas: pd.DataFrame, resumo_prod: pd.DataFrame) -> pd
 
     merged = oficial.merge(calculado, on="Login", how="left")
     merged["Diferença"] = (merged["DPA_Pct_Oficial"] - merged["DPA_Calculado"]).round(2)
-    merged["Nome_Curto"] = merged["Nome"].apply(primeiro_nome)
+    merged["Nome_Curto"] = primeiros_nomes(merged["Nome"])
     return merged[["Nome_Curto", "Login", "DPA_Pct_Oficial", "DPA_Calculado", "Diferença"]].rename(
         columns={"Nome_Curto": "Analista", "DPA_Pct_Oficial": "DPA Oficial %", "DPA_Calculado": "DPA Calculado %"}
     ).sort_values("DPA Oficial %", ascending=False).reset_index(drop=True)
@@ -503,19 +563,19 @@ def dpa_comparativo(df_analistas: pd.DataFrame, resumo_prod: pd.DataFrame) -> pd
 # =====================================================
 # Funções originais de produtividade
 # =====================================================
-def resumo_mensal(df: pd.DataFrame) -> pd.DataFrame:
+def _resumo(df: pd.DataFrame, group_cols: list) -> pd.DataFrame:
     agg_dict = {COL_DATA: "count", COL_VOL_TOTAL: "sum"}
     for vc in VOL_COLS.keys():
         if vc in df.columns:
             agg_dict[vc] = "sum"
-    group_cols = [COL_LOGIN, COL_NOME, "Setor", COL_MES, COL_ANOMES]
     existing_group = [c for c in group_cols if c in df.columns]
     g = df.groupby(existing_group).agg(agg_dict).reset_index()
     g = g.rename(columns={COL_DATA: "Dias_Trabalhados"})
     g["Media_Diaria"] = (g[COL_VOL_TOTAL] / g["Dias_Trabalhados"]).round(1)
-    dpa_valid = df[(df[COL_DPA_RESULTADO] >= 0) & (df[COL_DPA_RESULTADO] <= 120)].copy()
-    if not dpa_valid.empty:
-        dpa_mean = dpa_valid.groupby(existing_group)[COL_DPA_RESULTADO].mean().reset_index()
+    # DPA válido (0 a 120%): média por grupo sem copiar as linhas filtradas
+    dpa = df[COL_DPA_RESULTADO].where(df[COL_DPA_RESULTADO].between(0, 120))
+    if dpa.notna().any():
+        dpa_mean = dpa.groupby([df[c] for c in existing_group]).mean().dropna().reset_index()
         dpa_mean = dpa_mean.rename(columns={COL_DPA_RESULTADO: "DPA_Media"})
         dpa_mean["DPA_Media"] = dpa_mean["DPA_Media"].round(1)
         g = g.merge(dpa_mean, on=existing_group, how="left")
@@ -524,25 +584,12 @@ def resumo_mensal(df: pd.DataFrame) -> pd.DataFrame:
     return g
 
 
+def resumo_mensal(df: pd.DataFrame) -> pd.DataFrame:
+    return _resumo(df, [COL_LOGIN, COL_NOME, "Setor", COL_MES, COL_ANOMES])
+
+
 def resumo_geral(df: pd.DataFrame) -> pd.DataFrame:
-    agg_dict = {COL_DATA: "count", COL_VOL_TOTAL: "sum"}
-    for vc in VOL_COLS.keys():
-        if vc in df.columns:
-            agg_dict[vc] = "sum"
-    group_cols = [COL_LOGIN, COL_NOME, "Setor"]
-    existing_group = [c for c in group_cols if c in df.columns]
-    g = df.groupby(existing_group).agg(agg_dict).reset_index()
-    g = g.rename(columns={COL_DATA: "Dias_Trabalhados"})
-    g["Media_Diaria"] = (g[COL_VOL_TOTAL] / g["Dias_Trabalhados"]).round(1)
-    dpa_valid = df[(df[COL_DPA_RESULTADO] >= 0) & (df[COL_DPA_RESULTADO] <= 120)].copy()
-    if not dpa_valid.empty:
-        dpa_mean = dpa_valid.groupby(existing_group)[COL_DPA_RESULTADO].mean().reset_index()
-        dpa_mean = dpa_mean.rename(columns={COL_DPA_RESULTADO: "DPA_Media"})
-        dpa_mean["DPA_Media"] = dpa_mean["DPA_Media"].round(1)
-        g = g.merge(dpa_mean, on=existing_group, how="left")
-    else:
-        g["DPA_Media"] = np.nan
-    return g
+    return _resumo(df, [COL_LOGIN, COL_NOME, "Setor"])
 
 
 def evolucao_diaria(df: pd.DataFrame) -> pd.DataFrame:
@@ -575,6 +622,11 @@ def primeiro_nome(nome_completo: str) -> str:
     return f"{parts[0]} {parts[-1]}"
 
 
+def primeiros_nomes(nomes: pd.Series) -> pd.Series:
+    """primeiro_nome da coluna inteira (uma chamada por nome distinto)."""
+    return kernels.por_valor(nomes, primeiro_nome)
+
+
 # =====================================================
 # INDICADORES TOA — Loader e processadores
 # =====================================================
@@ -585,12 +637,19 @@ def load_toa_indicadores(uploaded_file) -> pd.DataFrame:
     TAREFAS CANCELADAS e TEMPO DE VALIDAÇÃO DO FORMULÁRIO
     filtrados pela equipe monitorada.
 
-    Detecção automática do mês mais recente via coluna ANOMES.
+    Mantém todos os meses (coluna ANOMES); o recorte por mês fica com o dashboard.
     """
-    if hasattr(uploaded_file, "seek"):
-        uploaded_file.seek(0)
-
-    df = pd.read_excel(uploaded_file, sheet_name=TOA_IND_SHEET)
+    # Só as colunas usadas pelo dashboard são decodificadas
+    with XlsxWorkbook(uploaded_file) as wb:
+        df = wb.read_sheet(
+            TOA_IND_SHEET, usecols=TOA_COLUNAS,
+            filters={
+                TOA_COL_INDICADOR_NOME: set(TOA_INDICADORES_FILTRO),
+                TOA_COL_LOGIN: EQUIPE_IDS,
+                TOA_COL_REGIONAL: {REGIONAL_FILTRO},
+            },
+            normalize={TOA_COL_LOGIN: lambda v: str(v).strip().upper()},
+        )
 
     # Filtrar indicadores de interesse
     if TOA_COL_INDICADOR_NOME not in df.columns:
@@ -603,11 +662,10 @@ def load_toa_indicadores(uploaded_file) -> pd.DataFrame:
     # Normalizar login (maiúsculo, sem espaços)
     df[TOA_COL_LOGIN] = df[TOA_COL_LOGIN].astype(str).str.strip().str.upper()
 
-    # Detectar ANOMES mais recente e filtrar
+    # ANOMES numérico; linhas sem mês não entram no histórico
     if TOA_COL_ANOMES in df.columns:
         df[TOA_COL_ANOMES] = pd.to_numeric(df[TOA_COL_ANOMES], errors="coerce")
-        anomes_recente = df[TOA_COL_ANOMES].max()
-        df = df[df[TOA_COL_ANOMES] == anomes_recente].copy()
+        df = df[df[TOA_COL_ANOMES].notna()].copy()
 
     # Filtrar equipe
     df = df[df[TOA_COL_LOGIN].isin(EQUIPE_IDS)].copy()
@@ -641,14 +699,9 @@ def load_toa_indicadores(uploaded_file) -> pd.DataFrame:
     # Coluna ADERENTE normalizada:
     # Canceladas: INDICADOR=1 → NÃO ADERENTE → invertemos
     # Validação:  INDICADOR=1 → ADERENTE
-    df["ADERENTE"] = df.apply(
-        lambda row: (
-            (row[TOA_COL_INDICADOR] == 0)
-            if row[TOA_COL_INDICADOR_NOME] in TOA_IND_INVERTIDOS
-            else (row[TOA_COL_INDICADOR] == 1)
-        ),
-        axis=1,
-    ).astype(int)
+    df["ADERENTE"] = kernels.aderente(
+        df[TOA_COL_INDICADOR_NOME], df[TOA_COL_INDICADOR], TOA_IND_INVERTIDOS,
+    )
 
     # Data para evolução diária
     if TOA_COL_DATA in df.columns:
@@ -688,41 +741,70 @@ def toa_resumo_por_indicador(df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 
+_TOA_QUEBRAS = {
+    "analista": [TOA_COL_LOGIN, "Nome", "Setor"],
+    TOA_COL_TIPO_ATIVIDADE: [TOA_COL_TIPO_ATIVIDADE],
+    TOA_COL_AGING: [TOA_COL_AGING],
+    TOA_COL_REDE: [TOA_COL_REDE],
+    TOA_COL_REGIONAL: [TOA_COL_REGIONAL],
+    "DATA_DIA": ["DATA_DIA"],
+}
+
+
+def _toa_quebra(df: pd.DataFrame, indicador: str, conjunto: str) -> pd.DataFrame | None:
+    """
+    Medidas de um indicador TOA somadas pelas colunas do conjunto; None se não
+    há linhas do indicador ou se falta alguma coluna do conjunto.
+    """
+    pacote = _pacote(
+        df, "toa", {k: [TOA_COL_INDICADOR_NOME, *dims] for k, dims in _TOA_QUEBRAS.items()},
+        [TOA_COL_INDICADOR, "ADERENTE", "TMR_min"],
+    )
+    if conjunto not in pacote:
+        return None
+    return _fatia(pacote, conjunto, _TOA_QUEBRAS[conjunto], {TOA_COL_INDICADOR_NOME: indicador})
+
+
 # ---- TAREFAS CANCELADAS ----
 
+def _toa_canceladas(df: pd.DataFrame, col: str, rotulo: str) -> pd.DataFrame | None:
+    g = _toa_quebra(df, TOA_IND_CANCELADAS, col)
+    if g is None:
+        return None
+    g = g[grouping.LINHAS].reset_index()
+    g.columns = [rotulo, "Canceladas"]
+    return g
+
+
 def toa_canceladas_por_analista(df: pd.DataFrame) -> pd.DataFrame:
     """
     Ranking de tarefas canceladas por analista.
     Canceladas = todas as linhas deste indicador (INDICADOR=1 sempre).
     Menor = melhor.
     """
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS].copy()
-    if sub.empty:
+    g = _toa_quebra(df, TOA_IND_CANCELADAS, "analista")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby([TOA_COL_LOGIN, "Nome", "Setor"]).agg(
-        Canceladas=(TOA_COL_INDICADOR, "count"),
-        TMR_Medio_h=("TMR_min", lambda x: round(x.mean() / 60, 2) if x.notna().any() else None),
-    ).reset_index().rename(columns={TOA_COL_LOGIN: "Login"})
+    g = pd.DataFrame({
+        "Canceladas": g[grouping.contagem(TOA_COL_INDICADOR)],
+        "TMR_Medio_h": (_media(g, "TMR_min") / 60).round(2),
+    }).reset_index().rename(columns={TOA_COL_LOGIN: "Login"})
     return g.sort_values("Canceladas", ascending=False).reset_index(drop=True)
 
 
 def toa_canceladas_por_tipo(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown de tarefas canceladas por TIPO_ATIVIDADE."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS]
-    if sub.empty or TOA_COL_TIPO_ATIVIDADE not in sub.columns:
+    g = _toa_canceladas(df, TOA_COL_TIPO_ATIVIDADE, "Tipo Atividade")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_TIPO_ATIVIDADE).size().reset_index(name="Canceladas")
-    g.columns = ["Tipo Atividade", "Canceladas"]
     return g.sort_values("Canceladas", ascending=False).reset_index(drop=True)
 
 
 def toa_canceladas_por_aging(df: pd.DataFrame) -> pd.DataFrame:
     """Distribuição de tarefas canceladas por faixa de AGING."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS]
-    if sub.empty or TOA_COL_AGING not in sub.columns:
+    g = _toa_canceladas(df, TOA_COL_AGING, "Aging")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_AGING).size().reset_index(name="Canceladas")
-    g.columns = ["Aging", "Canceladas"]
     # Ordenar pela ordem definida em config
     order_map = {v: i for i, v in enumerate(TOA_AGING_ORDER)}
     g["_ord"] = g["Aging"].map(order_map).fillna(99)
@@ -731,112 +813,84 @@ def toa_canceladas_por_aging(df: pd.DataFrame) -> pd.DataFrame:
 
 def toa_canceladas_por_rede(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown de tarefas canceladas por REDE."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS]
-    if sub.empty or TOA_COL_REDE not in sub.columns:
+    g = _toa_canceladas(df, TOA_COL_REDE, "Rede")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_REDE).size().reset_index(name="Canceladas")
-    g.columns = ["Rede", "Canceladas"]
     return g.sort_values("Canceladas", ascending=False).reset_index(drop=True)
 
 
 def toa_canceladas_por_regional(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown de tarefas canceladas por Regional."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS]
-    if sub.empty or TOA_COL_REGIONAL not in sub.columns:
+    g = _toa_canceladas(df, TOA_COL_REGIONAL, "Regional")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_REGIONAL).size().reset_index(name="Canceladas")
-    g.columns = ["Regional", "Canceladas"]
     return g.sort_values("Canceladas", ascending=False).reset_index(drop=True)
 
 
 def toa_canceladas_evolucao(df: pd.DataFrame) -> pd.DataFrame:
     """Evolução diária de tarefas canceladas."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_CANCELADAS]
-    if sub.empty or "DATA_DIA" not in sub.columns:
+    g = _toa_canceladas(df, "DATA_DIA", "Data")
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby("DATA_DIA").size().reset_index(name="Canceladas")
-    g.columns = ["Data", "Canceladas"]
     return g.sort_values("Data").reset_index(drop=True)
 
 
 # ---- TEMPO DE VALIDAÇÃO DO FORMULÁRIO ----
 
+def _toa_validacao(df: pd.DataFrame, conjunto: str, renomear: dict) -> pd.DataFrame | None:
+    g = _toa_quebra(df, TOA_IND_VALIDACAO, conjunto)
+    if g is None:
+        return None
+    g = pd.DataFrame({
+        "Total": g[grouping.contagem(TOA_COL_INDICADOR)],
+        "Aderentes": g[grouping.soma("ADERENTE")],
+        "TMR_Medio_min": _media(g, "TMR_min"),
+    }).reset_index().rename(columns=renomear)
+    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
+    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
+    return g
+
+
 def toa_validacao_por_analista(df: pd.DataFrame) -> pd.DataFrame:
     """
     Ranking de aderência ao tempo de validação do formulário por analista.
     Inclui total de formulários, aderentes, aderência% e TMR médio em minutos.
     """
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_VALIDACAO].copy()
-    if sub.empty:
+    g = _toa_validacao(df, "analista", {TOA_COL_LOGIN: "Login"})
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby([TOA_COL_LOGIN, "Nome", "Setor"]).agg(
-        Total=(TOA_COL_INDICADOR, "count"),
-        Aderentes=("ADERENTE", "sum"),
-        TMR_Medio_min=("TMR_min", "mean"),
-    ).reset_index().rename(columns={TOA_COL_LOGIN: "Login"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
-    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
     return g.sort_values("Aderencia_Pct", ascending=False).reset_index(drop=True)
 
 
 def toa_validacao_por_tipo(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown do tempo de validação por TIPO_ATIVIDADE."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_VALIDACAO]
-    if sub.empty or TOA_COL_TIPO_ATIVIDADE not in sub.columns:
+    g = _toa_validacao(df, TOA_COL_TIPO_ATIVIDADE, {TOA_COL_TIPO_ATIVIDADE: "Tipo Atividade"})
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_TIPO_ATIVIDADE).agg(
-        Total=(TOA_COL_INDICADOR, "count"),
-        Aderentes=("ADERENTE", "sum"),
-        TMR_Medio_min=("TMR_min", "mean"),
-    ).reset_index().rename(columns={TOA_COL_TIPO_ATIVIDADE: "Tipo Atividade"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
-    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
     return g.sort_values("Total", ascending=False).reset_index(drop=True)
 
 
 def toa_validacao_por_rede(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown do tempo de validação por REDE."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_VALIDACAO]
-    if sub.empty or TOA_COL_REDE not in sub.columns:
+    g = _toa_validacao(df, TOA_COL_REDE, {TOA_COL_REDE: "Rede"})
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_REDE).agg(
-        Total=(TOA_COL_INDICADOR, "count"),
-        Aderentes=("ADERENTE", "sum"),
-        TMR_Medio_min=("TMR_min", "mean"),
-    ).reset_index().rename(columns={TOA_COL_REDE: "Rede"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
-    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
     return g.sort_values("Total", ascending=False).reset_index(drop=True)
 
 
 def toa_validacao_por_regional(df: pd.DataFrame) -> pd.DataFrame:
     """Breakdown do tempo de validação por Regional."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_VALIDACAO]
-    if sub.empty or TOA_COL_REGIONAL not in sub.columns:
+    g = _toa_validacao(df, TOA_COL_REGIONAL, {TOA_COL_REGIONAL: "Regional"})
+    if g is None:
         return pd.DataFrame()
-    g = sub.groupby(TOA_COL_REGIONAL).agg(
-        Total=(TOA_COL_INDICADOR, "count"),
-        Aderentes=("ADERENTE", "sum"),
-        TMR_Medio_min=("TMR_min", "mean"),
-    ).reset_index().rename(columns={TOA_COL_REGIONAL: "Regional"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
-    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
     return g.sort_values("Total", ascending=False).reset_index(drop=True)
 
 
 def toa_validacao_evolucao(df: pd.DataFrame) -> pd.DataFrame:
     """Evolução diária da aderência ao tempo de validação."""
-    sub = df[df[TOA_COL_INDICADOR_NOME] == TOA_IND_VALIDACAO]
-    if sub.empty or "DATA_DIA" not in sub.columns:
+    g = _toa_validacao(df, "DATA_DIA", {"DATA_DIA": "Data"})
+    if g is None:
         return pd.DataFrame()
-    sub = sub.dropna(subset=["DATA_DIA"])
-    g = sub.groupby("DATA_DIA").agg(
-        Total=(TOA_COL_INDICADOR, "count"),
-        Aderentes=("ADERENTE", "sum"),
-        TMR_Medio_min=("TMR_min", "mean"),
-    ).reset_index().rename(columns={"DATA_DIA": "Data"})
-    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
-    g["TMR_Medio_min"]  = g["TMR_Medio_min"].round(2)
     return g.sort_values("Data").reset_index(drop=True)
 
 
@@ -844,68 +898,15 @@ def toa_validacao_evolucao(df: pd.DataFrame) -> pd.DataFrame:
 # FECHAMENTO TOA x SIR — Loader e processadores
 # =====================================================
 
-def _parse_pivot_cache(raw_bytes: bytes) -> pd.DataFrame:
+def _parse_pivot_cache(source, cache: tuple, filters=None, normalize=None) -> pd.DataFrame:
     """
-    Extrai registros brutos do pivot cache interno de um arquivo xlsx.
-    Retorna DataFrame com todas as colunas presentes no cache.
+    Extrai registros brutos do pivot cache `cache` (definição, registros)
+    de um arquivo xlsx (bytes ou arquivo aberto). Retorna DataFrame com todas as colunas presentes no
+    cache (texto como categórico, números como float). `filters`/`normalize`
+    descartam registros durante a leitura (ver read_pivot_cache).
     """
-    import zipfile
-    import xml.etree.ElementTree as ET
-    import io
-
-    ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-
-    with zipfile.ZipFile(io.BytesIO(raw_bytes)) as zf:
-        # Ler definição do pivot cache
-        def_xml = zf.read('xl/pivotCache/pivotCacheDefinition1.xml')
-        rec_xml = zf.read('xl/pivotCache/pivotCacheRecords1.xml')
-
-    tree_def = ET.fromstring(def_xml)
-    fields   = tree_def.findall('.//x:cacheField', ns)
-    field_names = [f.get('name') for f in fields]
-
-    # Construir itens compartilhados por campo
-    shared = {}
-    for i, field in enumerate(fields):
-        items = []
-        si = field.find('x:sharedItems', ns)
-        if si is not None:
-            for child in si:
-                tag = child.tag.split('}')[-1]
-                if tag == 's':
-                    items.append(child.get('v'))
-                elif tag == 'n':
-                    items.append(float(child.get('v')))
-                elif tag in ('b', 'd'):
-                    items.append(child.get('v'))
-                else:
-                    items.append(None)
-        shared[i] = items
-
-    # Parsear registros
-    root_rec = ET.fromstring(rec_xml)
-    records = []
-    for record in root_rec.findall('x:r', ns):
-        row = {}
-        for fi, child in enumerate(list(record)):
-            if fi >= len(field_names):
-                break
-            fname = field_names[fi]
-            tag = child.tag.split('}')[-1]
-            if tag == 'x':       # referência a item compartilhado
-                ref = int(child.get('v', 0))
-                row[fname] = shared[fi][ref] if ref < len(shared[fi]) else None
-            elif tag == 'n':
-                row[fname] = float(child.get('v', 0))
-            elif tag == 's':
-                row[fname] = child.get('v')
-            elif tag == 'm':
-                row[fname] = None
-            else:
-                row[fname] = child.get('v')
-        records.append(row)
-
-    return pd.DataFrame(records)
+    definition, records = cache
+    return read_pivot_cache(source, definition, records, filters=filters, normalize=normalize)
 
 
 def load_fechamento_toa_sir(uploaded_file) -> pd.DataFrame:
@@ -913,34 +914,48 @@ def load_fechamento_toa_sir(uploaded_file) -> pd.DataFrame:
     Carrega a planilha Fechamento_TOA_x_SIR.xlsx lendo o pivot cache interno.
     Filtra automaticamente:
       - TURNO = 'Madrugada'
-      - ANOMES = mais recente
       - LOGIN_VALIDOU_FECHAMENTO = equipe monitorada
+    Mantém todos os meses (coluna ANOMES).
     Retorna DataFrame pronto para análise com coluna ASSERTIVO (0/1).
     """
     from src.config import (
         EQUIPE_IDS, BASE_EQUIPE,
         FECH_SIR_COL_LOGIN, FECH_SIR_COL_TURNO, FECH_SIR_COL_ANOMES,
         FECH_SIR_COL_VOLUME, FECH_SIR_COL_ASSERTIVO, FECH_SIR_COL_NAO_ASSER,
-        FECH_SIR_TURNO_MADRUGADA,
+        FECH_SIR_TURNO_MADRUGADA, FECH_SIR_COLUNAS_CACHE,
     )
 
-    if hasattr(uploaded_file, 'read'):
-        raw_bytes = uploaded_file.read()
-    else:
-        raw_bytes = uploaded_file
+    # O zip é lido direto do arquivo (no pool, o upload mapeado do spill), sem
+    # copiá-lo inteiro para a memória.
+    # O arquivo pode ter vários pivot caches: usa o que tem os campos do Fech. SIR
+    cache = find_pivot_cache(uploaded_file, FECH_SIR_COLUNAS_CACHE)
+    if cache is None:
+        raise ValueError(
+            "Nenhum pivot cache com os campos " + ", ".join(FECH_SIR_COLUNAS_CACHE) + " encontrado no arquivo."
+        )
 
-    df = _parse_pivot_cache(raw_bytes)
+    from src.config import FECH_SIR_COL_REGIONAL, REGIONAL_FILTRO as _REGIONAL
+
+    # Filtros aplicados já na leitura do cache
+    equipe_upper = {e.upper() for e in EQUIPE_IDS}
+    filters = {
+        FECH_SIR_COL_TURNO: {FECH_SIR_TURNO_MADRUGADA},
+        FECH_SIR_COL_LOGIN: equipe_upper,
+        FECH_SIR_COL_REGIONAL: {_REGIONAL},
+    }
+    normalize = {FECH_SIR_COL_LOGIN: lambda v: str(v).strip().upper()}
+
+    df = _parse_pivot_cache(uploaded_file, cache, filters=filters, normalize=normalize)
     if df.empty:
         return pd.DataFrame()
 
     # Normalizar login
     df[FECH_SIR_COL_LOGIN] = df[FECH_SIR_COL_LOGIN].astype(str).str.strip().str.upper()
 
-    # Filtrar ANOMES mais recente
+    # ANOMES numérico; linhas sem mês não entram no histórico
     if FECH_SIR_COL_ANOMES in df.columns:
         df[FECH_SIR_COL_ANOMES] = pd.to_numeric(df[FECH_SIR_COL_ANOMES], errors='coerce')
-        anomes_max = df[FECH_SIR_COL_ANOMES].max()
-        df = df[df[FECH_SIR_COL_ANOMES] == anomes_max].copy()
+        df = df[df[FECH_SIR_COL_ANOMES].notna()].copy()
 
     # Filtrar madrugada
     if FECH_SIR_COL_TURNO in df.columns:
@@ -950,17 +965,20 @@ def load_fechamento_toa_sir(uploaded_file) -> pd.DataFrame:
         return pd.DataFrame()
 
     # Filtrar equipe (case-insensitive)
-    df = df[df[FECH_SIR_COL_LOGIN].str.upper().isin({e.upper() for e in EQUIPE_IDS})].copy()
+    df = df[df[FECH_SIR_COL_LOGIN].str.upper().isin(equipe_upper)].copy()
     if df.empty:
         return pd.DataFrame()
 
     # Filtrar regional Leste
-    from src.config import FECH_SIR_COL_REGIONAL, REGIONAL_FILTRO as _REGIONAL
     if FECH_SIR_COL_REGIONAL in df.columns:
         df = df[df[FECH_SIR_COL_REGIONAL] == _REGIONAL].copy()
     if df.empty:
         return pd.DataFrame()
 
+    # Categóricos do pivot cache voltam a texto comum no recorte final
+    for c in df.select_dtypes("category").columns:
+        df[c] = df[c].astype(object)
+
     # Merge com nome e setor
     base = BASE_EQUIPE.copy()
     base['Matricula_upper'] = base['Matricula'].str.upper()
@@ -994,44 +1012,79 @@ def fech_sir_resumo_analista(df: pd.DataFrame) -> pd.DataFrame:
     return g.sort_values('Assertividade_Pct', ascending=False).reset_index(drop=True)
 
 
+def _fech_sir_pacote(df: pd.DataFrame) -> dict:
+    from src.config import (
+        FECH_SIR_COL_CAUSA_TOA, FECH_SIR_COL_CAUSA_SIR, FECH_SIR_COL_REGIONAL,
+        FECH_SIR_COL_DEMANDA, FECH_SIR_COL_GRUPO, FECH_SIR_COL_DIA, FECH_SIR_COL_VOLUME,
+    )
+
+    def dia(d):
+        if FECH_SIR_COL_DIA not in d.columns:
+            return {}
+        return {"_dia": pd.to_numeric(d[FECH_SIR_COL_DIA], errors='coerce')}
+
+    return _pacote(
+        df, "fech_sir",
+        {
+            FECH_SIR_COL_CAUSA_TOA: ['ASSERTIVO', FECH_SIR_COL_CAUSA_TOA],
+            FECH_SIR_COL_CAUSA_SIR: ['ASSERTIVO', FECH_SIR_COL_CAUSA_SIR],
+            FECH_SIR_COL_REGIONAL: [FECH_SIR_COL_REGIONAL],
+            FECH_SIR_COL_DEMANDA: [FECH_SIR_COL_DEMANDA],
+            FECH_SIR_COL_GRUPO: [FECH_SIR_COL_GRUPO],
+            '_dia': ['_dia'],
+        },
+        [FECH_SIR_COL_VOLUME, 'ASSERTIVO'],
+        derivadas=dia,
+    )
+
+
+def _fech_sir_nao_assertivo(df: pd.DataFrame, col: str, rotulo: str, top_n: int) -> pd.DataFrame:
+    from src.config import FECH_SIR_COL_VOLUME
+    if col not in df.columns:
+        return pd.DataFrame()
+    g = _fatia(_fech_sir_pacote(df), col, col, {'ASSERTIVO': 0})
+    if g is None:
+        return pd.DataFrame()
+    g = g[grouping.soma(FECH_SIR_COL_VOLUME)].reset_index()
+    g.columns = [rotulo, 'Não Assertivo']
+    return g.sort_values('Não Assertivo', ascending=False).head(top_n).reset_index(drop=True)
+
+
+def _fech_sir_assertividade(df: pd.DataFrame, col: str, rotulo: str) -> pd.DataFrame:
+    from src.config import FECH_SIR_COL_VOLUME
+    g = _fatia(_fech_sir_pacote(df), col, col)
+    g = pd.DataFrame({
+        'Volume': g[grouping.soma(FECH_SIR_COL_VOLUME)],
+        'Assertivos': g[grouping.soma('ASSERTIVO')],
+    }).reset_index().rename(columns={col: rotulo})
+    g['Assertividade_Pct'] = (g['Assertivos'] / g['Volume'] * 100).round(1)
+    return g
+
+
 def fech_sir_por_causa_toa(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
     """Volume não assertivo por causa TOA."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_CAUSA_TOA, FECH_SIR_COL_VOLUME
-    nao_asser = df[df['ASSERTIVO'] == 0]
-    if nao_asser.empty or FECH_SIR_COL_CAUSA_TOA not in nao_asser.columns:
-        return pd.DataFrame()
-    g = nao_asser.groupby(FECH_SIR_COL_CAUSA_TOA)[FECH_SIR_COL_VOLUME].sum().reset_index()
-    g.columns = ['Causa TOA', 'Não Assertivo']
-    return g.sort_values('Não Assertivo', ascending=False).head(top_n).reset_index(drop=True)
+    from src.config import FECH_SIR_COL_CAUSA_TOA
+    return _fech_sir_nao_assertivo(df, FECH_SIR_COL_CAUSA_TOA, 'Causa TOA', top_n)
 
 
 def fech_sir_por_causa_sir(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
     """Volume não assertivo por causa SIR."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_CAUSA_SIR, FECH_SIR_COL_VOLUME
-    nao_asser = df[df['ASSERTIVO'] == 0]
-    if nao_asser.empty or FECH_SIR_COL_CAUSA_SIR not in nao_asser.columns:
-        return pd.DataFrame()
-    g = nao_asser.groupby(FECH_SIR_COL_CAUSA_SIR)[FECH_SIR_COL_VOLUME].sum().reset_index()
-    g.columns = ['Causa SIR', 'Não Assertivo']
-    return g.sort_values('Não Assertivo', ascending=False).head(top_n).reset_index(drop=True)
+    from src.config import FECH_SIR_COL_CAUSA_SIR
+    return _fech_sir_nao_assertivo(df, FECH_SIR_COL_CAUSA_SIR, 'Causa SIR', top_n)
 
 
 def fech_sir_por_regional(df: pd.DataFrame) -> pd.DataFrame:
     """Assertividade por regional."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_REGIONAL, FECH_SIR_COL_VOLUME
+    from src.config import FECH_SIR_COL_REGIONAL
     if FECH_SIR_COL_REGIONAL not in df.columns:
         return pd.DataFrame()
-    g = df.groupby(FECH_SIR_COL_REGIONAL).agg(
-        Volume=(FECH_SIR_COL_VOLUME, 'sum'),
-        Assertivos=('ASSERTIVO', 'sum'),
-    ).reset_index().rename(columns={FECH_SIR_COL_REGIONAL: 'Regional'})
-    g['Assertividade_Pct'] = (g['Assertivos'] / g['Volume'] * 100).round(1)
+    g = _fech_sir_assertividade(df, FECH_SIR_COL_REGIONAL, 'Regional')
     return g.sort_values('Volume', ascending=False).reset_index(drop=True)
 
 
@@ -1039,14 +1092,10 @@ def fech_sir_por_demanda(df: pd.DataFrame) -> pd.DataFrame:
     """Assertividade por tipo de demanda."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_DEMANDA, FECH_SIR_COL_VOLUME
+    from src.config import FECH_SIR_COL_DEMANDA
     if FECH_SIR_COL_DEMANDA not in df.columns:
         return pd.DataFrame()
-    g = df.groupby(FECH_SIR_COL_DEMANDA).agg(
-        Volume=(FECH_SIR_COL_VOLUME, 'sum'),
-        Assertivos=('ASSERTIVO', 'sum'),
-    ).reset_index().rename(columns={FECH_SIR_COL_DEMANDA: 'Demanda'})
-    g['Assertividade_Pct'] = (g['Assertivos'] / g['Volume'] * 100).round(1)
+    g = _fech_sir_assertividade(df, FECH_SIR_COL_DEMANDA, 'Demanda')
     return g.sort_values('Volume', ascending=False).reset_index(drop=True)
 
 
@@ -1054,16 +1103,10 @@ def fech_sir_por_dia(df: pd.DataFrame) -> pd.DataFrame:
     """Evolução diária de assertividade."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_DIA, FECH_SIR_COL_VOLUME
+    from src.config import FECH_SIR_COL_DIA
     if FECH_SIR_COL_DIA not in df.columns:
         return pd.DataFrame()
-    df2 = df.copy()
-    df2['_dia'] = pd.to_numeric(df2[FECH_SIR_COL_DIA], errors='coerce')
-    g = df2.groupby('_dia').agg(
-        Volume=(FECH_SIR_COL_VOLUME, 'sum'),
-        Assertivos=('ASSERTIVO', 'sum'),
-    ).reset_index().rename(columns={'_dia': 'Dia'})
-    g['Assertividade_Pct'] = (g['Assertivos'] / g['Volume'] * 100).round(1)
+    g = _fech_sir_assertividade(df, '_dia', 'Dia')
     return g.sort_values('Dia').reset_index(drop=True)
 
 
@@ -1071,12 +1114,8 @@ def fech_sir_por_grupo(df: pd.DataFrame) -> pd.DataFrame:
     """Assertividade por IN_GRUPO (subgrupos dentro da Regional)."""
     if df.empty:
         return pd.DataFrame()
-    from src.config import FECH_SIR_COL_GRUPO, FECH_SIR_COL_VOLUME
+    from src.config import FECH_SIR_COL_GRUPO
     if FECH_SIR_COL_GRUPO not in df.columns:
         return pd.DataFrame()
-    g = df.groupby(FECH_SIR_COL_GRUPO).agg(
-        Volume=(FECH_SIR_COL_VOLUME, 'sum'),
-        Assertivos=('ASSERTIVO', 'sum'),
-    ).reset_index().rename(columns={FECH_SIR_COL_GRUPO: 'Grupo'})
-    g['Assertividade_Pct'] = (g['Assertivos'] / g['Volume'] * 100).round(1)
+    g = _fech_sir_assertividade(df, FECH_SIR_COL_GRUPO, 'Grupo')
     return g.sort_values('Volume', ascending=False).reset_index(drop=True)
@@ -0,0 +1,481 @@
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import duckdb
+except ImportError:  # motor SQL é opcional: sem o pacote, tudo roda em pandas
+    duckdb = None
+
+from src import cube, processors
+from src.config import (
+    QUERY_ENGINE,
+    ETIT_COL_LOGIN, ETIT_COL_DEMANDA, ETIT_COL_VOLUME, ETIT_COL_TIPO, ETIT_COL_CAUSA,
+    ETIT_COL_REGIONAL, ETIT_COL_TURNO, ETIT_COL_TMA, ETIT_COL_TMR,
+    ETIT_COL_INDICADOR_VAL,
+    RES_INDICADORES_FILTRO, RES_COL_INDICADOR_NOME, RES_COL_VOLUME, RES_COL_TMA, RES_COL_TMR,
+    RES_COL_REGIONAL, RES_COL_NATUREZA, RES_COL_SOLUCAO, RES_COL_IMPACTO,
+    TOA_INDICADORES_FILTRO, TOA_IND_CANCELADAS, TOA_IND_VALIDACAO, TOA_AGING_ORDER,
+    TOA_COL_INDICADOR_NOME, TOA_COL_INDICADOR, TOA_COL_LOGIN, TOA_COL_TIPO_ATIVIDADE,
+    TOA_COL_AGING, TOA_COL_REDE, TOA_COL_REGIONAL,
+    FECH_SIR_COL_LOGIN, FECH_SIR_COL_VOLUME, FECH_SIR_COL_CAUSA_TOA, FECH_SIR_COL_CAUSA_SIR,
+    FECH_SIR_COL_REGIONAL, FECH_SIR_COL_DEMANDA, FECH_SIR_COL_GRUPO,
+)
+from src.storage import STORE, partition_value
+
+
+# =====================================================
+# Motor de consulta (DuckDB opcional)
+# =====================================================
+# As quebras do dashboard (etit_por_*, res_por_*, toa_*, fech_sir_por_*) são
+# respondidas pelo cubo de agregados gravado na carga (src/cube.py): o recorte
+# por ANOMES vira seleção de partições e os filtros de setor/login/indicador
+# são dimensões do cubo. Com DuckDB, a quebra roda em SQL direto sobre os
+# Parquet do cubo; sem ele (ou com QUERY_ENGINE = "pandas"), o cubo é
+# reagrupado em pandas. As funções de processors ficam para dados fora da base.
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _literal(valor: str) -> str:
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _soma(col):
+    return ("soma", col)
+
+
+def _media(col):
+    return ("media", col)
+
+
+def _conta(col):
+    return ("conta", col)
+
+
+def _conta_se(col, valor):
+    return ("conta_se", col, valor)
+
+
+def _distintos(col):
+    return ("distintos", col)
+
+
+_LINHAS = ("linhas",)
+
+
+def _sql(medida, inteiras) -> str:
+    """Medida do cubo em SQL; `inteiras` = colunas inteiras do cubo (somas voltam BIGINT)."""
+    tipo, *args = medida
+    if tipo == "soma":
+        col = cube.soma(args[0])
+        expr = f"coalesce(sum({_q(col)}), 0)"
+        return f"CAST({expr} AS BIGINT)" if col in inteiras else expr
+    if tipo == "media":
+        return f"sum({_q(cube.soma(args[0]))}) / nullif(sum({_q(cube.contagem(args[0]))}), 0)"
+    if tipo == "conta":
+        return f"CAST(coalesce(sum({_q(cube.contagem(args[0]))}), 0) AS BIGINT)"
+    if tipo == "linhas":
+        return f"CAST(sum({_q(cube.LINHAS)}) AS BIGINT)"
+    if tipo == "conta_se":
+        return f"CAST(coalesce(sum(CASE WHEN {_q(args[0])} = {_literal(args[1])} THEN {_q(cube.LINHAS)} ELSE 0 END), 0) AS BIGINT)"
+    if tipo == "distintos":
+        return f"count(DISTINCT {_q(args[0])})"
+    raise ValueError(f"medida desconhecida: {tipo}")
+
+
+# ---------- pós-processamento (mesmas contas de processors) ----------
+
+def _pos(pct=None, arred=None, ordem=None, asc=False):
+    """Percentual, arredondamentos, ordenação e top N sobre o resultado agregado."""
+    def aplicar(g, top_n=None):
+        if pct:
+            destino, num, den = pct
+            g[destino] = (g[num] / g[den] * 100).round(1)
+        for col, casas in (arred or {}).items():
+            g[col] = g[col].round(casas)
+        if ordem:
+            g = g.sort_values(ordem, ascending=asc)
+        if top_n is not None:
+            g = g.head(top_n)
+        return g.reset_index(drop=True)
+    return aplicar
+
+
+def _pos_ordem_fixa(col, ordem):
+    """Ordena as linhas pela lista de valores da configuração (ex.: indicadores, aging)."""
+    posicao = {v: i for i, v in enumerate(ordem)}
+
+    def aplicar(g, top_n=None):
+        g = g.assign(_ord=g[col].map(posicao).fillna(99))
+        return g.sort_values("_ord").drop(columns="_ord").reset_index(drop=True)
+    return aplicar
+
+
+def _pos_etit_diaria(g, top_n=None):
+    g["Data"] = pd.to_datetime(g["Data"])
+    g["Aderencia_Pct"] = (g["Aderentes"] / g["Eventos"] * 100).round(1)
+    return g
+
+
+def _pos_horas(col, pos):
+    """Converte a média em minutos para horas (2 casas) antes do pós-processamento."""
+    def aplicar(g, top_n=None):
+        g[col] = (g[col] / 60).round(2)
+        return pos(g, top_n=top_n)
+    return aplicar
+
+
+def _pos_toa_resumo(g, top_n=None):
+    g["Aderencia_Pct"] = (g["Aderentes"] / g["Total"] * 100).round(1)
+    g["TMR_Medio_min"] = g["TMR_Medio_min"].round(2)
+    g = g[["Indicador", "Total", "Aderentes", "Aderencia_Pct", "TMR_Medio_min"]]
+    return _pos_ordem_fixa("Indicador", TOA_INDICADORES_FILTRO)(g)
+
+
+# ---------- quebras ----------
+# por: {rótulo: dimensão do cubo}; medidas: {coluna: medida sobre o cubo};
+# filtro: recorte fixo da quebra; filtro_kw: argumento da função → coluna filtrada.
+
+_ETIT_SOMAS = {"Eventos": _soma(ETIT_COL_VOLUME), "Aderentes": _soma(ETIT_COL_INDICADOR_VAL)}
+_ETIT_TEMPOS = {"TMA_Medio": _media(ETIT_COL_TMA), "TMR_Medio": _media(ETIT_COL_TMR)}
+_RES_SOMAS = {"Volume": _soma(RES_COL_VOLUME), "Aderentes": _soma("ADERENTE")}
+_RES_POS = _pos(pct=("Aderencia_Pct", "Aderentes", "Volume"), ordem="Volume")
+_TOA_CANC = {TOA_COL_INDICADOR_NOME: TOA_IND_CANCELADAS}
+_TOA_VAL = {TOA_COL_INDICADOR_NOME: TOA_IND_VALIDACAO}
+_TOA_VAL_MEDIDAS = {
+    "Total": _conta(TOA_COL_INDICADOR), "Aderentes": _soma("ADERENTE"), "TMR_Medio_min": _media("TMR_min"),
+}
+_TOA_VAL_POS = _pos(pct=("Aderencia_Pct", "Aderentes", "Total"), arred={"TMR_Medio_min": 2}, ordem="Total")
+_FECH_SOMAS = {"Volume": _soma(FECH_SIR_COL_VOLUME), "Assertivos": _soma("ASSERTIVO")}
+_FECH_POS = _pos(pct=("Assertividade_Pct", "Assertivos", "Volume"), ordem="Volume")
+
+
+def _por_analista(login, rotulo):
+    return {rotulo: login, "Nome": "Nome", "Setor": "Setor"}
+
+
+_QUEBRAS = {
+    # ETIT
+    "etit_resumo_analista": dict(
+        dataset="etit", por=_por_analista(ETIT_COL_LOGIN, ETIT_COL_LOGIN),
+        medidas={
+            "Total_Eventos": _soma(ETIT_COL_VOLUME), "Eventos_Aderentes": _soma(ETIT_COL_INDICADOR_VAL),
+            "TMA_Medio": _media(ETIT_COL_TMA), "TMR_Medio": _media(ETIT_COL_TMR),
+            "RAL_Count": _conta_se(ETIT_COL_DEMANDA, "RAL"), "REC_Count": _conta_se(ETIT_COL_DEMANDA, "REC"),
+        },
+        pos=_pos(pct=("Aderencia_Pct", "Eventos_Aderentes", "Total_Eventos"),
+                 arred={"TMA_Medio": 4, "TMR_Medio": 4}, ordem="Total_Eventos"),
+    ),
+    "etit_por_demanda": dict(
+        dataset="etit", por={"Demanda": ETIT_COL_DEMANDA}, medidas={**_ETIT_SOMAS, **_ETIT_TEMPOS}, pos=_pos(),
+    ),
+    "etit_por_tipo": dict(dataset="etit", por={"Tipo": ETIT_COL_TIPO}, medidas=_ETIT_SOMAS, pos=_pos(ordem="Eventos")),
+    "etit_por_causa": dict(dataset="etit", por={"Causa": ETIT_COL_CAUSA}, medidas=_ETIT_SOMAS, pos=_pos(ordem="Eventos")),
+    "etit_por_regional": dict(
+        dataset="etit", por={"Regional": ETIT_COL_REGIONAL}, medidas=_ETIT_SOMAS, pos=_pos(ordem="Eventos"),
+    ),
+    "etit_por_turno": dict(dataset="etit", por={"Turno": ETIT_COL_TURNO}, medidas=_ETIT_SOMAS, pos=_pos(ordem="Eventos")),
+    "etit_evolucao_diaria": dict(
+        dataset="etit", por={"Data": "Data"},
+        medidas={**_ETIT_SOMAS, "Analistas": _distintos(ETIT_COL_LOGIN)},
+        pos=_pos_etit_diaria,
+    ),
+    # Indicadores Residencial
+    "res_kpis_por_indicador": dict(
+        dataset="res_ind", por={"Indicador": RES_COL_INDICADOR_NOME},
+        medidas={**_RES_SOMAS, "TMA_Medio": _media(RES_COL_TMA), "TMR_Medio": _media(RES_COL_TMR)},
+        pos=lambda g, top_n=None: _pos_ordem_fixa("Indicador", RES_INDICADORES_FILTRO)(
+            g.assign(Aderencia_Pct=(g["Aderentes"] / g["Volume"] * 100).round(1))
+        ),
+    ),
+    "res_por_regional": dict(
+        dataset="res_ind", por={"Regional": RES_COL_REGIONAL}, medidas=_RES_SOMAS, pos=_RES_POS,
+        filtro_kw={"indicador": RES_COL_INDICADOR_NOME},
+    ),
+    "res_por_natureza": dict(
+        dataset="res_ind", por={"Natureza": RES_COL_NATUREZA}, medidas=_RES_SOMAS, pos=_RES_POS,
+        filtro_kw={"indicador": RES_COL_INDICADOR_NOME},
+    ),
+    "res_por_solucao": dict(
+        dataset="res_ind", por={"Solução": RES_COL_SOLUCAO}, medidas=_RES_SOMAS, pos=_RES_POS,
+        filtro_kw={"indicador": RES_COL_INDICADOR_NOME}, top_n=15,
+    ),
+    "res_por_impacto": dict(
+        dataset="res_ind", por={"Impacto": RES_COL_IMPACTO}, medidas=_RES_SOMAS, pos=_RES_POS,
+        filtro_kw={"indicador": RES_COL_INDICADOR_NOME},
+    ),
+    "res_evolucao_diaria": dict(
+        dataset="res_ind", por={"Data": "DATA_DIA"}, medidas=_RES_SOMAS,
+        pos=_pos(pct=("Aderencia_Pct", "Aderentes", "Volume"), ordem="Data", asc=True),
+        filtro_kw={"indicador": RES_COL_INDICADOR_NOME},
+    ),
+    # Indicadores TOA
+    "toa_resumo_por_indicador": dict(
+        dataset="toa", por={"Indicador": TOA_COL_INDICADOR_NOME},
+        medidas={"Total": _LINHAS, "Aderentes": _soma("ADERENTE"), "TMR_Medio_min": _media("TMR_min")},
+        pos=_pos_toa_resumo,
+    ),
+    "toa_canceladas_por_analista": dict(
+        dataset="toa", por=_por_analista(TOA_COL_LOGIN, "Login"), filtro=_TOA_CANC,
+        medidas={"Canceladas": _conta(TOA_COL_INDICADOR), "TMR_Medio_h": _media("TMR_min")},
+        pos=_pos_horas("TMR_Medio_h", _pos(ordem="Canceladas")),
+    ),
+    "toa_canceladas_por_tipo": dict(
+        dataset="toa", por={"Tipo Atividade": TOA_COL_TIPO_ATIVIDADE}, filtro=_TOA_CANC,
+        medidas={"Canceladas": _LINHAS}, pos=_pos(ordem="Canceladas"),
+    ),
+    "toa_canceladas_por_aging": dict(
+        dataset="toa", por={"Aging": TOA_COL_AGING}, filtro=_TOA_CANC,
+        medidas={"Canceladas": _LINHAS}, pos=_pos_ordem_fixa("Aging", TOA_AGING_ORDER),
+    ),
+    "toa_canceladas_por_rede": dict(
+        dataset="toa", por={"Rede": TOA_COL_REDE}, filtro=_TOA_CANC,
+        medidas={"Canceladas": _LINHAS}, pos=_pos(ordem="Canceladas"),
+    ),
+    "toa_canceladas_por_regional": dict(
+        dataset="toa", por={"Regional": TOA_COL_REGIONAL}, filtro=_TOA_CANC,
+        medidas={"Canceladas": _LINHAS}, pos=_pos(ordem="Canceladas"),
+    ),
+    "toa_canceladas_evolucao": dict(
+        dataset="toa", por={"Data": "DATA_DIA"}, filtro=_TOA_CANC,
+        medidas={"Canceladas": _LINHAS}, pos=_pos(ordem="Data", asc=True),
+    ),
+    "toa_validacao_por_analista": dict(
+        dataset="toa", por=_por_analista(TOA_COL_LOGIN, "Login"), filtro=_TOA_VAL, medidas=_TOA_VAL_MEDIDAS,
+        pos=_pos(pct=("Aderencia_Pct", "Aderentes", "Total"), arred={"TMR_Medio_min": 2}, ordem="Aderencia_Pct"),
+    ),
+    "toa_validacao_por_tipo": dict(
+        dataset="toa", por={"Tipo Atividade": TOA_COL_TIPO_ATIVIDADE}, filtro=_TOA_VAL,
+        medidas=_TOA_VAL_MEDIDAS, pos=_TOA_VAL_POS,
+    ),
+    "toa_validacao_por_rede": dict(
+        dataset="toa", por={"Rede": TOA_COL_REDE}, filtro=_TOA_VAL, medidas=_TOA_VAL_MEDIDAS, pos=_TOA_VAL_POS,
+    ),
+    "toa_validacao_por_regional": dict(
+        dataset="toa", por={"Regional": TOA_COL_REGIONAL}, filtro=_TOA_VAL,
+        medidas=_TOA_VAL_MEDIDAS, pos=_TOA_VAL_POS,
+    ),
+    "toa_validacao_evolucao": dict(
+        dataset="toa", por={"Data": "DATA_DIA"}, filtro=_TOA_VAL, medidas=_TOA_VAL_MEDIDAS,
+        pos=_pos(pct=("Aderencia_Pct", "Aderentes", "Total"), arred={"TMR_Medio_min": 2}, ordem="Data", asc=True),
+    ),
+    # Fechamento TOA x SIR
+    "fech_sir_resumo_analista": dict(
+        dataset="fech_sir", por=_por_analista(FECH_SIR_COL_LOGIN, "Login"), medidas=_FECH_SOMAS,
+        pos=_pos(pct=("Assertividade_Pct", "Assertivos", "Volume"), ordem="Assertividade_Pct"),
+    ),
+    "fech_sir_por_causa_toa": dict(
+        dataset="fech_sir", por={"Causa TOA": FECH_SIR_COL_CAUSA_TOA}, filtro={"ASSERTIVO": 0},
+        medidas={"Não Assertivo": _soma(FECH_SIR_COL_VOLUME)}, pos=_pos(ordem="Não Assertivo"), top_n=15,
+    ),
+    "fech_sir_por_causa_sir": dict(
+        dataset="fech_sir", por={"Causa SIR": FECH_SIR_COL_CAUSA_SIR}, filtro={"ASSERTIVO": 0},
+        medidas={"Não Assertivo": _soma(FECH_SIR_COL_VOLUME)}, pos=_pos(ordem="Não Assertivo"), top_n=15,
+    ),
+    "fech_sir_por_regional": dict(
+        dataset="fech_sir", por={"Regional": FECH_SIR_COL_REGIONAL}, medidas=_FECH_SOMAS, pos=_FECH_POS,
+    ),
+    "fech_sir_por_demanda": dict(
+        dataset="fech_sir", por={"Demanda": FECH_SIR_COL_DEMANDA}, medidas=_FECH_SOMAS, pos=_FECH_POS,
+    ),
+    "fech_sir_por_grupo": dict(
+        dataset="fech_sir", por={"Grupo": FECH_SIR_COL_GRUPO}, medidas=_FECH_SOMAS, pos=_FECH_POS,
+    ),
+    "fech_sir_por_dia": dict(
+        dataset="fech_sir", por={"Dia": "Dia"}, medidas=_FECH_SOMAS,
+        pos=_pos(pct=("Assertividade_Pct", "Assertivos", "Volume"), ordem="Dia", asc=True),
+    ),
+}
+
+
+def _recorte(spec: dict, filtros: dict, kwargs: dict) -> dict:
+    """Filtros da quebra: recorte fixo + filtros do dashboard + argumentos da função."""
+    recorte = {**spec.get("filtro", {}), **(filtros or {})}
+    for arg, col in spec.get("filtro_kw", {}).items():
+        if kwargs.get(arg):
+            recorte[col] = kwargs[arg]
+    return {col: valor for col, valor in recorte.items() if valor is not None}
+
+
+def _chave_quebra(nome: str, particoes, filtros, kwargs: dict) -> tuple:
+    """
+    Chave normalizada dos resultados memorizados: 202601 e "202601", filtros
+    None e top_n padrão explícito caem na mesma entrada (o aquecimento em
+    src/warmup.py conta com isso).
+    """
+    spec = _QUEBRAS[nome]
+    return (
+        nome,
+        None if particoes is None else tuple(sorted(partition_value(p) for p in particoes)),
+        repr(sorted(_recorte(spec, filtros, {}).items())),
+        repr(sorted({"top_n": spec.get("top_n"), **kwargs}.items())),
+    )
+
+
+def _finaliza(spec: dict, g: pd.DataFrame, kwargs: dict) -> pd.DataFrame:
+    if g.empty:
+        return pd.DataFrame()
+    return spec["pos"](g, top_n=kwargs.get("top_n", spec.get("top_n")))
+
+
+class DuckDBEngine:
+    """
+    Executa as quebras em SQL sobre os arquivos do cubo da base local.
+    Resultados são memorizados por versão do dataset (uma nova carga
+    invalida os do dataset).
+    """
+
+    def __init__(self, store=STORE):
+        self.store = store
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        self._memo = {}
+
+    def quebra(self, nome: str, particoes=None, filtros=None, **kwargs) -> pd.DataFrame | None:
+        """Resultado da quebra, ou None se o cubo das partições não está gravado."""
+        spec = _QUEBRAS[nome]
+        dataset = spec["dataset"]
+        chave = _chave_quebra(nome, particoes, filtros, kwargs)
+        versao = self.store.manifest(dataset).get("versao")
+        with self._lock:
+            if self._memo.get(chave, (None,))[0] == versao:
+                # Cópia: o dashboard acrescenta colunas nos resultados
+                return self._memo[chave][1].copy()
+
+        arquivos = self.store.cube_files(dataset, particoes)
+        if arquivos is None:
+            return None
+        if not arquivos:
+            return pd.DataFrame()
+        inteiras = {
+            campo.name for campo in pq.read_schema(arquivos[0]) if pa.types.is_integer(campo.type)
+        }
+
+        where = [f"{_q(col)} IS NOT NULL" for col in spec["por"].values()]
+        params = []
+        for col, valor in _recorte(spec, filtros, kwargs).items():
+            valores = list(valor) if isinstance(valor, (list, tuple, set)) else [valor]
+            where.append(f"{_q(col)} IN ({', '.join('?' * len(valores))})")
+            params += [v.item() if hasattr(v, "item") else v for v in valores]
+
+        select = [f"{_q(col)} AS {_q(rotulo)}" for rotulo, col in spec["por"].items()]
+        select += [f"{_sql(medida, inteiras)} AS {_q(rotulo)}" for rotulo, medida in spec["medidas"].items()]
+        grupos = ", ".join(str(i + 1) for i in range(len(spec["por"])))
+        fonte = "read_parquet([" + ", ".join(_literal(f) for f in arquivos) + "], union_by_name = true)"
+        sql = (
+            f"SELECT {', '.join(select)} FROM {fonte} WHERE {' AND '.join(where)} "
+            f"GROUP BY {grupos} ORDER BY {grupos}"
+        )
+        with self._lock:
+            g = self._con.execute(sql, params).df()
+
+        resultado = _finaliza(spec, g, kwargs)
+        with self._lock:
+            # Resultados de versões anteriores do dataset saem da memória
+            for k in [k for k, (v, _) in self._memo.items()
+                      if _QUEBRAS[k[0]]["dataset"] == dataset and v != versao]:
+                del self._memo[k]
+            self._memo[chave] = (versao, resultado)
+        return resultado.copy()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """Motor DuckDB do processo, ou None se desligado/indisponível."""
+    global _engine
+    if duckdb is None or QUERY_ENGINE == "pandas":
+        return None
+    with _engine_lock:
+        if _engine is None:
+            _engine = DuckDBEngine()
+        return _engine
+
+
+# Resultados do reagrupamento em pandas, memorizados como os do DuckDBEngine:
+# por versão do dataset, com a mesma chave normalizada
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+
+def quebra(nome: str, df: pd.DataFrame, particoes=None, filtros=None, **kwargs) -> pd.DataFrame:
+    """
+    Quebra `nome` (mesmo nome e saída da função de processors).
+
+    Responde a partir do cubo de agregados da base local, no recorte
+    `particoes` (ANOMES) + `filtros` ({coluna: valor ou lista}) — em SQL com
+    DuckDB ou reagrupando o cubo em pandas. `df` deve ser esse mesmo recorte
+    em linhas, usado quando o dataset não tem cubo na base.
+    """
+    spec = _QUEBRAS.get(nome)
+    if spec is not None and STORE.exists(spec["dataset"]):
+        motor = engine()
+        if motor is not None:
+            try:
+                resultado = motor.quebra(nome, particoes, filtros, **kwargs)
+                if resultado is not None:
+                    return resultado
+            except duckdb.Error:
+                pass  # ex.: coluna ausente no cubo — tenta em pandas
+        chave = _chave_quebra(nome, particoes, filtros, kwargs)
+        versao = STORE.manifest(spec["dataset"]).get("versao")
+        with _rollups_lock:
+            if _rollups.get(chave, (None,))[0] == versao:
+                # Cópia: o dashboard acrescenta colunas nos resultados
+                return _rollups[chave][1].copy()
+        cubo = STORE.cube(spec["dataset"], particoes)
+        try:
+            g = None if cubo.empty else cube.rollup(cubo, spec["por"], spec["medidas"], _recorte(spec, filtros, kwargs))
+        except KeyError:
+            pass  # dimensão/medida ausente no cubo — a função de processors trata
+        else:
+            resultado = pd.DataFrame() if g is None else _finaliza(spec, g, kwargs)
+            with _rollups_lock:
+                for k in [k for k, (v, _) in _rollups.items()
+                          if _QUEBRAS[k[0]]["dataset"] == spec["dataset"] and v != versao]:
+                    del _rollups[k]
+                _rollups[chave] = (versao, resultado)
+            return resultado.copy()
+    return getattr(processors, nome)(df, **kwargs)
+
+
+# =====================================================
+# Resumo por analista (Produtividade)
+# =====================================================
+# resumo_geral/resumo_mensal do recorte da sidebar são usados por várias abas
+# na mesma execução (Ranking, Líderes, Dados Detalhados, DPA) e pelas sessões
+# com o mesmo filtro: o resultado fica memorizado por (versão da base, mês,
+# setor) e sai da memória quando chega uma nova carga.
+
+_resumos = {}
+_resumos_lock = threading.Lock()
+
+
+def resumo_produtividade(df: pd.DataFrame, mes="Todos", setor="Todos", mensal=False) -> pd.DataFrame:
+    """
+    resumo_geral (ou resumo_mensal, com mensal=True) de `df`, que deve ser a
+    Produtividade da base no recorte `mes` (ANOMES) + `setor` ("Todos" = sem
+    filtro). Fora da base local é calculado direto.
+    """
+    calcula = processors.resumo_mensal if mensal else processors.resumo_geral
+    versao = STORE.manifest("produtividade").get("versao")
+    if not versao:
+        return calcula(df)
+    chave = (None if mes == "Todos" else partition_value(mes), setor, mensal)
+    with _resumos_lock:
+        if _resumos.get(chave, (None,))[0] == versao:
+            # Cópia: o dashboard acrescenta colunas nos resultados
+            return _resumos[chave][1].copy()
+
+    resultado = calcula(df)
+    with _resumos_lock:
+        for k in [k for k, (v, _) in _resumos.items() if v != versao]:
+            del _resumos[k]
+        _resumos[chave] = (versao, resultado)
+    return resultado.copy()
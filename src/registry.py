@@ -0,0 +1,144 @@
+import itertools
+import threading
+import weakref
+
+
+# =====================================================
+# Registro de uploads do processo
+# =====================================================
+# O Streamlit roda cada sessão numa thread do mesmo processo. Sessões que
+# enviam a mesma planilha (mesmo hash de conteúdo + configurações) apontam
+# para a mesma entrada do registro: ela é parseada e gravada na base local
+# uma única vez — quem chega enquanto o parse está em andamento espera o
+# resultado — e conta quantas sessões a referenciam. A sessão guarda só o
+# hash; os dados ficam na base (src/storage.py).
+
+class _Entrada:
+    __slots__ = ("pronto", "carregando", "erro", "repetir", "sessoes")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.carregando = False
+        self.erro = None
+        self.repetir = False   # erro passageiro (ex.: gravação): o próximo claim tenta de novo
+        self.sessoes = set()
+
+
+class UploadRegistry:
+    """Entradas chaveadas por (dataset, chave da planilha em ParquetStore.source_key)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._sessoes = {}   # id da sessão → {slot do upload: chave}
+        self._ids = itertools.count(1)
+
+    def session(self) -> "UploadSession":
+        """Nova sessão; as referências dela são soltas quando o objeto é coletado."""
+        return UploadSession(self, next(self._ids))
+
+    # ---------- referências ----------
+
+    def acquire(self, sessao: int, slot: str, chave: tuple):
+        """Faz o slot da sessão apontar para `chave` (soltando a referência anterior)."""
+        with self._lock:
+            slots = self._sessoes.setdefault(sessao, {})
+            anterior = slots.get(slot)
+            if anterior == chave:
+                return
+            slots[slot] = chave
+            if anterior is not None and anterior not in slots.values():
+                self._solta(sessao, anterior)
+            self._entradas.setdefault(chave, _Entrada()).sessoes.add(sessao)
+
+    def release(self, sessao: int, slot: str = None):
+        """Solta a referência de um slot da sessão (ou de todos)."""
+        with self._lock:
+            slots = self._sessoes.get(sessao, {})
+            for s in [slot] if slot else list(slots):
+                chave = slots.pop(s, None)
+                if chave is not None and chave not in slots.values():
+                    self._solta(sessao, chave)
+            if not slots:
+                self._sessoes.pop(sessao, None)
+
+    def _solta(self, sessao: int, chave: tuple):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return
+        entrada.sessoes.discard(sessao)
+        if not entrada.sessoes and not entrada.carregando:
+            del self._entradas[chave]
+
+    def refcount(self, chave: tuple) -> int:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            return len(entrada.sessoes) if entrada else 0
+
+    # ---------- carga ----------
+
+    def claim(self, chave: tuple) -> bool:
+        """
+        True se a sessão deve parsear a planilha (ninguém está carregando e não
+        há erro definitivo registrado); False se deve esperar o resultado com
+        `wait`. Só deve ser chamado quando a base local ainda não tem a planilha.
+        """
+        with self._lock:
+            entrada = self._entradas.setdefault(chave, _Entrada())
+            if entrada.carregando or (
+                entrada.pronto.is_set() and entrada.erro is not None and not entrada.repetir
+            ):
+                return False
+            # Nova carga (ou a base foi limpa depois da anterior)
+            entrada.pronto.clear()
+            entrada.carregando = True
+            return True
+
+    def finish(self, chave: tuple, erro: BaseException = None, repetir: bool = False):
+        """
+        Encerra a carga iniciada em `claim` e libera quem está esperando.
+        Erro de parse (planilha inválida) fica registrado enquanto houver
+        sessões na entrada; com `repetir`, o erro vale só para quem esperava
+        esta carga e o próximo `claim` tenta de novo.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return
+            entrada.erro = erro
+            entrada.repetir = repetir
+            entrada.carregando = False
+            entrada.pronto.set()
+            if not entrada.sessoes:
+                del self._entradas[chave]
+
+    def wait(self, chave: tuple) -> BaseException | None:
+        """Espera a carga em andamento e retorna o erro dela (None se deu certo)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        entrada.pronto.wait()
+        return entrada.erro
+
+
+class UploadSession:
+    """Referências de uma sessão do Streamlit (guardada em st.session_state)."""
+
+    def __init__(self, registry: UploadRegistry, sessao: int):
+        self.registry = registry
+        self.id = sessao
+        # Sessão encerrada: o session_state é descartado e as referências saem
+        weakref.finalize(self, registry.release, sessao)
+
+    def acquire(self, slot: str, dataset: str, fonte: str) -> tuple:
+        chave = (dataset, fonte)
+        self.registry.acquire(self.id, slot, chave)
+        return chave
+
+    def release(self, slot: str = None):
+        self.registry.release(self.id, slot)
+
+
+# Instância única por processo
+REGISTRY = UploadRegistry()
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import io
+import mmap
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from src.config import SPILL_DIR, SPILL_MAX_BYTES, SPILL_TTL_SEC
+
+
+# =====================================================
+# Área de spill dos uploads em disco
+# =====================================================
+# O arquivo enviado é copiado em blocos para SPILL_DIR/<hash>.xlsx, com o
+# hash calculado no caminho (o mesmo de cache.content_hash). A sessão guarda
+# só o hash; loaders e processos do pool leem o arquivo mapeado em memória,
+# sem uma cópia inteira dos bytes por sessão. Arquivos parados há mais de
+# SPILL_TTL_SEC saem, e acima de SPILL_MAX_BYTES saem os parados há mais tempo.
+
+_BLOCO = 1 << 20
+
+
+class SpilledFile(NamedTuple):
+    """Referência serializável a um upload no spill (vai para os processos do pool)."""
+    path: str
+    digest: str
+
+    def open(self) -> "MappedFile":
+        return MappedFile(self.path)
+
+
+class MappedFile(io.RawIOBase):
+    """Arquivo somente leitura sobre um mmap (o zipfile exige seek/tell/seekable)."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        with open(path, "rb") as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b""
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mm)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def read(self, size=-1):
+        fim = len(self._mm) if size is None or size < 0 else min(len(self._mm), self._pos + size)
+        dados = self._mm[self._pos:fim]
+        self._pos = max(self._pos, fim)
+        return dados
+
+    def readinto(self, buffer):
+        dados = self.read(len(buffer))
+        buffer[:len(dados)] = dados
+        return len(dados)
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        super().close()
+
+
+class SpillStore:
+    def __init__(self, root: str = SPILL_DIR, ttl: float = SPILL_TTL_SEC, max_bytes: int = SPILL_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.xlsx")
+
+    def put(self, file_obj) -> str:
+        """Copia o upload (objeto com read) para o spill e retorna o hash do conteúdo."""
+        os.makedirs(self.root, exist_ok=True)
+        h = hashlib.blake2b(digest_size=16)
+        tmp = os.path.join(self.root, f".{threading.get_ident()}-{time.monotonic_ns()}.tmp")
+        file_obj.seek(0)
+        with open(tmp, "wb") as out:
+            while bloco := file_obj.read(_BLOCO):
+                h.update(bloco)
+                out.write(bloco)
+        file_obj.seek(0)
+        digest = h.hexdigest()
+        with self._lock:
+            os.replace(tmp, self._path(digest))  # mesmo conteúdo já enviado: só substitui
+        self.evict(manter={digest})
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self._path(digest))
+
+    def file(self, digest: str) -> SpilledFile:
+        """Referência ao upload para o loader; conta como uso (renova o TTL)."""
+        path = self._path(digest)
+        os.utime(path)
+        return SpilledFile(path, digest)
+
+    def evict(self, manter=()):
+        """Remove uploads parados há mais de `ttl` e, acima de `max_bytes`, os mais antigos."""
+        with self._lock:
+            arquivos = []
+            for path in glob.glob(os.path.join(self.root, "*.xlsx")):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                arquivos.append((st.st_mtime, st.st_size, path))
+            arquivos.sort()
+            agora = time.time()
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for mtime, tamanho, path in arquivos:
+                if os.path.basename(path)[:-5] in manter:
+                    continue
+                if agora - mtime <= self.ttl and total <= self.max_bytes:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= tamanho
+                except OSError:
+                    pass  # Windows: ainda aberto por um loader; sai na próxima rodada
+
+
+# Instância única por processo
+SPILL = SpillStore()
@@ -0,0 +1,638 @@
+import glob
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src import kernels
+from src.cache import config_fingerprint, content_hash
+from src.cube import build_cube, has_cube
+from src.config import DATA_DIR, STORE_CHAVES, STORE_DATASETS, STORE_MAX_DELTAS, STORE_VERSOES
+
+
+# =====================================================
+# Base local em Parquet
+# =====================================================
+# Cada dataset normalizado (saída dos loaders) fica em data/<dataset>/,
+# particionado pela coluna ANOMES:
+#
+#   data/produtividade/ANOMES=202601/part-000001.parquet
+#   data/produtividade/ANOMES=202601/part-000004.parquet   (delta)
+#   data/produtividade/ANOMES=202601/del-000004.parquet    (chaves removidas)
+#   data/produtividade/_manifest.json
+#   data/etit/ANOMES=202601/cubo-000004.parquet            (agregados, src/cube.py)
+#   data/etit/ANOMES=202601/vigente-000004.arrow           (linhas vigentes, Arrow IPC)
+#   data/etit/_versoes/v-000004.parquet                    (carga inteira, imutável)
+#
+# Cargas são upserts pela chave natural (STORE_CHAVES): só as linhas novas ou
+# alteradas são gravadas, num arquivo de delta com o número sequencial da
+# carga (_seq). Na leitura vale, para cada chave, a linha de maior _seq.
+# Cada planilha traz o mês inteiro até a data, então chaves de um mês enviado
+# que sumiram da planilha são marcadas como removidas (arquivo del-*).
+#
+# O que a carga grava é proporcional às linhas novas: o delta e as marcas de
+# remoção. Para achá-las, a carga calcula chave e hash das linhas recebidas e
+# lê da partição só essas colunas internas (mais _seq). A cada STORE_MAX_DELTAS
+# arquivos a partição é compactada (reescrita inteira), custo que se dilui
+# entre as cargas.
+#
+# O manifesto guarda a versão do dataset e os hashes das planilhas já
+# ingeridas, para que reenviar o mesmo arquivo não dispare novo parse.
+#
+# Os derivados da partição são gravados na primeira leitura depois da carga,
+# não na carga: o retrato das linhas vigentes em Arrow IPC sem compressão
+# (vigente-<seq>.arrow) e o cubo de agregados (cubo-<seq>.parquet), para as
+# quebras não dependerem do volume bruto. <seq> é o da última gravação na
+# partição, então derivados antigos são ignorados e refeitos. As leituras
+# mapeiam o retrato em memória: sessões e processos que abrem o mesmo mês
+# compartilham as páginas do arquivo no cache do sistema operacional, e
+# colunas numéricas/datas sem nulos viram DataFrames sem cópia (somente leitura).
+#
+# Datasets de STORE_VERSOES guardam ainda cada carga inteira como versão
+# imutável, com chave e hash por linha — nesses, a carga também grava a
+# planilha inteira. "O que mudou" entre duas cargas é um hash join dessas duas
+# colunas; das versões só saem, com as demais colunas, os grupos de linhas do
+# Parquet (row groups, _VERSAO_ROW_GROUP linhas) que contêm linhas que mudaram.
+
+_MANIFEST = "_manifest.json"
+_PART_FILE = "part-0.parquet"
+_CUBE_GLOB = "cubo*.parquet"   # inclui o cubo.parquet de antes do <seq> no nome
+_SNAPSHOT_GLOB = "vigente-*.arrow"
+_VERSOES_DIR = "_versoes"
+_VERSAO_ROW_GROUP = 16_384
+
+# Colunas internas gravadas junto com as linhas dos datasets particionados
+_CHAVE = "_chave"   # hash da chave natural + ocorrência
+_HASH = "_hash"     # hash da linha inteira (detecta alteração)
+_SEQ = "_seq"       # carga que gravou a linha
+COLUNAS_INTERNAS = [_CHAVE, _HASH, _SEQ]
+
+_MAX_FONTES = 50
+
+
+def partition_value(value) -> str:
+    """Valor da partição como texto: 202602, 202602.0 e '202602' viram '202602'."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas object com tipos misturados (ex.: NOTA com int e str) não
+    convertem para Arrow; os valores não nulos dessas colunas viram texto.
+    """
+    out = df
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer"):
+            if out is df:
+                out = df.copy()
+            out[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return out
+
+
+def _row_keys(df: pd.DataFrame, chaves: list = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Retorna (chave, hash da linha) de cada linha, ambos uint64.
+    Sem chave natural, a própria linha é a chave. A ordem de ocorrência entra
+    na chave para que linhas repetidas não se anulem no upsert.
+    """
+    linha = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    base = pd.util.hash_pandas_object(df[chaves], index=False).to_numpy() if chaves else linha
+    ocorrencia = pd.Series(base).groupby(base).cumcount().to_numpy()
+    chave = pd.util.hash_pandas_object(pd.DataFrame({"k": base, "o": ocorrencia}), index=False).to_numpy()
+    return chave, linha
+
+
+def _positions_index(df: pd.DataFrame, cols: tuple) -> dict:
+    """{tupla de valores de `cols`: posições (crescentes) das linhas com esses valores}."""
+    grupos = df.groupby(list(cols), sort=False).indices
+    return {k if isinstance(k, tuple) else (k,): v for k, v in grupos.items()}
+
+
+def _write_atomic(path: str, write):
+    """Grava em arquivo temporário e troca de nome: leitores nunca veem arquivo pela metade."""
+    # Temporário por processo/thread: dois leitores podem gravar o mesmo derivado
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_parquet(df: pd.DataFrame, path: str, preserve_index=False, row_group_size=None):
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+    _write_atomic(path, lambda tmp: pq.write_table(table, tmp, row_group_size=row_group_size))
+
+
+def _seq_of(path: str) -> int:
+    """Número da carga no nome do arquivo (part-000004.parquet → 4)."""
+    return int(os.path.basename(path).split("-")[-1].split(".")[0])
+
+
+def _partition_seq(pasta: str) -> int:
+    """_seq da última gravação na partição (delta, remoção ou compactação)."""
+    arquivos = glob.glob(os.path.join(pasta, "part-*.parquet")) + glob.glob(os.path.join(pasta, "del-*.parquet"))
+    return max((_seq_of(f) for f in arquivos), default=0)
+
+
+def _remove_others(pasta: str, padrao: str, path: str):
+    """Apaga os arquivos de `padrao` na pasta, menos `path`."""
+    for antigo in glob.glob(os.path.join(pasta, padrao)):
+        if antigo != path:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass  # Windows: ainda mapeado por outro processo; sai na próxima gravação
+
+
+def _write_snapshot(df: pd.DataFrame, pasta: str, seq: int, preserve_index=False):
+    """Grava o retrato Arrow IPC da pasta e apaga os anteriores."""
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+    path = os.path.join(pasta, f"vigente-{seq:06d}.arrow")
+
+    def write(tmp):
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _write_atomic(path, write)
+    _remove_others(pasta, _SNAPSHOT_GLOB, path)
+
+
+def _load_snapshot(pasta: str, seq: int = None) -> pd.DataFrame | None:
+    """
+    Retrato Arrow IPC da pasta gravado na carga `seq` (ou o mais recente),
+    mapeado em memória. None se não há.
+    """
+    if seq is None:
+        arquivos = sorted(glob.glob(os.path.join(pasta, _SNAPSHOT_GLOB)))
+        if not arquivos:
+            return None
+        path = arquivos[-1]
+    else:
+        path = os.path.join(pasta, f"vigente-{seq:06d}.arrow")
+        if not os.path.exists(path):
+            return None
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _read_rows(path: str, posicoes: np.ndarray) -> pd.DataFrame:
+    """
+    Linhas `posicoes` de uma versão, nessa ordem, sem as colunas de chave e
+    hash. Só os row groups que contêm essas linhas são lidos.
+    """
+    arquivo = pq.ParquetFile(path)
+    colunas = [c for c in arquivo.schema_arrow.names if c not in (_CHAVE, _HASH)]
+    if not len(posicoes):
+        return arquivo.schema_arrow.empty_table().select(colunas).to_pandas()
+    inicios = np.cumsum([0] + [arquivo.metadata.row_group(i).num_rows for i in range(arquivo.num_row_groups)])
+    grupo = np.searchsorted(inicios, posicoes, side="right") - 1
+    lidos = np.unique(grupo)
+    tabela = arquivo.read_row_groups(lidos.tolist(), columns=colunas)
+    # Início de cada row group lido dentro da tabela lida
+    inicio_lido = np.concatenate([[0], np.cumsum(np.diff(inicios)[lidos])[:-1]])
+    local = inicio_lido[np.searchsorted(lidos, grupo)] + (posicoes - inicios[grupo])
+    return tabela.take(pa.array(local, type=pa.int64())).to_pandas()
+
+
+def _diff_versions(path_antes: str, path_depois: str) -> pd.DataFrame:
+    """Hash join de (chave, hash) das duas versões; das linhas inteiras só os row groups com mudanças são lidos."""
+    a = pq.read_table(path_antes, columns=[_CHAVE, _HASH])
+    b = pq.read_table(path_depois, columns=[_CHAVE, _HASH])
+    chave_a, hash_a = a[_CHAVE].to_numpy(), a[_HASH].to_numpy()
+    chave_b, hash_b = b[_CHAVE].to_numpy(), b[_HASH].to_numpy()
+
+    em_a = pd.Index(chave_a).get_indexer(chave_b)            # posição em A de cada linha de B
+    em_b = pd.Index(chave_b).get_indexer(chave_a)
+    incluidas = np.flatnonzero(em_a < 0)
+    removidas = np.flatnonzero(em_b < 0)
+    alteradas_b = np.flatnonzero((em_a >= 0) & (hash_a[np.maximum(em_a, 0)] != hash_b))
+    alteradas_a = em_a[alteradas_b]
+
+    antes = _read_rows(path_antes, np.concatenate([alteradas_a, removidas]))
+    depois = _read_rows(path_depois, np.concatenate([alteradas_b, incluidas]))
+    n = len(alteradas_b)
+    velho, novo = antes.iloc[:n].reset_index(drop=True), depois.iloc[:n].reset_index(drop=True)
+    comuns = [c for c in novo.columns if c in velho.columns]
+    difere = (velho[comuns] != novo[comuns]) & ~(velho[comuns].isna() & novo[comuns].isna())
+    mudaram = pd.Series("", index=difere.index, dtype=object)
+    for col in comuns:
+        mudaram += np.where(difere[col].to_numpy(), col + ", ", "")
+    mudaram = mudaram.str[:-2].to_numpy()
+
+    pares = pd.concat([velho.assign(**{"Mudança": "Antes"}), novo.assign(**{"Mudança": "Depois"})])
+    pares["Colunas alteradas"] = np.concatenate([mudaram, mudaram])
+    pares = pares.sort_index(kind="stable")   # Antes e Depois de cada linha lado a lado
+    partes = [
+        pares,
+        depois.iloc[n:].assign(**{"Mudança": "Incluída"}),
+        antes.iloc[n:].assign(**{"Mudança": "Removida"}),
+    ]
+    out = pd.concat([p for p in partes if len(p)], ignore_index=True) if n or len(incluidas) or len(removidas) else pd.DataFrame()
+    if out.empty:
+        return out
+    return out[["Mudança"] + [c for c in out.columns if c != "Mudança"]]
+
+
+class ParquetStore:
+    """
+    Base local dos datasets do dashboard.
+
+    Leituras são memorizadas por versão do dataset; os DataFrames retornados
+    são compartilhados entre reruns — não devem ser modificados in-place.
+    """
+
+    def __init__(self, root: str = DATA_DIR, datasets: dict = STORE_DATASETS, chaves: dict = STORE_CHAVES):
+        self.root = root
+        self.datasets = datasets
+        self.chaves = chaves
+        self._lock = threading.RLock()
+        self._memo = {}
+
+    # ---------- manifesto ----------
+
+    def _dir(self, nome: str) -> str:
+        return os.path.join(self.root, nome)
+
+    def manifest(self, nome: str) -> dict:
+        try:
+            with open(os.path.join(self._dir(nome), _MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self, nome: str, manifest: dict):
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+        _write_atomic(os.path.join(self._dir(nome), _MANIFEST), write)
+
+    @staticmethod
+    def source_key(data: bytes) -> str:
+        """Identifica a planilha: conteúdo + configurações que alteram o loader."""
+        return ParquetStore.source_key_for(content_hash(data))
+
+    @staticmethod
+    def source_key_for(digest: str) -> str:
+        """Como source_key, a partir do hash do conteúdo já calculado (ex.: upload no spill)."""
+        return f"{digest}:{config_fingerprint()}"
+
+    def has_source(self, nome: str, data: bytes = None, fonte: str = None) -> bool:
+        """True se esta planilha (bytes ou chave já calculada em `fonte`) já foi ingerida no dataset."""
+        return (fonte or self.source_key(data)) in self.manifest(nome).get("fontes", [])
+
+    def exists(self, nome: str) -> bool:
+        return bool(self.manifest(nome).get("versao"))
+
+    def partitions(self, nome: str) -> list:
+        """Valores de partição (ANOMES) presentes no dataset, em ordem crescente."""
+        return sorted(self.manifest(nome).get("particoes", []))
+
+    def info(self, nome: str) -> dict:
+        """Metadados extras gravados junto com o dataset (ex.: mês detectado no DPA)."""
+        return self.manifest(nome).get("info", {})
+
+    def partition_files(self, nome: str, partitions: list = None) -> tuple[list, list]:
+        """
+        Arquivos Parquet do dataset: (linhas, chaves removidas), das partições
+        indicadas ou de todas. Para leitura direta por um motor SQL.
+        """
+        base = self._dir(nome)
+        col = self.datasets[nome]
+        if col is None:
+            path = os.path.join(base, _PART_FILE)
+            return ([path] if os.path.exists(path) else []), []
+        if partitions is None:
+            partitions = self.partitions(nome)
+        pastas = [os.path.join(base, f"{col}={partition_value(p)}") for p in partitions]
+        linhas = [f for pasta in pastas for f in sorted(glob.glob(os.path.join(pasta, "part-*.parquet")))]
+        removidas = [f for pasta in pastas for f in sorted(glob.glob(os.path.join(pasta, "del-*.parquet")))]
+        return linhas, removidas
+
+    # ---------- partições ----------
+
+    def _load_file(self, path: str, nome: str, columns: list = None) -> pd.DataFrame:
+        if _SEQ not in pq.read_schema(path).names:
+            # Arquivo anterior ao upsert: carga inteira, sem colunas internas
+            df = pq.read_table(path).to_pandas()
+            df[_CHAVE], df[_HASH] = _row_keys(df, self.chaves.get(nome))
+            df[_SEQ] = 0
+            return df[columns] if columns else df
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    def _read_partition(self, pasta: str, nome: str, columns: list = None, ate: int = None) -> pd.DataFrame:
+        """
+        Linhas vigentes da partição (com as colunas internas): para cada chave,
+        a gravação de maior _seq, a menos que a chave tenha sido removida depois.
+        Com `ate`, ignora arquivos de cargas posteriores.
+        """
+        def arquivos(padrao):
+            return [f for f in sorted(glob.glob(os.path.join(pasta, padrao))) if ate is None or _seq_of(f) <= ate]
+
+        partes = [self._load_file(f, nome, columns) for f in arquivos("part-*.parquet")]
+        if not partes:
+            return pd.DataFrame(columns=columns or COLUNAS_INTERNAS)
+        df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+        removidas = [pq.read_table(f).to_pandas() for f in arquivos("del-*.parquet")]
+        if len(partes) == 1 and not removidas:
+            return df
+        marcas = pd.concat([df[[_CHAVE, _SEQ]]] + removidas, ignore_index=True)
+        ultima = marcas.groupby(_CHAVE)[_SEQ].max()
+        vigente = df[_SEQ].to_numpy() == ultima.reindex(df[_CHAVE]).to_numpy()
+        return df[vigente].reset_index(drop=True)
+
+    def _upsert_partition(self, pasta: str, nome: str, parte: pd.DataFrame, seq: int) -> int:
+        """Grava só as linhas novas/alteradas da partição; retorna quantas linhas foram gravadas."""
+        chave, linha = _row_keys(parte, self.chaves.get(nome))
+        atual = self._read_partition(pasta, nome, columns=COLUNAS_INTERNAS)
+
+        # Hash join das chaves (únicas dos dois lados): nova, alterada ou removida
+        chave_atual, hash_atual = atual[_CHAVE].to_numpy(np.uint64), atual[_HASH].to_numpy(np.uint64)
+        em_atual = pd.Index(chave_atual).get_indexer(chave)
+        novas = (em_atual < 0) | (hash_atual[np.maximum(em_atual, 0)] != linha) if len(atual) else np.ones(len(chave), bool)
+        removidas = pd.Index(chave).get_indexer(chave_atual) < 0
+        if not novas.any() and not removidas.any():
+            return 0
+
+        os.makedirs(pasta, exist_ok=True)
+        if novas.any():
+            delta = parte[novas].assign(**{_CHAVE: chave[novas], _HASH: linha[novas], _SEQ: seq})
+            _write_parquet(delta, os.path.join(pasta, f"part-{seq:06d}.parquet"))
+        if removidas.any():
+            tombstones = pd.DataFrame({_CHAVE: chave_atual[removidas], _SEQ: seq})
+            _write_parquet(tombstones, os.path.join(pasta, f"del-{seq:06d}.parquet"))
+
+        arquivos = glob.glob(os.path.join(pasta, "part-*.parquet")) + glob.glob(os.path.join(pasta, "del-*.parquet"))
+        if len(arquivos) > STORE_MAX_DELTAS:
+            self._compact_partition(pasta, nome, seq)
+        return int(novas.sum())
+
+    def _compact_partition(self, pasta: str, nome: str, seq: int):
+        """Junta base + deltas num único arquivo (mantendo o _seq de cada linha)."""
+        vigentes = self._read_partition(pasta, nome)
+        destino = os.path.join(pasta, f"part-{seq:06d}.parquet")
+        _write_parquet(vigentes, destino)
+        for f in glob.glob(os.path.join(pasta, "part-*.parquet")) + glob.glob(os.path.join(pasta, "del-*.parquet")):
+            if f != destino:
+                os.remove(f)
+
+    # ---------- derivados (gravados na primeira leitura) ----------
+
+    def _partition_frame(self, pasta: str, nome: str) -> pd.DataFrame:
+        """Linhas vigentes da partição, do retrato da última carga (gravado aqui se ainda não existe)."""
+        seq = _partition_seq(pasta)
+        df = _load_snapshot(pasta, seq)
+        if df is None:
+            with self._lock:
+                vigentes = self._read_partition(pasta, nome, ate=seq).drop(columns=COLUNAS_INTERNAS)
+                _write_snapshot(vigentes, pasta, seq)
+            df = _load_snapshot(pasta, seq)
+        return df
+
+    def _partition_cube(self, pasta: str, nome: str) -> str | None:
+        """Arquivo do cubo da última carga da partição (gravado aqui se ainda não existe); None se vazia."""
+        path = os.path.join(pasta, f"cubo-{_partition_seq(pasta):06d}.parquet")
+        if not os.path.exists(path):
+            vigentes = self._partition_frame(pasta, nome)
+            if not len(vigentes):
+                return None
+            with self._lock:
+                _write_parquet(_arrow_safe(build_cube(nome, vigentes)), path)
+            _remove_others(pasta, _CUBE_GLOB, path)
+        return path
+
+    # ---------- escrita ----------
+
+    def write(self, nome: str, df: pd.DataFrame, data: bytes = None, info: dict = None, fonte: str = None) -> int:
+        """
+        Grava a saída de um loader no dataset `nome` e retorna quantas linhas
+        foram gravadas. Datasets particionados recebem upsert nas partições
+        presentes em `df`; os demais são regravados por inteiro. A planilha
+        de origem (`data`, ou a chave `fonte` já calculada) fica no manifesto.
+        """
+        col = self.datasets[nome]
+        df = _arrow_safe(df)
+        base = self._dir(nome)
+        gravadas = 0
+
+        with self._lock:
+            os.makedirs(base, exist_ok=True)
+            manifest = self.manifest(nome)
+            particoes = set(manifest.get("particoes", []))
+            seq = manifest.get("seq", 0) + 1
+
+            if col is None:
+                _write_parquet(df, os.path.join(base, _PART_FILE), preserve_index=None)
+                _write_snapshot(df, base, seq, preserve_index=None)
+                gravadas = len(df)
+            elif col in df.columns:
+                for valor, parte in df.groupby(kernels.por_valor(df[col], partition_value), sort=False):
+                    pasta = os.path.join(base, f"{col}={valor}")
+                    gravadas += self._upsert_partition(pasta, nome, parte, seq)
+                    particoes.add(valor)
+
+            if nome in STORE_VERSOES:
+                manifest["versoes"] = self._write_version(nome, df, seq, manifest.get("versoes", []))
+
+            fontes = manifest.get("fontes", [])
+            if fonte is None and data is not None:
+                fonte = self.source_key(data)
+            if fonte is not None:
+                fontes = (fontes + [fonte])[-_MAX_FONTES:]
+            manifest.update(
+                versao=manifest.get("versao", 0) + 1,
+                seq=seq,
+                particoes=sorted(particoes),
+                fontes=fontes,
+            )
+            if info is not None:
+                manifest["info"] = info
+            self._write_manifest(nome, manifest)
+        return gravadas
+
+    def _write_version(self, nome: str, df: pd.DataFrame, seq: int, versoes: list) -> list:
+        """Grava a carga como versão imutável e retorna a lista de versões (só as mais recentes)."""
+        pasta = os.path.join(self._dir(nome), _VERSOES_DIR)
+        os.makedirs(pasta, exist_ok=True)
+        chave, linha = _row_keys(df, self.chaves.get(nome))
+        _write_parquet(
+            df.assign(**{_CHAVE: chave, _HASH: linha}).reset_index(drop=True),
+            os.path.join(pasta, f"v-{seq:06d}.parquet"),
+            row_group_size=_VERSAO_ROW_GROUP,
+        )
+        versoes = versoes + [{"seq": seq, "linhas": len(df), "data": datetime.now().isoformat(timespec="seconds")}]
+        for antiga in versoes[:-STORE_VERSOES[nome]]:
+            try:
+                os.remove(os.path.join(pasta, f"v-{antiga['seq']:06d}.parquet"))
+            except OSError:
+                pass
+        return versoes[-STORE_VERSOES[nome]:]
+
+    def clear(self, nome: str = None):
+        """Apaga um dataset (ou todos) da base local."""
+        with self._lock:
+            for ds in [nome] if nome else list(self.datasets):
+                shutil.rmtree(self._dir(ds), ignore_errors=True)
+            self._memo.clear()
+
+    # ---------- leitura ----------
+
+    def _memoize(self, key: tuple, load):
+        """Resultado memorizado por (dataset, versão, ...); versões antigas saem da memória."""
+        with self._lock:
+            if key not in self._memo:
+                for k in [k for k in self._memo if k[0] == key[0] and k[1] != key[1]]:
+                    del self._memo[k]
+                self._memo[key] = load()
+            return self._memo[key]
+
+    def partition_frames(self, nome: str) -> dict:
+        """
+        Histórico inteiro de um dataset particionado, em memória:
+        {valor da partição: DataFrame}, em ordem crescente de partição.
+        """
+        manifest = self.manifest(nome)
+        if not manifest.get("versao"):
+            return {}
+        col = self.datasets[nome]
+
+        def load():
+            frames = {}
+            for p in sorted(manifest.get("particoes", [])):
+                df = self._partition_frame(os.path.join(self._dir(nome), f"{col}={p}"), nome)
+                if len(df):
+                    frames[p] = df
+            return frames
+
+        return self._memoize((nome, manifest["versao"], "particoes"), load)
+
+    def read(self, nome: str, partitions: list = None) -> pd.DataFrame:
+        """
+        Lê o dataset (ou só as partições indicadas). Retorna DataFrame vazio
+        se o dataset ainda não existe.
+        """
+        manifest = self.manifest(nome)
+        if not manifest.get("versao"):
+            return pd.DataFrame()
+
+        if self.datasets[nome] is None:
+            base = self._dir(nome)
+
+            def load_base():
+                df = _load_snapshot(base)
+                return df if df is not None else pq.read_table(os.path.join(base, _PART_FILE)).to_pandas()
+
+            return self._memoize((nome, manifest["versao"]), load_base)
+
+        frames = self.partition_frames(nome)
+        partitions = list(frames) if partitions is None else sorted(partition_value(p) for p in partitions)
+
+        def load():
+            partes = [frames[p] for p in partitions if p in frames]
+            if len(partes) == 1:
+                return partes[0]  # sem cópia: o mesmo DataFrame mapeado do retrato
+            return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+        return self._memoize((nome, manifest["versao"], tuple(partitions)), load)
+
+    def select(self, nome: str, filtros: dict) -> pd.DataFrame:
+        """
+        Linhas do dataset inteiro com coluna == valor em cada filtro
+        ({coluna: valor}, valor None = sem filtro), como a máscara booleana
+        equivalente (mesma ordem e mesmo índice). Sem filtro é o próprio
+        DataFrame compartilhado; com filtro, um take das posições guardadas
+        num índice por conjunto de colunas (ex.: ANOMES + Setor), montado uma
+        vez por versão — o custo é o das linhas selecionadas, não o do dataset.
+        """
+        df = self.read(nome)
+        filtros = {col: valor for col, valor in filtros.items() if valor is not None}
+        if not filtros or df.empty:
+            return df
+        cols = tuple(sorted(filtros))
+        versao = self.manifest(nome).get("versao")
+        indexado, indice = self._memoize(
+            (nome, versao, "indice", cols), lambda: (df, _positions_index(df, cols)),
+        )
+        if indexado is not df:  # nova carga entre a leitura e o índice
+            indice = _positions_index(df, cols)
+        posicoes = indice.get(tuple(filtros[c] for c in cols))
+        return df.take(posicoes if posicoes is not None else np.empty(0, dtype=np.intp))
+
+    # ---------- versões ----------
+
+    def versions(self, nome: str) -> list:
+        """Cargas guardadas do dataset, da mais antiga para a mais recente: [{seq, linhas, data}]."""
+        return self.manifest(nome).get("versoes", [])
+
+    def diff(self, nome: str, antes: int = None, depois: int = None) -> pd.DataFrame:
+        """
+        Linhas que mudaram entre duas cargas (por padrão, a última e a anterior),
+        pela chave natural do dataset. Coluna "Mudança": Incluída, Removida, ou
+        Antes/Depois (par de linhas alteradas, com as colunas que mudaram em
+        "Colunas alteradas"). DataFrame vazio se não há duas versões.
+        """
+        manifest = self.manifest(nome)
+        seqs = [v["seq"] for v in manifest.get("versoes", [])]
+        depois = depois if depois is not None else (seqs[-1] if seqs else None)
+        if antes is None:
+            anteriores = [s for s in seqs if depois is not None and s < depois]
+            antes = anteriores[-1] if anteriores else None
+        if antes is None or depois is None:
+            return pd.DataFrame()
+        pasta = os.path.join(self._dir(nome), _VERSOES_DIR)
+        return self._memoize(
+            (nome, manifest["versao"], "diff", antes, depois),
+            lambda: _diff_versions(
+                os.path.join(pasta, f"v-{antes:06d}.parquet"), os.path.join(pasta, f"v-{depois:06d}.parquet"),
+            ),
+        )
+
+    # ---------- cubo ----------
+
+    def cube_files(self, nome: str, partitions: list = None) -> list | None:
+        """Arquivos do cubo das partições (ou de todas), sem as partições vazias; None se o dataset não tem cubo."""
+        if not has_cube(nome):
+            return None
+        col = self.datasets[nome]
+        if partitions is None:
+            partitions = self.partitions(nome)
+        conhecidas = set(self.partitions(nome))
+        arquivos = [
+            self._partition_cube(os.path.join(self._dir(nome), f"{col}={partition_value(p)}"), nome)
+            for p in partitions if partition_value(p) in conhecidas
+        ]
+        return [f for f in arquivos if f is not None]
+
+    def cube(self, nome: str, partitions: list = None) -> pd.DataFrame:
+        """Cubo de agregados do dataset (ou só das partições indicadas)."""
+        manifest = self.manifest(nome)
+        if not manifest.get("versao") or not has_cube(nome):
+            return pd.DataFrame()
+        col = self.datasets[nome]
+
+        def load():
+            cubos = {}
+            for p in sorted(manifest.get("particoes", [])):
+                path = self._partition_cube(os.path.join(self._dir(nome), f"{col}={p}"), nome)
+                if path is not None:
+                    cubos[p] = pq.read_table(path).to_pandas()
+            return cubos
+
+        cubos = self._memoize((nome, manifest["versao"], "cubo"), load)
+        partitions = list(cubos) if partitions is None else sorted(partition_value(p) for p in partitions)
+
+        def juntar():
+            partes = [cubos[p] for p in partitions if p in cubos]
+            return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+        return self._memoize((nome, manifest["versao"], "cubo", tuple(partitions)), juntar)
+
+
+# Instância única por processo
+STORE = ParquetStore()
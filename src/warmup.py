@@ -0,0 +1,106 @@
+import importlib
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from src.config import RES_INDICADORES_FILTRO
+from src.storage import STORE
+
+
+# =====================================================
+# Aquecimento na subida do servidor
+# =====================================================
+# Depois de um restart, a base local (data/) continua em disco, mas a memória
+# do processo está vazia: a primeira visita pagaria a leitura dos datasets,
+# dos cubos e as quebras. O Procfile sobe o Streamlit por este módulo, que
+# dispara o aquecimento numa thread antes de abrir o servidor. Leituras da
+# base são memorizadas sob lock — uma visita que chega no meio espera o
+# aquecimento em vez de repetir o trabalho. Enquanto isso, o app.py mostra um
+# aviso (aquecendo()) e, depois, o tempo ou o erro do aquecimento (STATUS).
+
+# Recorte da primeira visita: ETIT/Residencial em "Todos" os meses, TOA e
+# Fechamento no mês mais recente (mesmos padrões da sidebar do app.py)
+_TODOS_OS_MESES = {"etit", "res_ind"}
+
+_IMPORTS_TARDIOS = ("pandas.io.formats.style", "matplotlib", "altair")
+
+_lock = threading.Lock()
+_thread = None
+STATUS = {"pronto": threading.Event(), "segundos": None, "erro": None}
+
+
+def preload():
+    """Carrega na memória do processo os datasets da base, os cubos, as quebras e o resumo da primeira visita."""
+    from src import processors  # noqa: F401 — import pesado fora da primeira visita
+    from src.query import _QUEBRAS, engine, quebra, resumo_produtividade
+
+    # Importados só no primeiro .style (tabelas com gradiente) e no primeiro gráfico
+    for modulo in _IMPORTS_TARDIOS:
+        importlib.import_module(modulo)
+
+    for nome, col in STORE.datasets.items():
+        if not STORE.exists(nome):
+            continue
+        STORE.read(nome)
+        if col is not None:
+            STORE.partition_frames(nome)
+            STORE.cube(nome)
+
+    engine()
+    for nome, spec in _QUEBRAS.items():
+        dataset = spec["dataset"]
+        particoes = STORE.partitions(dataset)
+        if not particoes:
+            continue
+        recorte = None if dataset in _TODOS_OS_MESES else particoes[-1:]
+        variantes = [{}]
+        if "indicador" in spec.get("filtro_kw", {}):
+            variantes = [{"indicador": ind} for ind in RES_INDICADORES_FILTRO]
+        for kwargs in variantes:
+            quebra(nome, pd.DataFrame(), particoes=recorte, **kwargs)
+
+    # Resumo por analista com a sidebar em "Todos" (geral e mês a mês)
+    if STORE.exists("produtividade"):
+        df = STORE.read("produtividade")
+        resumo_produtividade(df)
+        resumo_produtividade(df, mensal=True)
+
+
+def _run():
+    inicio = time.perf_counter()
+    try:
+        preload()
+    except Exception as e:  # aquecimento é só otimização: o app carrega sob demanda
+        STATUS["erro"] = e
+    STATUS["segundos"] = time.perf_counter() - inicio
+    STATUS["pronto"].set()
+
+
+def aquecendo() -> bool:
+    """True enquanto o aquecimento disparado por start() não terminou."""
+    return _thread is not None and not STATUS["pronto"].is_set()
+
+
+def start() -> threading.Thread:
+    """Dispara o aquecimento em segundo plano (uma vez por processo)."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+
+if __name__ == "__main__":
+    # python -m src.warmup run app.py [opções do streamlit]
+    # Pelo módulo importado, não por este __main__: é o src.warmup que o
+    # app.py importa e onde ele lê o STATUS
+    from src import warmup
+
+    warmup.start()
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", *sys.argv[1:]]
+    sys.exit(cli.main())
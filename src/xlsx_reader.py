@@ -0,0 +1,414 @@
+import html
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.worksheet._reader import _cast_number
+from pandas.io.parsers import TextParser
+
+
+# =====================================================
+# Leitura direta do XML de planilhas xlsx
+# =====================================================
+# O xlsx é um zip de XMLs. Em vez de montar um objeto por célula (openpyxl)
+# a aba é varrida em blocos com regex e só as células das colunas pedidas
+# são decodificadas; as demais são puladas sem nem olhar o valor.
+
+_CHUNK_SIZE = 4 * 1024 * 1024
+
+_ROW_RE = re.compile(rb'<(?:\w+:)?row\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?row>)', re.S)
+_ROW_NUM_RE = re.compile(rb'\br="(\d+)"')
+_CELL_RE = re.compile(rb'<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)', re.S)
+_CELL_REF_RE = re.compile(rb'\br="([A-Z]+)\d+"')
+_CELL_TYPE_RE = re.compile(rb'\bt="(\w+)"')
+_CELL_STYLE_RE = re.compile(rb'\bs="(\d+)"')
+_VALUE_RE = re.compile(rb'<(?:\w+:)?v(?:\s[^>]*)?>(.*?)</(?:\w+:)?v>', re.S)
+_TEXT_RE = re.compile(rb'<(?:\w+:)?t(?:\s[^>]*)?>(.*?)</(?:\w+:)?t>', re.S)
+_PHONETIC_RE = re.compile(rb'<(?:\w+:)?rPh\b.*?</(?:\w+:)?rPh>', re.S)
+_SHARED_ITEM_RE = re.compile(rb'<(?:\w+:)?si\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?si>)', re.S)
+
+_REL_OFFICE_DOCUMENT = "/officeDocument"
+_REL_SHARED_STRINGS = "/sharedStrings"
+_REL_STYLES = "/styles"
+
+
+def _local(tag: str) -> str:
+    """Nome do elemento sem o namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _attr(element, name: str):
+    """Atributo pelo nome local (ignora o namespace, ex.: r:id)."""
+    for key, value in element.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+
+def _column_names(header_row) -> list:
+    """
+    Nomes de coluna a partir da linha de header, no mesmo formato do
+    pd.read_excel: células vazias viram "Unnamed: N" e nomes repetidos
+    recebem sufixo ".1", ".2"...
+    """
+    names, seen = [], {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def part_rels(zf: zipfile.ZipFile, part: str) -> dict:
+    """{rId: (tipo, caminho no zip)} dos relacionamentos de uma parte do pacote."""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_path not in zf.namelist():
+        return {}
+    rels = {}
+    for rel in ET.fromstring(zf.read(rels_path)):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target[1:]
+        else:
+            path = posixpath.normpath(posixpath.join(folder, target))
+        rels[rel.get("Id")] = (rel.get("Type", ""), path)
+    return rels
+
+
+def _last_row_end(buf: bytes) -> int:
+    """Posição logo após o último </row> completo do buffer (-1 se não houver)."""
+    pos = len(buf)
+    while True:
+        pos = buf.rfind(b"row>", 0, pos)
+        if pos == -1:
+            return -1
+        start = buf.rfind(b"<", 0, pos)
+        if buf[start + 1:start + 2] == b"/":
+            return pos + 4
+
+
+def _rich_text(inner: bytes) -> str:
+    """Texto de um <si>/<is>: concatena os <t> (runs de rich text), sem fonética."""
+    if b"rPh" in inner:
+        inner = _PHONETIC_RE.sub(b"", inner)
+    return "".join(html.unescape(t.decode("utf-8")) for t in _TEXT_RE.findall(inner))
+
+
+def _projection_re(letters) -> re.Pattern:
+    """Regex que casa apenas as células das colunas `letters` (ex.: A, C, AF)."""
+    alternatives = b"|".join(sorted((l.encode() for l in letters), key=len, reverse=True))
+    return re.compile(
+        rb'<(?:\w+:)?c\b(?=[^>]*?\br="(' + alternatives + rb')\d)([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)',
+        re.S,
+    )
+
+
+def _excel_cell(value):
+    """Valor no formato que o pd.read_excel entrega ao TextParser."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class XlsxWorkbook:
+    """
+    Acesso somente leitura a um xlsx direto pelo zip.
+
+    Só `xl/workbook.xml` e os rels são lidos na abertura; sharedStrings e
+    estilos são carregados na primeira leitura de aba que precisar deles.
+    """
+
+    def __init__(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        self._zip = zipfile.ZipFile(source)
+        self._shared_strings = None
+        self._date_styles = None
+        self._timedelta_styles = None
+        self._read_workbook()
+
+    # ---------- estrutura do arquivo ----------
+
+    def _rels(self, part: str) -> dict:
+        return part_rels(self._zip, part)
+
+    def _read_workbook(self):
+        workbook_part = "xl/workbook.xml"
+        for rel_type, path in self._rels("").values():
+            if rel_type.endswith(_REL_OFFICE_DOCUMENT):
+                workbook_part = path
+                break
+
+        rels = self._rels(workbook_part)
+        root = ET.fromstring(self._zip.read(workbook_part))
+
+        self._sheets = {}
+        self._epoch = CALENDAR_WINDOWS_1900
+        for element in root.iter():
+            tag = _local(element.tag)
+            if tag == "sheet":
+                rel = rels.get(_attr(element, "id"))
+                if rel is not None:
+                    self._sheets[element.get("name")] = rel[1]
+            elif tag == "workbookPr" and element.get("date1904") in ("1", "true"):
+                self._epoch = CALENDAR_MAC_1904
+
+        self._parts = {}
+        for rel_type, path in rels.values():
+            for kind in (_REL_SHARED_STRINGS, _REL_STYLES):
+                if rel_type.endswith(kind):
+                    self._parts[kind] = path
+
+    @property
+    def sheetnames(self) -> list:
+        return list(self._sheets)
+
+    def _load_shared(self):
+        if self._shared_strings is not None:
+            return
+        path = self._parts.get(_REL_SHARED_STRINGS)
+        if path and path in self._zip.namelist():
+            self._shared_strings = [
+                _rich_text(m.group(1) or b"") for m in _SHARED_ITEM_RE.finditer(self._zip.read(path))
+            ]
+        else:
+            self._shared_strings = []
+
+        self._date_styles, self._timedelta_styles = set(), set()
+        path = self._parts.get(_REL_STYLES)
+        if path and path in self._zip.namelist():
+            stylesheet = Stylesheet.from_tree(ET.fromstring(self._zip.read(path)))
+            self._date_styles = set(stylesheet.date_formats)
+            self._timedelta_styles = set(stylesheet.timedelta_formats)
+
+    # ---------- decodificação ----------
+
+    def _cell_value(self, attrs: bytes, inner):
+        """Converte uma célula <c> como o openpyxl faria (data_only)."""
+        if inner is None:
+            return None
+        match = _CELL_TYPE_RE.search(attrs)
+        cell_type = match.group(1) if match else b"n"
+
+        if cell_type == b"inlineStr":
+            return _rich_text(inner)
+
+        match = _VALUE_RE.search(inner)
+        if match is None:
+            return None
+        raw = match.group(1)
+
+        if cell_type == b"s":
+            return self._shared_strings[int(raw)]
+        if cell_type == b"n":
+            value = _cast_number(raw.decode("ascii"))
+            match = _CELL_STYLE_RE.search(attrs)
+            if match is not None and int(match.group(1)) in self._date_styles:
+                style = int(match.group(1))
+                try:
+                    value = from_excel(value, self._epoch, timedelta=style in self._timedelta_styles)
+                except (OverflowError, ValueError):
+                    return None
+            return value
+        if cell_type == b"str":
+            return html.unescape(raw.decode("utf-8"))
+        if cell_type == b"b":
+            return bool(int(raw))
+        if cell_type == b"d":
+            return from_ISO8601(raw.decode("ascii"))
+        # "e": erro de fórmula (#N/A, #REF!...) vira vazio
+        return None
+
+    def _iter_rows(self, sheet_name: str):
+        """Gera (número da linha no Excel, conteúdo XML da linha) em streaming."""
+        if sheet_name not in self._sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        row_number = 0
+        with self._zip.open(self._sheets[sheet_name]) as fh:
+            buf = b""
+            while True:
+                chunk = fh.read(_CHUNK_SIZE)
+                buf += chunk
+                end = _last_row_end(buf) if chunk else len(buf)
+                if end > 0:
+                    for match in _ROW_RE.finditer(buf, 0, end):
+                        num = _ROW_NUM_RE.search(match.group(1))
+                        row_number = int(num.group(1)) if num else row_number + 1
+                        yield row_number, match.group(2) or b""
+                    buf = buf[end:]
+                if not chunk:
+                    break
+
+    def _decode_row(self, body: bytes) -> list:
+        """Todas as células da linha, posicionadas pela referência (A1, B1...)."""
+        values = []
+        for match in _CELL_RE.finditer(body):
+            ref = _CELL_REF_RE.search(match.group(1))
+            idx = column_index_from_string(ref.group(1).decode()) - 1 if ref else len(values)
+            if idx >= len(values):
+                values.extend([None] * (idx - len(values) + 1))
+            values[idx] = self._cell_value(match.group(1), match.group(2))
+        while values and values[-1] is None:
+            values.pop()
+        return values
+
+    # ---------- leitura de aba ----------
+
+    def _accepts(self, value, keep, fn) -> bool:
+        """Valor da célula passa no filtro? (vazio nunca passa, como NaN no pandas)"""
+        if value is None:
+            return False
+        value = _excel_cell(value)
+        return (fn(value) if fn else value) in keep
+
+    def _shared_indices(self, keep, fn) -> frozenset:
+        """Índices (em bytes, como aparecem no <v>) das sharedStrings aceitas pelo filtro."""
+        return frozenset(
+            str(i).encode() for i, text in enumerate(self._shared_strings)
+            if (fn(text) if fn else text) in keep
+        )
+
+    def read_sheet(self, sheet_name: str, header_row=0, usecols=None,
+                   filters=None, normalize=None) -> pd.DataFrame:
+        """
+        Lê uma aba como o pd.read_excel(header=header_row). Com header_row=None
+        a aba é lida sem header, com colunas numeradas (header=None).
+
+        - usecols: nomes das colunas a decodificar (ausentes são ignorados);
+          com header_row=None, posições das colunas (0 = A).
+        - filters: {coluna: valores aceitos}. As células-chave são testadas
+          antes do resto da linha; linhas recusadas não são decodificadas.
+          Filtros sobre colunas ausentes na aba são ignorados.
+        - normalize: {coluna: função} aplicada ao valor antes de comparar.
+
+        Linhas sem valor em nenhuma das colunas lidas são descartadas.
+        """
+        self._load_shared()
+        rows = self._iter_rows(sheet_name)
+        if header_row is None:
+            return self._read_positional(rows, usecols)
+
+        header, body = None, b""
+        for row_number, body in rows:
+            if row_number > header_row:
+                header = self._decode_row(body)
+                break
+        if not header:
+            return pd.DataFrame()
+
+        names = _column_names(header)
+        normalize = normalize or {}
+        filters = {col: keep for col, keep in (filters or {}).items() if col in names}
+        wanted = set(names if usecols is None else usecols) | set(filters)
+        positions = [i for i, name in enumerate(names) if name in wanted]
+        width = len(positions)
+        out_header = [_excel_cell(header[i]) for i in positions]
+
+        # Com referências nas células, só as colunas pedidas passam pela regex
+        letters = {openpyxl.utils.get_column_letter(i + 1): n for n, i in enumerate(positions)}
+        cell_re = _projection_re(letters) if _CELL_REF_RE.search(body) else None
+
+        # Filtros: para texto compartilhado basta comparar o índice do <v>,
+        # resolvido uma única vez aqui, sem decodificar a string
+        checks = []
+        for col, keep in filters.items():
+            fn = normalize.get(col)
+            pos = names.index(col)
+            key_re = _projection_re([openpyxl.utils.get_column_letter(pos + 1)]) if cell_re else None
+            checks.append((key_re, self._shared_indices(keep, fn), positions.index(pos), keep, fn))
+
+        data = [out_header]
+        for _, body in rows:
+            if cell_re is not None:
+                if not all(self._key_matches(body, *check) for check in checks):
+                    continue
+                values = [None] * width
+                for match in cell_re.finditer(body):
+                    values[letters[match.group(1).decode()]] = self._cell_value(match.group(2), match.group(3))
+            else:
+                full = self._decode_row(body)
+                values = [full[i] if i < len(full) else None for i in positions]
+                if not all(self._accepts(values[idx], keep, fn) for _, _, idx, keep, fn in checks):
+                    continue
+            if any(v is not None for v in values):
+                data.append([_excel_cell(v) for v in values])
+
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+
+    def _key_matches(self, body: bytes, key_re, shared_ok, idx, keep, fn) -> bool:
+        """Testa só a célula-chave da linha contra o filtro."""
+        match = key_re.search(body)
+        if match is None:
+            return False
+        attrs, inner = match.group(2), match.group(3)
+        if inner is not None and b't="s"' in attrs:
+            value = _VALUE_RE.search(inner)
+            return value is not None and value.group(1) in shared_ok
+        return self._accepts(self._cell_value(attrs, inner), keep, fn)
+
+    def _read_positional(self, rows, usecols=None) -> pd.DataFrame:
+        """
+        Aba sem header, linha a linha como no Excel (inclusive vazias).
+        `usecols` aqui são posições (0 = coluna A): só essa faixa é
+        decodificada e as colunas mantêm a numeração original.
+        """
+        if usecols is None:
+            positions, cell_re, letters = None, None, {}
+        else:
+            positions = sorted(set(usecols))
+            letters = {openpyxl.utils.get_column_letter(i + 1): n for n, i in enumerate(positions)}
+            cell_re = _projection_re(letters)
+
+        data, last = [], 0
+        for row_number, body in rows:
+            data.extend([] for _ in range(row_number - last - 1))
+            last = row_number
+            if positions is None:
+                values = self._decode_row(body)
+            elif _CELL_REF_RE.search(body):
+                values = [None] * len(positions)
+                for match in cell_re.finditer(body):
+                    values[letters[match.group(1).decode()]] = self._cell_value(match.group(2), match.group(3))
+            else:
+                full = self._decode_row(body)
+                values = [full[i] if i < len(full) else None for i in positions]
+            while values and values[-1] is None:
+                values.pop()
+            data.append([_excel_cell(v) for v in values])
+
+        while data and not data[-1]:
+            data.pop()
+        if not data:
+            return pd.DataFrame(columns=positions)
+        width = len(positions) if positions is not None else max(len(row) for row in data)
+        for row in data:
+            row.extend([""] * (width - len(row)))
+        df = TextParser(data, header=None, skip_blank_lines=False).read()
+        if positions is not None:
+            df.columns = positions
+        return df
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
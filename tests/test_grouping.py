@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.grouping import LINHAS, contagem, grouping_sets, soma
+
+
+def _groupby(df, dims, col):
+    """Referência: o groupby que grouping_sets substitui (nulos como grupo)."""
+    g = df.groupby(dims, dropna=False, sort=True)[col]
+    return pd.DataFrame({
+        soma(col): g.sum(),
+        contagem(col): g.count(),
+        LINHAS: g.size(),
+    }).reset_index()
+
+
+def _confere(df, dims, col="v"):
+    out = grouping_sets(df, {"q": dims}, [col])["q"]
+    ref = _groupby(df, dims, col)
+    assert len(out) == len(ref)
+    for c in dims:
+        assert out[c].tolist() == ref[c].tolist() or (out[c].isna() == ref[c].isna()).all()
+    for c in (soma(col), contagem(col), LINHAS):
+        np.testing.assert_array_equal(out[c].to_numpy(), ref[c].to_numpy())
+
+
+def test_tipos_misturados():
+    # Coluna de texto do Excel com números no meio
+    df = pd.DataFrame({"a": ["x", 1, "y", 2, None, "x", 1], "v": [1, 2, 3, 4, 5, 6, 7]})
+    _confere(df, ["a"])
+    assert grouping_sets(df, {"q": ["a"]}, ["v"])["q"]["a"].tolist()[:4] == [1, 2, "x", "y"]
+
+
+def test_tipos_misturados_duas_dimensoes():
+    df = pd.DataFrame({
+        "a": ["x", 1, "y", 2, None, "x", 1, 2],
+        "b": [3, "k", "k", 3, "k", None, "k", 3],
+        "v": [1.0, np.nan, 3, 4, 5, 6, 7, 8],
+    })
+    _confere(df, ["a", "b"])
+
+
+def test_coluna_toda_nula():
+    df = pd.DataFrame({"a": [None, None, None], "b": [np.nan] * 3, "v": [1, 2, 3]})
+    out = grouping_sets(df, {"a": ["a"], "ab": ["a", "b"], "total": []}, ["v"])
+    for nome in ("a", "ab", "total"):
+        assert out[nome][soma("v")].tolist() == [6]
+        assert out[nome][LINHAS].tolist() == [3]
+    assert out["a"]["a"].isna().all()